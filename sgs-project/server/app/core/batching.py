@@ -0,0 +1,51 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional
+
+# ==========================================
+# 微批处理：把短时间内到达的单个请求攒成一批，一次调用批处理函数后把结果分发回各个等待者
+# 攒满 max_size 条立即处理，否则最早的一条等待 window 秒后处理 (连接风暴时一批多条，平时只多等几毫秒)
+# ==========================================
+
+BatchHandler = Callable[[List[Any]], Awaitable[List[Any]]]
+
+class MicroBatcher:
+    def __init__(self, handler: BatchHandler, window: float, max_size: int):
+        self.handler = handler       # 批处理函数：items -> 与 items 一一对应的结果
+        self.window = window
+        self.max_size = max_size
+        self._items: List[Any] = []
+        self._futures: List[asyncio.Future] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def submit(self, item: Any) -> asyncio.Future:
+        """加入当前批次，返回该条结果的 Future"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._items.append(item)
+        self._futures.append(future)
+        if len(self._items) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, futures = self._items, self._futures
+        self._items, self._futures = [], []
+        if items: asyncio.ensure_future(self._run(items, futures))
+
+    async def _run(self, items: List[Any], futures: List[asyncio.Future]):
+        try:
+            results = await self.handler(items)
+        except Exception as e:
+            for future in futures:
+                if not future.done(): future.set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            if not future.done(): future.set_result(result) # 等待者已取消 (连接中途断开) 的跳过
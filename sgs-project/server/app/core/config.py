@@ -0,0 +1,48 @@
+# === 对局规则与时序配置 ===
+
+# AOE (南蛮入侵/万箭齐发) 响应模式：
+#   "sequential"   逐个询问目标 (每个目标一次往返，兼容只认 pending.target_sid 的旧前端)
+#   "simultaneous" 同时询问所有目标，收齐响应或超时后按座次结算
+AOE_RESPONSE_MODE = "sequential"
+
+# 同时响应窗口的时限 (秒)，超时未响应视为放弃
+AOE_WINDOW_SECONDS = 15.0
+
+# 无懈可击窗口的时限 (秒)：只询问手中有无懈可击的角色，无人持有时不开窗口
+WUXIE_WINDOW_SECONDS = 5.0
+
+# === 超时 (秒)：到时由服务器按默认方式代为行动 ===
+PICK_GENERAL_SECONDS = 30.0   # 选将：未选的玩家选第一个候选武将
+PLAY_PHASE_SECONDS = 60.0     # 出牌阶段 (整个阶段共用)：结束出牌
+DISCARD_SECONDS = 20.0        # 弃牌：弃置最后获得的牌
+RESPONSE_SECONDS = 15.0       # 其余询问：放弃；必须选择的询问 (拆/顺/五谷) 取第一个合法选项
+
+# 按询问类型 (PendingType 的值) 覆盖 RESPONSE_SECONDS；同时响应窗口使用上面的窗口时限
+PROMPT_SECONDS = {
+    "ask_for_discard": DISCARD_SECONDS,
+}
+
+# 超时调度的时间精度 (时间轮一个 tick 的长度)
+TIMER_TICK_SECONDS = 0.1
+
+# === 断线重连 ===
+# 对局中断线后保留座位的时长 (秒)：期间用同一账号重连可继续对局，超时按逃跑处理
+RECONNECT_GRACE_SECONDS = 30.0
+
+# 每个房间保留的最近推送批次数：重连时据此补发断线期间的事件，更早的只发快照
+CATCH_UP_HISTORY = 64
+
+# === 托管机器人 ===
+BOT_WORKERS = 4                # 决策线程池大小 (全服共用)
+BOT_DECISION_SECONDS = 1.0     # 单次决策的时间预算，超时按默认动作处理
+BOT_ACTION_DELAY = 0.6         # 机器人行动前的停顿 (让真人看清节奏)
+BOT_TAKEOVER_TIMEOUTS = 2      # 连续超时多少次后由机器人托管
+BOT_POLICY = "heuristic"       # "heuristic" 启发式 (线程池) / "mcts" 蒙特卡洛树搜索 (进程池)
+MCTS_PLAYOUTS = 400            # MCTS 每次决策的模拟次数上限 (同时受决策时间预算限制)
+
+# === 连接鉴权 (令牌校验与玩家资料缓存) ===
+PROFILE_CACHE_SECONDS = 300.0  # 缓存有效期，资料变更时立即失效
+PROFILE_CACHE_SIZE = 10000     # 最多缓存的账号数 (超出时淘汰最久未用的)
+AUTH_BATCH_WINDOW = 0.005      # 微批等待时间：令牌校验与资料查询各自攒批
+AUTH_BATCH_SIZE = 256          # 每批最多条数 (一次 WHERE username IN (...) 查询)
+AUTH_WORKERS = 2               # 令牌校验线程数
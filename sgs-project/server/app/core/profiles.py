@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.core.batching import MicroBatcher
+from app.core.config import (
+    AUTH_BATCH_SIZE, AUTH_BATCH_WINDOW, AUTH_WORKERS, PROFILE_CACHE_SECONDS, PROFILE_CACHE_SIZE,
+)
+from app.core.database import engine
+from app.core.security import decode_access_token
+from app.models.user import User
+
+# ==========================================
+# 玩家资料缓存 (socket 连接鉴权用)
+# - 数据库查询在工作线程中执行，不阻塞事件循环 (SQLite 慢时其他房间照常推进)
+# - 未命中的用户名按微批合并为一次 WHERE username IN (...) 查询
+# - 按用户名缓存 {username, nickname, avatar}，过期或资料变更 (invalidate) 后重新查询 (目前没有修改资料的接口，仅靠过期)
+# - 同一用户名的并发查询合并为一次 (重连风暴时同一账号的多个连接只查一次库)
+# ==========================================
+
+Profile = Dict[str, str]
+
+def load_profiles(usernames: Iterable[str], bind: Engine = engine) -> Dict[str, Profile]:
+    """同步批量查询玩家资料 (在工作线程中调用)，不存在的账号不在结果中"""
+    names = list(usernames)
+    if not names: return {}
+    with Session(bind) as db:
+        users = db.exec(select(User).where(User.username.in_(names))).all()
+        return {u.username: {"username": u.username, "nickname": u.nickname, "avatar": u.avatar} for u in users}
+
+class ProfileCache:
+    def __init__(self, ttl: float = PROFILE_CACHE_SECONDS, size: int = PROFILE_CACHE_SIZE,
+                 loader: Callable[[List[str]], Dict[str, Profile]] = load_profiles,
+                 window: float = AUTH_BATCH_WINDOW, max_batch: int = AUTH_BATCH_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self.loader = loader
+        self._entries: "OrderedDict[str, Tuple[float, Profile]]" = OrderedDict() # username -> (过期时间, 资料)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._batcher = MicroBatcher(self._load_batch, window, max_batch)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def _load_batch(self, usernames: List[str]) -> List[Optional[Profile]]:
+        found = await asyncio.to_thread(self.loader, usernames)
+        return [found.get(name) for name in usernames]
+
+    async def get(self, username: str) -> Optional[Profile]:
+        """返回玩家资料的副本 (账号不存在时为 None；不存在的账号不缓存)"""
+        entry = self._entries.get(username)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(username)
+                return dict(entry[1])
+            del self._entries[username]
+
+        pending = self._inflight.get(username)
+        if pending is None:
+            pending = self._inflight[username] = self._batcher.submit(username)
+            pending.add_done_callback(partial(self._store, username))
+        # 单个等待者被取消 (连接中途断开) 不影响其他等待同一查询的连接
+        profile = await asyncio.shield(pending)
+        return dict(profile) if profile else None
+
+    def _store(self, username: str, future: asyncio.Future):
+        if self._inflight.get(username) is not future: return # 查询期间资料已变更，结果作废
+        del self._inflight[username]
+        if future.cancelled() or future.exception() is not None: return
+        profile = future.result()
+        if not profile: return
+        self._entries[username] = (time.monotonic() + self.ttl, profile)
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, username: str):
+        """
+        资料变更 (改昵称/头像) 后调用；正在进行的查询结果不再写入缓存
+        只能在事件循环线程中调用 (同步路由运行在线程池里，需经 loop.call_soon_threadsafe 转交)
+        不存在的账号不缓存，注册新账号无需调用
+        """
+        self._entries.pop(username, None)
+        self._inflight.pop(username, None)
+
+# 全局单例
+profile_cache = ProfileCache()
+
+# ==========================================
+# 连接鉴权：令牌校验 -> 资料查询
+# 连接风暴时令牌按微批交给校验线程池 (每批一次调度)，得到的用户名再经资料缓存批量查库
+# ==========================================
+
+def _decode_one(token: str) -> Optional[str]:
+    """单个令牌解码失败 (格式错误、类型不对) 只影响自己，不连累同批的其他连接"""
+    if not isinstance(token, str): return None
+    try:
+        return decode_access_token(token)
+    except Exception:
+        return None
+
+def decode_access_tokens(tokens: List[str]) -> List[Optional[str]]:
+    return [_decode_one(token) for token in tokens]
+
+class Authenticator:
+    def __init__(self, cache: ProfileCache = profile_cache, workers: int = AUTH_WORKERS,
+                 window: float = AUTH_BATCH_WINDOW, max_batch: int = AUTH_BATCH_SIZE):
+        self.cache = cache
+        self.workers = workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._tokens = MicroBatcher(self._decode_batch, window, max_batch)
+
+    async def _decode_batch(self, tokens: List[str]) -> List[Optional[str]]:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sgs-auth")
+        return await asyncio.get_running_loop().run_in_executor(self._pool, decode_access_tokens, tokens)
+
+    async def authenticate(self, token: str) -> Optional[Profile]:
+        """校验令牌并返回玩家资料；令牌无效或账号不存在时返回 None"""
+        username = await self._tokens.submit(token)
+        if not username: return None
+        return await self.cache.get(username)
+
+# 全局单例
+authenticator = Authenticator()
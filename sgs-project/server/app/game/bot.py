@@ -0,0 +1,144 @@
+import random
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from .card import CardType
+from .enums import PendingType
+from .legal import LegalActions, PlayOption
+from .pending import PeachPending, WuxiePending
+
+if TYPE_CHECKING:
+    from .player import Player
+    from .room import GameRoom
+
+# ==========================================
+# 托管机器人策略
+# 只读取合法动作 (room.legal_actions) 并返回一条与客户端相同格式的动作
+# ({"type": "play_card" / "respond_action" / "end_turn", ...})，由调用方走正常的指令入口执行
+# 决策在房间的克隆上进行，可以放到工作线程中运行 (见 app/socket/bots.py)
+# ==========================================
+
+# 留牌优先级 (弃牌时先弃分数低的，五谷先拿分数高的)
+_KEEP_SCORE = {"桃": 10, "无懈可击": 8, "闪": 7, "无中生有": 6, "杀": 5, "顺手牵羊": 5, "决斗": 4,
+               "过河拆桥": 4, "南蛮入侵": 4, "万箭齐发": 4, "乐不思蜀": 4}
+
+# 对目标有害、值得用无懈可击抵消的锦囊
+_HARMFUL_TRICKS = frozenset(("顺手牵羊", "过河拆桥", "决斗", "南蛮入侵", "万箭齐发", "乐不思蜀", "闪电", "借刀杀人"))
+
+# 出牌阶段的出牌顺序 (先增益后进攻)；不在表中的牌不主动打出
+_PLAY_ORDER = ("无中生有", "五谷丰登", "桃园结义", "桃", "顺手牵羊", "过河拆桥", "乐不思蜀",
+               "南蛮入侵", "万箭齐发", "决斗", "杀")
+
+_EQUIP_TYPES = frozenset((CardType.EQUIP_WEAPON, CardType.EQUIP_ARMOR,
+                          CardType.EQUIP_HORSE_PLUS, CardType.EQUIP_HORSE_MINUS))
+
+def decide(room: 'GameRoom', sid: str, deadline: Optional[float] = None,
+           rng: Optional[random.Random] = None) -> Optional[Dict[str, Any]]:
+    """
+    为 sid 选择一条动作；无事可做时返回 None
+    deadline 为 time.monotonic() 时间戳 (本策略只做常数次判断，不会用满；搜索类策略应在到点前返回)
+    """
+    rng = rng or random
+    p = room.get_player(sid)
+    if p is None: return None
+    legal = room.legal_actions(sid)
+    if legal.mode == "respond": return _respond(room, p, legal, rng)
+    if legal.mode == "play": return _play(room, p, legal, rng)
+    return None
+
+def perform(room: 'GameRoom', sid: str, action: Dict[str, Any]) -> Tuple[bool, str]:
+    """在房间上直接执行一条动作 (推演用；线上的动作经 app/socket/actions.py 执行并附带提示)"""
+    kind = action.get("type")
+    if kind == "play_card":
+        success, msg, _ = room.play_card(sid, None, action.get("target_sid"), card_id=action.get("card_id"))
+        return success, msg
+    if kind == "respond_action":
+        return room.handle_response(sid, None, target_area=action.get("target_area"),
+                                    extra_payload=action.get("extra_payload"), card_id=action.get("card_id"))
+    if kind == "end_turn": return room.try_end_turn(sid)
+    return False, f"未知动作 {kind}"
+
+def default_action(room: 'GameRoom', sid: str) -> Optional[Dict[str, Any]]:
+    """最保守的动作 (与超时的默认处理一致)：放弃响应 / 弃最后的牌 / 结束回合"""
+    legal = room.legal_actions(sid)
+    if legal.mode == "play": return {"type": "end_turn"}
+    if legal.mode != "respond": return None
+    if legal.pick_count:
+        return {"type": "respond_action", "extra_payload": {"card_ids": list(legal.answers[-legal.pick_count:])}}
+    if legal.can_pass: return {"type": "respond_action", "card_id": None}
+    if legal.areas: return {"type": "respond_action", "target_area": legal.areas[0]}
+    if legal.answers: return {"type": "respond_action", "card_id": legal.answers[0]}
+    return None
+
+# --- 响应 ---
+
+def _card_name(room: 'GameRoom', card_id: str) -> str:
+    card, _ = room.find_card(card_id)
+    return card.name if card else ""
+
+def _respond(room: 'GameRoom', p: 'Player', legal: LegalActions, rng) -> Dict[str, Any]:
+    act = room.pending_action
+    at = legal.action_type
+    answers = legal.answers
+
+    if legal.pick_count:
+        # 弃牌：弃留牌分数最低的
+        ranked = sorted(answers, key=lambda cid: _KEEP_SCORE.get(_card_name(room, cid), 0))
+        return {"type": "respond_action", "extra_payload": {"card_ids": ranked[:legal.pick_count]}}
+
+    use = None
+    if at in (PendingType.ASK_FOR_SHAN, PendingType.ASK_FOR_SHA):
+        use = answers[0] if answers else None
+    elif at == PendingType.ASK_FOR_PEACH:
+        # 各自为战：只救自己
+        if isinstance(act, PeachPending) and act.victim_sid == p.sid and answers: use = answers[0]
+    elif at == PendingType.ASK_FOR_WUXIE:
+        # 抵消针对自己的有害锦囊；已被抵消的不再跟
+        if (isinstance(act, WuxiePending) and answers and not act.nullified
+                and act.trick_target == p.sid and act.trick_name in _HARMFUL_TRICKS):
+            use = answers[0]
+    elif at == PendingType.ASK_FOR_CHOOSE_CARD:
+        use = max(answers, key=lambda cid: _KEEP_SCORE.get(_card_name(room, cid), 1), default=None)
+    elif legal.areas:
+        # 拆/顺：优先装备 (明牌，价值确定)，否则手牌
+        equips = [a for a in legal.areas if a != "hand"]
+        return {"type": "respond_action", "target_area": equips[0] if equips else legal.areas[0]}
+
+    if use is None and not legal.can_pass and answers: use = answers[0]
+    return {"type": "respond_action", "card_id": use}
+
+# --- 出牌阶段 ---
+
+def _play(room: 'GameRoom', p: 'Player', legal: LegalActions, rng) -> Dict[str, Any]:
+    by_name: Dict[str, List[PlayOption]] = {}
+    for option in legal.plays:
+        card, _ = room.find_card(option.card_id)
+        if card is not None and card.card_type in _EQUIP_TYPES and option.as_name == card.name:
+            # 装备直接上 (替换同类装备也无妨)
+            if p.equips.get(card.card_type.value) is None:
+                return {"type": "play_card", "card_id": option.card_id, "target_sid": None}
+            continue
+        by_name.setdefault(option.as_name, []).append(option)
+
+    for name in _PLAY_ORDER:
+        options = by_name.get(name)
+        if not options: continue
+        if name == "桃" and p.hp >= p.max_hp: continue
+        if name == "桃园结义" and p.hp >= p.max_hp: continue
+        option = options[0]
+        target = _pick_target(room, p, option, name, rng)
+        if option.targets is not None and target is None: continue
+        return {"type": "play_card", "card_id": option.card_id, "target_sid": target}
+    return {"type": "end_turn"}
+
+def _pick_target(room: 'GameRoom', p: 'Player', option: PlayOption, name: str, rng) -> Optional[str]:
+    if option.targets is None: return None
+    enemies = [room.get_player(sid) for sid in option.targets if sid != p.sid]
+    if not enemies: return None
+    if name in ("顺手牵羊", "过河拆桥"):
+        best = max(enemies, key=lambda t: (len(t.hand_cards) + sum(1 for c in t.equips.values() if c), rng.random()))
+    elif name == "乐不思蜀":
+        best = max(enemies, key=lambda t: (len(t.hand_cards), rng.random()))
+    else:
+        # 杀/决斗：打血最少的
+        best = min(enemies, key=lambda t: (t.hp, rng.random()))
+    return best.sid
@@ -1,24 +1,119 @@
+import sys
 from enum import Enum
-from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict
 
 # === 1. 卡牌类型枚举 ===
 class CardType(str, Enum):
     BASIC = "basic"              # 基本牌 (杀、闪、桃、酒)
     STRATEGY = "strategy"        # 锦囊牌 (无中生有、顺手牵羊、过河拆桥等)
+    DELAYED = "delayed"          # 延时锦囊 (乐不思蜀、闪电、兵粮寸断)
     EQUIP_WEAPON = "weapon"      # 装备：武器
     EQUIP_ARMOR = "armor"        # 装备：防具
     EQUIP_HORSE_PLUS = "horse_plus"   # 装备：+1马 (防御)
     EQUIP_HORSE_MINUS = "horse_minus" # 装备：-1马 (进攻)
 
-# === 2. 卡牌数据模型 ===
-class Card(BaseModel):
-    card_id: str                 # 唯一标识符 (例如: c1, c2...)
-    name: str                    # 名称 (例如: 杀, 麒麟弓, +1马)
-    suit: str                    # 花色 (heart, spade, club, diamond)
-    number: int                  # 点_数 (1-13)
-    card_type: CardType          # 类型
-    
-    # --- 扩展属性 ---
-    distance_limit: int = 0      # 某些锦囊的距离限制 (如顺手牵羊为1，其余为0表示无限制)
-    attack_range: int = 1        # 🌟 武器的攻击范围。默认为1，高级武器(如麒麟弓)会设置更高
\ No newline at end of file
+# === 2. 花色枚举 ===
+class Suit(str, Enum):
+    SPADE = "spade"
+    HEART = "heart"
+    CLUB = "club"
+    DIAMOND = "diamond"
+
+    def __str__(self) -> str:
+        return self.value
+
+    @property
+    def is_red(self) -> bool:
+        return self is Suit.HEART or self is Suit.DIAMOND
+
+# === 3. 卡牌数据模型 ===
+class Card:
+    """
+    引擎内部使用的紧凑卡牌 (不可变)
+    - uid 为该牌在牌堆目录中的整数下标，牌名/花色均为驻留字符串或枚举单例
+    - bit = 1 << uid，用于区域的位集合运算
+    - 只在发送给前端时通过 to_dict() 转为普通字典
+    """
+    __slots__ = ("uid", "bit", "card_id", "name", "suit", "number", "card_type",
+                 "distance_limit", "attack_range", "is_red", "is_black")
+
+    def __init__(self, uid: int, name: str, suit: Suit, number: int, card_type: CardType,
+                 distance_limit: int = 0, attack_range: int = 1):
+        suit = Suit(suit)
+        _set = object.__setattr__
+        _set(self, "uid", uid)                                  # 目录下标
+        _set(self, "bit", 1 << uid)                             # 位集合中的对应位
+        _set(self, "card_id", f"{name}-{suit.value}-{number}-{uid}") # 唯一标识符
+        _set(self, "name", sys.intern(name))                    # 名称 (例如: 杀, 麒麟弓, +1马)
+        _set(self, "suit", suit)                                # 花色
+        _set(self, "number", number)                            # 点数 (1-13)
+        _set(self, "card_type", card_type)                      # 类型
+        _set(self, "distance_limit", distance_limit)            # 某些锦囊的距离限制 (如顺手牵羊为1)
+        _set(self, "attack_range", attack_range)                # 🌟 武器的攻击范围
+        _set(self, "is_red", suit.is_red)
+        _set(self, "is_black", not suit.is_red)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Card 为不可变对象，转化请使用 VirtualCard")
+
+    def __repr__(self) -> str:
+        return f"Card({self.card_id})"
+
+    def __reduce__(self):
+        # 反序列化时映射回本进程卡牌目录中的同一对象，保持按身份比较的语义
+        return (_card_from_catalog, (self.uid,))
+
+    @property
+    def base(self) -> 'Card':
+        """实体牌 (普通牌即自身)"""
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为前端使用的字典"""
+        return {
+            "card_id": self.card_id,
+            "name": self.name,
+            "suit": self.suit.value,
+            "number": self.number,
+            "card_type": self.card_type.value,
+            "distance_limit": self.distance_limit,
+            "attack_range": self.attack_range,
+        }
+
+def _card_from_catalog(uid: int) -> Card:
+    from .engine import get_card_catalog
+    return get_card_catalog()[uid]
+
+# === 4. 转化牌覆盖层 ===
+class VirtualCard:
+    """
+    运行时转化产生的牌 (如国色：方块牌当【乐不思蜀】)
+    只覆盖 name / card_type，其余属性委托给实体牌；离开结算区域时应放回 base
+    """
+    __slots__ = ("base", "name", "card_type")
+
+    def __init__(self, base: Card, name: str, card_type: CardType):
+        _set = object.__setattr__
+        _set(self, "base", base.base)
+        _set(self, "name", sys.intern(name))
+        _set(self, "card_type", card_type)
+
+    def __getattr__(self, item):
+        if item == "base": raise AttributeError(item)
+        return getattr(self.base, item)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("VirtualCard 为不可变对象")
+
+    def __repr__(self) -> str:
+        return f"VirtualCard({self.name} <- {self.base.card_id})"
+
+    def __reduce__(self):
+        return (VirtualCard, (self.base, self.name, self.card_type))
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = self.base.to_dict()
+        data["name"] = self.name
+        data["card_type"] = self.card_type.value
+        data["original_name"] = self.base.name
+        return data
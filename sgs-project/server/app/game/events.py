@@ -0,0 +1,138 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .card import Card
+from .enums import PendingType
+from .zones import ZoneKind
+
+# 对所有人隐藏牌面的区域 (牌在这些区域之间移动时，旁观者只知道张数)
+HIDDEN_ZONES = frozenset((ZoneKind.DRAW, ZoneKind.HAND))
+
+# ==========================================
+# 领域事件：引擎在一条指令执行过程中追加到 room.events，
+# 传输层 (app/socket/events.py) 在指令结束后一次性取出并合并发送
+# ==========================================
+@dataclass(slots=True, eq=False)
+class GameEvent:
+    """事件基类；kind 为发送给前端的事件类型名"""
+    kind = "event"
+
+    def to_wire(self, viewer_sid: Optional[str] = None) -> Dict[str, Any]:
+        """viewer_sid 为 None 时生成公开版本 (隐藏信息被省略)"""
+        return {"type": self.kind}
+
+@dataclass(slots=True, eq=False)
+class Notice(GameEvent):
+    """系统提示 (前端 system_message 弹出的文字)"""
+    kind = "notice"
+    msg: str = ""
+
+    def to_wire(self, viewer_sid: Optional[str] = None) -> Dict[str, Any]:
+        return {"type": self.kind, "msg": self.msg}
+
+@dataclass(slots=True, eq=False)
+class CardsMoved(GameEvent):
+    """一批牌从同一区域移到同一区域 (src_kind 为 None 表示牌此前不在任何区域)"""
+    kind = "cards_moved"
+    cards: List[Card] = field(default_factory=list)
+    src_kind: Optional[ZoneKind] = None
+    src_owner: Optional[str] = None
+    dst_kind: Optional[ZoneKind] = None
+    dst_owner: Optional[str] = None
+
+    @property
+    def hidden(self) -> bool:
+        return (self.src_kind is None or self.src_kind in HIDDEN_ZONES) and self.dst_kind in HIDDEN_ZONES
+
+    def touches_hand_of(self) -> List[str]:
+        """手牌发生变化的玩家 sid"""
+        sids = []
+        if self.src_kind is ZoneKind.HAND and self.src_owner: sids.append(self.src_owner)
+        if self.dst_kind is ZoneKind.HAND and self.dst_owner and self.dst_owner not in sids: sids.append(self.dst_owner)
+        return sids
+
+    def to_wire(self, viewer_sid: Optional[str] = None) -> Dict[str, Any]:
+        data = {
+            "type": self.kind, "count": len(self.cards),
+            "from": self.src_kind.value if self.src_kind else None, "from_sid": self.src_owner,
+            "to": self.dst_kind.value if self.dst_kind else None, "to_sid": self.dst_owner,
+        }
+        # 手牌/牌堆之间的移动只对相关玩家展示牌面
+        if not self.hidden or (viewer_sid and viewer_sid in (self.src_owner, self.dst_owner)):
+            data["cards"] = [c.to_dict() for c in self.cards]
+        return data
+
+@dataclass(slots=True, eq=False)
+class CardPlayed(GameEvent):
+    """出牌阶段打出一张牌 (明牌；前端据此播放出牌动画)"""
+    kind = "card_played"
+    sid: str = ""
+    target_sid: Optional[str] = None
+    card: Optional[Card] = None
+
+    def to_wire(self, viewer_sid: Optional[str] = None) -> Dict[str, Any]:
+        return {"type": self.kind, "sid": self.sid, "target_sid": self.target_sid,
+                "card": self.card.to_dict() if self.card else None}
+
+@dataclass(slots=True, eq=False)
+class Damaged(GameEvent):
+    kind = "damaged"
+    sid: str = ""
+    amount: int = 0
+    source_sid: Optional[str] = None
+    card_name: Optional[str] = None
+
+    def to_wire(self, viewer_sid: Optional[str] = None) -> Dict[str, Any]:
+        return {"type": self.kind, "sid": self.sid, "amount": self.amount,
+                "source_sid": self.source_sid, "card_name": self.card_name}
+
+@dataclass(slots=True, eq=False)
+class HpChanged(GameEvent):
+    kind = "hp_changed"
+    sid: str = ""
+    hp: int = 0
+    delta: int = 0
+
+    def to_wire(self, viewer_sid: Optional[str] = None) -> Dict[str, Any]:
+        return {"type": self.kind, "sid": self.sid, "hp": self.hp, "delta": self.delta}
+
+@dataclass(slots=True, eq=False)
+class PromptOpened(GameEvent):
+    """出现新的等待响应 (pending_action 换了对象或换了响应者)"""
+    kind = "prompt_opened"
+    target_sid: str = ""
+    action_type: Optional[PendingType] = None
+    source_sid: Optional[str] = None
+
+    def to_wire(self, viewer_sid: Optional[str] = None) -> Dict[str, Any]:
+        return {"type": self.kind, "target_sid": self.target_sid,
+                "action_type": self.action_type.value if self.action_type else None,
+                "source_sid": self.source_sid}
+
+@dataclass(slots=True, eq=False)
+class AutoPassed(GameEvent):
+    """服务器替玩家放弃了一次响应 (无牌可出或玩家设置了自动放弃)"""
+    kind = "auto_passed"
+    sid: str = ""
+    action_type: Optional[PendingType] = None
+
+    def to_wire(self, viewer_sid: Optional[str] = None) -> Dict[str, Any]:
+        return {"type": self.kind, "sid": self.sid,
+                "action_type": self.action_type.value if self.action_type else None}
+
+@dataclass(slots=True, eq=False)
+class PlayerDied(GameEvent):
+    kind = "player_died"
+    sid: str = ""
+    killer_sid: Optional[str] = None
+
+    def to_wire(self, viewer_sid: Optional[str] = None) -> Dict[str, Any]:
+        return {"type": self.kind, "sid": self.sid, "killer_sid": self.killer_sid}
+
+@dataclass(slots=True, eq=False)
+class GameOver(GameEvent):
+    kind = "game_over"
+    winner_sid: Optional[str] = None
+
+    def to_wire(self, viewer_sid: Optional[str] = None) -> Dict[str, Any]:
+        return {"type": self.kind, "winner_sid": self.winner_sid}
@@ -0,0 +1,87 @@
+import json
+import os
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+GENERALS_PATH = os.path.join(os.path.dirname(__file__), "data/generals.json")
+
+@dataclass(frozen=True, slots=True)
+class GeneralInfo:
+    """单个武将的静态数据"""
+    id: str
+    name: str
+    kingdom: str
+    max_hp: int
+    skills: Tuple[str, ...]
+
+class GeneralCatalog:
+    """
+    不可变的武将目录 (进程内所有房间共享)
+    启动时从 generals.json 读取一次，之后的开房/开局不再有磁盘 IO 与 JSON 解析
+    """
+    __slots__ = ("generals", "ids", "by_id", "by_kingdom", "by_skill", "mtime")
+
+    def __init__(self, generals: List[GeneralInfo], mtime: float = 0.0):
+        self.generals: Tuple[GeneralInfo, ...] = tuple(generals)
+        self.ids: Tuple[str, ...] = tuple(g.id for g in self.generals)
+        self.by_id: Mapping[str, GeneralInfo] = MappingProxyType({g.id: g for g in self.generals})
+
+        kingdoms: Dict[str, List[GeneralInfo]] = {}
+        skills: Dict[str, List[GeneralInfo]] = {}
+        for g in self.generals:
+            kingdoms.setdefault(g.kingdom, []).append(g)
+            for s in g.skills:
+                skills.setdefault(s, []).append(g)
+        self.by_kingdom: Mapping[str, Tuple[GeneralInfo, ...]] = MappingProxyType({k: tuple(v) for k, v in kingdoms.items()})
+        self.by_skill: Mapping[str, Tuple[GeneralInfo, ...]] = MappingProxyType({k: tuple(v) for k, v in skills.items()})
+        self.mtime = mtime
+
+    def __len__(self) -> int:
+        return len(self.generals)
+
+    def __reduce__(self):
+        # 只读视图 (MappingProxyType) 不能序列化：传给工作进程时按武将列表重建索引
+        return (GeneralCatalog, (list(self.generals), self.mtime))
+
+    def get(self, general_id: str) -> Optional[GeneralInfo]:
+        return self.by_id.get(general_id)
+
+def load_general_catalog(path: str = GENERALS_PATH) -> GeneralCatalog:
+    """读取武将数据文件并构建目录 (文件不存在时返回空目录)"""
+    if not os.path.exists(path): return GeneralCatalog([])
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    generals = [
+        GeneralInfo(
+            id=g["id"], name=g["name"], kingdom=g["kingdom"],
+            max_hp=g["max_hp"], skills=tuple(g["skills"])
+        ) for g in raw
+    ]
+    return GeneralCatalog(generals, mtime=os.path.getmtime(path))
+
+_CATALOG: Optional[GeneralCatalog] = None
+
+def get_general_catalog() -> GeneralCatalog:
+    """获取全局武将目录 (首次调用时加载)"""
+    global _CATALOG
+    if _CATALOG is None:
+        _CATALOG = load_general_catalog()
+    return _CATALOG
+
+def reload_general_catalog(path: str = GENERALS_PATH, only_if_changed: bool = False) -> GeneralCatalog:
+    """
+    热更新：重新读取武将数据并整体替换全局目录
+    已开局的房间持有旧目录的引用，不受影响；解析失败时保留旧目录
+    """
+    global _CATALOG
+    if only_if_changed and _CATALOG is not None and os.path.exists(path):
+        if os.path.getmtime(path) == _CATALOG.mtime:
+            return _CATALOG
+    try:
+        _CATALOG = load_general_catalog(path)
+        print(f"🔄 武将目录已重新加载，共 {len(_CATALOG)} 名武将")
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ 武将目录重载失败，继续使用旧数据: {e}")
+        if _CATALOG is None: _CATALOG = GeneralCatalog([])
+    return _CATALOG
@@ -0,0 +1,219 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from .card import Card
+from .enums import GamePhase, PendingType
+from .pending import ChooseCardPending, DismantlePending, SnatchPending, YijiPending
+
+if TYPE_CHECKING:
+    from .player import Player
+    from .room import GameRoom
+
+# ==========================================
+# 合法动作生成器
+# 与 play_card / trigger_active_skill / handle_response 使用同一套校验，
+# 结果按房间状态版本 (room.version) 缓存，随询问一起发给前端，也供机器人枚举动作
+# ==========================================
+
+@dataclass(slots=True)
+class PlayOption:
+    """出牌阶段的一种出法：card_id 视为 as_name 使用；targets 为 None 表示无需指定目标"""
+    card_id: str
+    as_name: str
+    targets: Optional[Tuple[str, ...]] = None
+
+    def to_wire(self) -> Dict[str, Any]:
+        return {"card_id": self.card_id, "as": self.as_name,
+                "targets": list(self.targets) if self.targets is not None else None}
+
+@dataclass(slots=True)
+class SkillOption:
+    """可发动的主动技：可选的牌与目标 (min_cards/max_cards 为所需牌数)"""
+    name: str
+    cards: Tuple[str, ...] = ()
+    targets: Tuple[str, ...] = ()
+    min_cards: int = 0
+    max_cards: int = 0
+    min_targets: int = 0
+
+    def to_wire(self) -> Dict[str, Any]:
+        return {"name": self.name, "cards": list(self.cards), "targets": list(self.targets),
+                "min_cards": self.min_cards, "max_cards": self.max_cards, "min_targets": self.min_targets}
+
+@dataclass(slots=True)
+class LegalActions:
+    """
+    某名玩家在当前状态下的全部合法动作
+    mode: "play" 出牌阶段 / "respond" 需要响应询问 / "wait" 无事可做
+    """
+    sid: str
+    version: int
+    mode: str = "wait"
+    plays: List[PlayOption] = field(default_factory=list)
+    skills: List[SkillOption] = field(default_factory=list)
+    can_end_turn: bool = False
+    # --- 响应询问时 ---
+    action_type: Optional[PendingType] = None
+    answers: Tuple[str, ...] = ()      # 可用于响应的牌 (手牌 card_id / 五谷亮出的牌)
+    areas: Tuple[str, ...] = ()        # 拆/顺可选的区域
+    targets: Tuple[str, ...] = ()      # 遗计可分给的角色
+    pick_count: int = 0                # 弃牌数量
+    can_pass: bool = False
+
+    def to_wire(self) -> Dict[str, Any]:
+        return {
+            "sid": self.sid, "version": self.version, "mode": self.mode,
+            "plays": [o.to_wire() for o in self.plays],
+            "skills": [o.to_wire() for o in self.skills],
+            "can_end_turn": self.can_end_turn,
+            "action_type": self.action_type.value if self.action_type else None,
+            "answers": list(self.answers), "areas": list(self.areas), "targets": list(self.targets),
+            "pick_count": self.pick_count, "can_pass": self.can_pass,
+        }
+
+def generate_legal_actions(room: 'GameRoom', sid: str) -> LegalActions:
+    result = LegalActions(sid, room.version)
+    p = room.get_player(sid)
+    if not p or not p.is_alive or room.phase == GamePhase.GAME_OVER: return result
+
+    act = room.pending_action
+    if act is not None:
+        if act.accepts(sid): _fill_response(room, p, act, result)
+        return result
+
+    if room.phase == GamePhase.PLAY and room.players[room.current_player_idx] is p:
+        result.mode = "play"
+        result.can_end_turn = True
+        result.plays = _play_options(room, p)
+        result.skills = _skill_options(room, p)
+    return result
+
+# --- 出牌阶段 ---
+
+def _play_options(room: 'GameRoom', p: 'Player') -> List[PlayOption]:
+    options: List[PlayOption] = []
+    everyone = [p] + list(room.iter_alive_from(p))
+    for card in p.hand_cards:
+        # 不指定目标的出法 (装备、桃、无中、AOE、闪电...)
+        handler, name, _ = room.play_handler(p, card, None)
+        if handler and handler.validate(room, p, card, None)[0]:
+            options.append(PlayOption(card.card_id, name, None))
+            # 指定目标时若会被隐式转化为杀 (武圣/龙胆)，继续列出杀的目标
+            if not p.hooks.transform_to_sha: continue
+
+        # 指定目标的出法：目标不同可能对应不同处理器 (隐式转化)，逐个目标校验
+        by_name: Dict[str, List[str]] = {}
+        for target in everyone:
+            handler, name, _ = room.play_handler(p, card, target.sid)
+            if not handler or not room.can_target(p, target, name): continue
+            if handler.validate(room, p, card, target.sid)[0]:
+                by_name.setdefault(name, []).append(target.sid)
+        for name, sids in by_name.items():
+            if any(o.card_id == card.card_id and o.as_name == name for o in options): continue
+            options.append(PlayOption(card.card_id, name, tuple(sids)))
+    return options
+
+# 主动技的牌/目标要求：出牌阶段生成可选项与 trigger_active_skill 发动前校验共用这一张表
+_CardFilter = Callable[['Player', Card], bool]
+_TargetFilter = Callable[['GameRoom', 'Player', 'Player'], bool]
+
+def _any_card(p: 'Player', c: Card) -> bool: return True
+def _other(room: 'GameRoom', p: 'Player', t: 'Player') -> bool: return t is not p
+
+@dataclass(frozen=True, slots=True)
+class ActiveSkillRule:
+    """
+    主动技的牌/目标要求 (max_cards 为 0 表示不需要牌，target_filter 为 None 表示不需要目标)
+    card_hint / target_hint 为所选牌或目标不满足筛选条件时的提示
+    """
+    card_filter: _CardFilter
+    min_cards: int
+    max_cards: int
+    target_filter: Optional[_TargetFilter]
+    min_targets: int
+    max_targets: int
+    card_hint: str = "所选的牌不符合要求"
+    target_hint: str = "目标无效"
+
+    def check(self, room: 'GameRoom', p: 'Player', cards: List[Card], targets: List['Player']) -> Tuple[bool, str]:
+        if self.max_cards:
+            if not self.min_cards <= len(cards) <= self.max_cards:
+                return False, _count_hint("牌", self.min_cards, self.max_cards)
+            if not all(self.card_filter(p, c) for c in cards): return False, self.card_hint
+        if self.target_filter is not None:
+            if not self.min_targets <= len(targets) <= self.max_targets:
+                return False, _count_hint("名目标", self.min_targets, self.max_targets)
+            if len({t.sid for t in targets}) != len(targets): return False, "目标不能重复"
+            if not all(t.is_alive and self.target_filter(room, p, t) for t in targets): return False, self.target_hint
+        return True, ""
+
+def _count_hint(unit: str, low: int, high: int) -> str:
+    if low == high: return f"需选择 {low} {unit}"
+    return f"需选择至少 {low} {unit}"
+
+ACTIVE_SKILL_RULES: Dict[str, ActiveSkillRule] = {
+    "qixi": ActiveSkillRule(lambda p, c: c.is_black, 1, 1, _other, 1, 1, card_hint="必须是黑色牌"),
+    "guose": ActiveSkillRule(lambda p, c: c.suit == "diamond", 1, 1,
+                             lambda room, p, t: room.can_target(p, t, "乐不思蜀") and not t.judging_cards.has_name("乐不思蜀"), 1, 1,
+                             card_hint="必须是方块牌", target_hint="目标不能成为乐不思蜀的目标或已有乐不思蜀"),
+    "lijian": ActiveSkillRule(_any_card, 1, 1, _other, 2, 2),
+    "rende": ActiveSkillRule(_any_card, 1, 99, _other, 1, 1),
+    "qingnang": ActiveSkillRule(_any_card, 1, 1, lambda room, p, t: t.hp < t.max_hp, 1, 1, target_hint="目标体力已满"),
+    "kurou": ActiveSkillRule(_any_card, 0, 0, None, 0, 0),
+    "zhiheng": ActiveSkillRule(_any_card, 1, 99, None, 0, 0),
+    "jieyin": ActiveSkillRule(_any_card, 2, 2, lambda room, p, t: t is not p and (p.hp < p.max_hp or t.hp < t.max_hp), 1, 1,
+                              target_hint="双方体力均已满"),
+    "fanjian": ActiveSkillRule(_any_card, 0, 0, _other, 1, 1),
+}
+
+def _skill_options(room: 'GameRoom', p: 'Player') -> List[SkillOption]:
+    options: List[SkillOption] = []
+    alive = [p] + list(room.iter_alive_from(p))
+    for name in p.skills:
+        rule = ACTIVE_SKILL_RULES.get(name)
+        if rule is None: continue
+        cards = tuple(c.card_id for c in p.hand_cards if rule.card_filter(p, c)) if rule.max_cards else ()
+        if len(cards) < rule.min_cards: continue
+        targets = tuple(t.sid for t in alive if rule.target_filter(room, p, t)) if rule.target_filter else ()
+        if len(targets) < rule.min_targets: continue
+        options.append(SkillOption(name, cards, targets, rule.min_cards, rule.max_cards, rule.min_targets))
+    return options
+
+# --- 响应询问 ---
+
+def _fill_response(room: 'GameRoom', p: 'Player', act, result: LegalActions):
+    result.mode = "respond"
+    result.action_type = act.action_type
+    at = act.action_type
+
+    if at == PendingType.ASK_FOR_SHAN:
+        result.answers = tuple(c.card_id for c in p.hand_cards if p.hooks.can_use_as(c, "闪"))
+        result.can_pass = True
+    elif at == PendingType.ASK_FOR_SHA:
+        result.answers = tuple(c.card_id for c in p.hand_cards if p.hooks.can_use_as(c, "杀"))
+        result.can_pass = True
+    elif at == PendingType.ASK_FOR_PEACH:
+        mask = room.rescue_mask(p)
+        result.answers = tuple(c.card_id for c in p.hand_cards if c.bit & mask)
+        result.can_pass = True
+    elif at == PendingType.ASK_FOR_WUXIE:
+        result.answers = tuple(c.card_id for c in p.hand_cards if p.hooks.can_use_as(c, "无懈可击"))
+        result.can_pass = True
+    elif at == PendingType.ASK_FOR_DISCARD:
+        result.answers = tuple(c.card_id for c in p.hand_cards)
+        result.pick_count = act.discard_count
+    elif isinstance(act, (DismantlePending, SnatchPending)):
+        victim = room.get_player(act.victim_sid)
+        if victim:
+            areas = ["hand"] if victim.hand_cards else []
+            areas += [slot for slot, c in victim.equips.items() if c]
+            result.areas = tuple(areas)
+    elif isinstance(act, ChooseCardPending):
+        result.answers = tuple(c.card_id for c in act.wugu_cards)
+    elif isinstance(act, YijiPending):
+        result.answers = tuple(cid for cid in act.draw_cards if room.resolve_hand_card(p, card_id=cid))
+        result.targets = tuple(t.sid for t in room.iter_alive_from(p))
+        result.can_pass = True
+    else:
+        # 确认类询问 (刚烈、技能确认、借刀...)：发动或放弃
+        result.can_pass = True
@@ -0,0 +1,268 @@
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Tuple, TYPE_CHECKING
+
+from .bot import decide as heuristic_decide, default_action, perform
+from .enums import GamePhase, PendingType
+
+if TYPE_CHECKING:
+    from .room import GameRoom
+
+# ==========================================
+# 蒙特卡洛树搜索机器人 (单观察者信息集 MCTS)
+# - 每次模拟先对房间克隆做一次确定化：观察者看不到的牌 (其他角色的手牌 + 摸牌堆) 洗匀后按原张数重新分配
+# - 之后完全由真实的 GameRoom 规则推演；树只记录观察者自己的决策，其他角色按启发式策略 (bot.decide) 行动
+# - 选择阶段用 UCB1，只在本次确定化中可用的子节点间比较 (以可用次数代替父节点访问次数)
+# - 每次模拟最多推进 ROLLOUT_DEPTH 个动作，未分胜负时按存活角色的体力与手牌估值
+# 推演会触发引擎的调试打印，线上应在工作进程中运行 (见 app/socket/bots.py)
+# ==========================================
+
+Action = Dict[str, Any]
+
+DEFAULT_PLAYOUTS = 200
+ROLLOUT_DEPTH = 120      # 单次模拟最多推进的动作数 (含其他角色)
+EXPLORATION = 0.7        # UCB1 探索系数 (奖励在 [0, 1] 之间)
+ROLLOUT_EPSILON = 0.1    # 模拟中改为随机动作的概率 (避免启发式策略的固定套路)
+
+@dataclass(slots=True, eq=False)
+class _Node:
+    visits: int = 0
+    value: float = 0.0
+    avail: int = 0
+    children: Dict[Hashable, '_Node'] = field(default_factory=dict)
+
+@dataclass(slots=True)
+class SearchResult:
+    """一次搜索的结果；stats 为根节点各动作的 (访问次数, 平均奖励)"""
+    action: Optional[Action]
+    playouts: int
+    seconds: float
+    stats: Dict[Hashable, Tuple[int, float]] = field(default_factory=dict)
+
+    @property
+    def playouts_per_second(self) -> float:
+        return self.playouts / self.seconds if self.seconds > 0 else 0.0
+
+# --- 动作枚举 ---
+
+def _card_name(room: 'GameRoom', card_id: str) -> str:
+    card, _ = room.find_card(card_id)
+    return card.name if card else ""
+
+def candidate_actions(room: 'GameRoom', sid: str) -> List[Tuple[Hashable, Action]]:
+    """
+    sid 当前可选的动作及其在搜索树中的键
+    键只描述观察者能看到的信息 (牌名、颜色、目标)，不同确定化样本里的同一种出法对应同一子节点；
+    等价的出法只保留一个，弃牌只考虑启发式与默认两种弃法，遗计只考虑不分牌
+    """
+    legal = room.legal_actions(sid)
+    found: Dict[Hashable, Action] = {}
+    if legal.mode == "play":
+        for option in legal.plays:
+            card, _ = room.find_card(option.card_id)
+            if card is None: continue
+            for target in option.targets if option.targets is not None else (None,):
+                key = ("play", option.as_name, card.name, card.is_red, target)
+                found.setdefault(key, {"type": "play_card", "card_id": option.card_id, "target_sid": target})
+        found[("end_turn",)] = {"type": "end_turn"}
+    elif legal.mode == "respond":
+        if legal.pick_count:
+            for action in (heuristic_decide(room, sid), default_action(room, sid)):
+                if action is None: continue
+                names = tuple(sorted(_card_name(room, cid) for cid in action["extra_payload"]["card_ids"]))
+                found.setdefault(("discard",) + names, action)
+        elif legal.areas:
+            for area in legal.areas:
+                found[("area", area)] = {"type": "respond_action", "target_area": area}
+        else:
+            if not legal.targets:
+                for cid in legal.answers:
+                    card, _ = room.find_card(cid)
+                    if card is None: continue
+                    found.setdefault(("respond", card.name, card.is_red), {"type": "respond_action", "card_id": cid})
+            if legal.action_type == PendingType.ASK_FOR_GANGLIE:
+                found[("area", "confirm")] = {"type": "respond_action", "target_area": "confirm"}
+            if legal.can_pass:
+                found[("pass",)] = {"type": "respond_action", "card_id": None}
+    return list(found.items())
+
+# --- 确定化与估值 ---
+
+def determinize(room: 'GameRoom', observer: str, rng: random.Random) -> 'GameRoom':
+    """
+    克隆房间，并把 observer 看不到的牌 (其他角色的手牌与摸牌堆) 洗匀后按原张数分回
+    记牌器中 observer 已知的手牌 (公开的、自己交出的) 留在原主手中
+    """
+    twin = room.clone(seed=rng.getrandbits(32))
+    tracker = twin.tracker
+    tracker.keep_private_of(observer)
+    deals = []
+    pool = []
+    for q in twin.players:
+        if q.sid == observer or not q.hand_cards: continue
+        kept, hidden = [], []
+        for c in q.hand_cards: (kept if tracker.is_known(c, q.sid, observer) else hidden).append(c)
+        if not hidden: continue
+        deals.append((q.hand_cards, kept))
+        pool.extend(hidden)
+    deals.append((twin.deck.draw_pile, []))
+    pool.extend(twin.deck.draw_pile)
+    rng.shuffle(pool)
+    start = 0
+    for zone, kept in deals:
+        end = start + len(zone) - len(kept)
+        zone.reset(kept + pool[start:end])
+        start = end
+    return twin
+
+def evaluate(room: 'GameRoom', sid: str) -> float:
+    """sid 的局面评分 (0~1)：胜负已分时为 1/0，否则为其体力与手牌在存活角色中的占比"""
+    if room.phase == GamePhase.GAME_OVER: return 1.0 if room.winner_sid == sid else 0.0
+    me = room.get_player(sid)
+    if me is None or not me.is_alive: return 0.0
+    total = sum(q.hp + 0.25 * len(q.hand_cards) for q in room.players if q.is_alive)
+    return (me.hp + 0.25 * len(me.hand_cards)) / total if total > 0 else 0.0
+
+# --- 搜索 ---
+
+def _select(node: _Node, choices: List[Tuple[Hashable, Action]], rng: random.Random) -> Tuple[Hashable, _Node, bool]:
+    """在本次确定化可用的动作中选择子节点；有未尝试的动作时扩展一个 (返回值第三项为 True)"""
+    untried = []
+    for key, _ in choices:
+        child = node.children.get(key)
+        if child is None: untried.append(key)
+        else: child.avail += 1
+    if untried:
+        key = rng.choice(untried)
+        child = node.children[key] = _Node(avail=1)
+        return key, child, True
+
+    def ucb(key: Hashable) -> float:
+        child = node.children[key]
+        return child.value / child.visits + EXPLORATION * math.sqrt(math.log(child.avail) / child.visits)
+    key = max((key for key, _ in choices), key=ucb)
+    return key, node.children[key], False
+
+def _rollout_action(room: 'GameRoom', sid: str, rng: random.Random) -> Optional[Action]:
+    if rng.random() < ROLLOUT_EPSILON:
+        choices = candidate_actions(room, sid)
+        if choices: return rng.choice(choices)[1]
+    return heuristic_decide(room, sid, rng=rng)
+
+def _playout(room: 'GameRoom', observer: str, root: _Node, rng: random.Random, depth: int):
+    state = determinize(room, observer, rng)
+    node, path, in_tree = root, [root], True
+    for _ in range(depth):
+        if state.phase == GamePhase.GAME_OVER: break
+        actors = state.acting_sids()
+        if not actors: break
+        sid = actors[0]
+        action = None
+        if sid == observer and in_tree:
+            choices = candidate_actions(state, sid)
+            if choices:
+                key, node, expanded = _select(node, choices, rng)
+                path.append(node)
+                action = dict(choices)[key]
+                in_tree = not expanded
+        if action is None: action = _rollout_action(state, sid, rng)
+        if action is None or not perform(state, sid, action)[0]:
+            fallback = default_action(state, sid)
+            if fallback is None or not perform(state, sid, fallback)[0]: break
+
+    reward = evaluate(state, observer)
+    for n in path:
+        n.visits += 1
+        n.value += reward
+
+def _root_stats(root: _Node) -> Dict[Hashable, Tuple[int, float]]:
+    return {key: (n.visits, n.value / n.visits) for key, n in root.children.items() if n.visits}
+
+def _best_key(stats: Dict[Hashable, Tuple[int, float]]) -> Optional[Hashable]:
+    if not stats: return None
+    return max(stats, key=lambda key: stats[key])
+
+def search(room: 'GameRoom', sid: str, playouts: int = DEFAULT_PLAYOUTS, deadline: Optional[float] = None,
+           rng: Optional[random.Random] = None, depth: int = ROLLOUT_DEPTH) -> SearchResult:
+    """
+    在 room 上为 sid 搜索一条动作 (不修改 room)
+    最多 playouts 次模拟，deadline (time.monotonic() 时间戳) 到达时提前结束；选择访问次数最多的动作
+    """
+    rng = rng or random.Random()
+    started = time.perf_counter()
+    candidates = dict(candidate_actions(room, sid))
+    if len(candidates) <= 1:
+        return SearchResult(next(iter(candidates.values()), None), 0, 0.0)
+
+    root = _Node()
+    done = 0
+    while done < playouts and (deadline is None or time.monotonic() < deadline):
+        _playout(room, sid, root, rng, depth)
+        done += 1
+    stats = _root_stats(root)
+    key = _best_key(stats)
+    action = candidates.get(key) if key is not None else heuristic_decide(room, sid, rng=rng)
+    return SearchResult(action, done, time.perf_counter() - started, stats)
+
+def decide(room: 'GameRoom', sid: str, deadline: Optional[float] = None,
+           rng: Optional[random.Random] = None, playouts: int = DEFAULT_PLAYOUTS) -> Optional[Action]:
+    """与 bot.decide 相同的接口：在时间预算内搜索并返回动作"""
+    if room.get_player(sid) is None: return None
+    return search(room, sid, playouts, deadline, rng).action
+
+# --- 多进程 (根并行) ---
+
+def quiet_worker():
+    """工作进程初始化：推演中的调试打印没有意义，直接丢弃"""
+    sys.stdout = open(os.devnull, "w")
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+
+def _process_pool(processes: int) -> ProcessPoolExecutor:
+    pool = _pools.get(processes)
+    if pool is None:
+        pool = _pools[processes] = ProcessPoolExecutor(max_workers=processes, initializer=quiet_worker)
+    return pool
+
+def _search_worker(room: 'GameRoom', sid: str, playouts: int, seconds: Optional[float],
+                   seed: int, depth: int) -> Tuple[int, Dict[Hashable, Tuple[int, float]]]:
+    deadline = time.monotonic() + seconds if seconds is not None else None
+    result = search(room, sid, playouts, deadline, random.Random(seed), depth)
+    return result.playouts, result.stats
+
+def parallel_search(room: 'GameRoom', sid: str, playouts: int = DEFAULT_PLAYOUTS, seconds: Optional[float] = None,
+                    processes: int = 2, seed: Optional[int] = None, depth: int = ROLLOUT_DEPTH) -> SearchResult:
+    """
+    根并行搜索：各进程用不同的随机源各自建树 (模拟次数平分)，合并根节点统计后选访问次数最多的动作
+    房间克隆随任务序列化到工作进程，卡牌与武将目录在工作进程中映射回本地的同一份目录
+    """
+    started = time.perf_counter()
+    candidates = dict(candidate_actions(room, sid))
+    if len(candidates) <= 1:
+        return SearchResult(next(iter(candidates.values()), None), 0, 0.0)
+
+    rng = random.Random(seed)
+    snapshot = room.clone()
+    shares = [playouts // processes + (1 if i < playouts % processes else 0) for i in range(processes)]
+    pool = _process_pool(processes)
+    futures = [pool.submit(_search_worker, snapshot, sid, share, seconds, rng.getrandbits(32), depth)
+               for share in shares if share]
+
+    done = 0
+    totals: Dict[Hashable, List[float]] = {}
+    for future in futures:
+        count, stats = future.result()
+        done += count
+        for key, (visits, mean) in stats.items():
+            total = totals.setdefault(key, [0, 0.0])
+            total[0] += visits
+            total[1] += visits * mean
+    stats = {key: (int(v), value / v) for key, (v, value) in totals.items() if v}
+    key = _best_key(stats)
+    action = candidates.get(key) if key is not None else heuristic_decide(room, sid, rng=rng)
+    return SearchResult(action, done, time.perf_counter() - started, stats)
@@ -0,0 +1,253 @@
+import copy
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, field_serializer
+
+from .card import Card, VirtualCard
+from .enums import PendingType
+
+# ==========================================
+# 对外协议 (只在发送给前端时构造)
+# ==========================================
+class PendingAction(BaseModel):
+    """当前正在等待的交互详情"""
+    source_sid: str                          # 发起者 (谁出的牌/谁触发的技能)
+    target_sid: str                          # 当前需要响应的玩家
+    card_id: Optional[str] = None            # 关联卡牌ID (用于前端显示来源)
+    action_type: PendingType                 # 响应类型 (出杀/出闪/选牌/技能确认/弃牌...)
+    extra_data: Dict[str, Any] = {}          # 复杂上下文 (如五谷的牌堆、AOE的队列、弃牌数量等)
+
+    @field_serializer("extra_data")
+    def _serialize_extra(self, extra: Dict[str, Any]) -> Dict[str, Any]:
+        """引擎内部的卡牌对象只在发往前端时转换为字典"""
+        return {k: _card_to_wire(v) for k, v in extra.items()}
+
+def _card_to_wire(value: Any) -> Any:
+    if isinstance(value, (Card, VirtualCard)): return value.to_dict()
+    if isinstance(value, list): return [_card_to_wire(v) for v in value]
+    return value
+
+# ==========================================
+# 引擎内部状态 (按交互类型划分的轻量数据类)
+# ==========================================
+@dataclass(slots=True, eq=False)
+class Pending:
+    """挂起交互的公共字段；无额外上下文的交互 (出闪、借刀) 直接使用本类"""
+    source_sid: str
+    target_sid: str
+    action_type: PendingType
+    card_id: Optional[str] = None
+
+    def extra(self) -> Dict[str, Any]:
+        """前端 extra_data 字段的内容 (键名与旧版协议保持一致)"""
+        return {}
+
+    def accepts(self, sid: str) -> bool:
+        """sid 当前是否可以响应本交互"""
+        return self.target_sid == sid
+
+    def clone(self) -> 'Pending':
+        """浅复制，列表/字典字段 (队列、亮出的牌、已收集的响应) 单独复制，以便克隆房间独立推进"""
+        twin = copy.copy(self)
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if isinstance(value, (list, dict)): setattr(twin, f.name, value.copy())
+        return twin
+
+    def to_schema(self) -> PendingAction:
+        return PendingAction(
+            source_sid=self.source_sid, target_sid=self.target_sid,
+            card_id=self.card_id, action_type=self.action_type,
+            extra_data=self.extra()
+        )
+
+    def to_wire(self) -> Dict[str, Any]:
+        """等价于 to_schema().model_dump()，但跳过校验直接构造字典 (每次广播都会调用)"""
+        return {
+            "source_sid": self.source_sid, "target_sid": self.target_sid,
+            "card_id": self.card_id, "action_type": self.action_type,
+            "extra_data": {k: _card_to_wire(v) for k, v in self.extra().items()},
+        }
+
+@dataclass(slots=True, eq=False)
+class DiscardPending(Pending):
+    """弃牌阶段：弃置 discard_count 张手牌"""
+    action_type: PendingType = PendingType.ASK_FOR_DISCARD
+    discard_count: int = 0
+
+    def extra(self) -> Dict[str, Any]:
+        return {"discard_count": self.discard_count}
+
+@dataclass(slots=True, eq=False)
+class DismantlePending(Pending):
+    """过河拆桥 / 奇袭：由发起者选择 victim_sid 的一张牌弃置"""
+    action_type: PendingType = PendingType.ASK_FOR_DISMANTLE
+    victim_sid: str = ""
+
+    def extra(self) -> Dict[str, Any]:
+        return {"target_to_dismantle": self.victim_sid}
+
+@dataclass(slots=True, eq=False)
+class SnatchPending(Pending):
+    """顺手牵羊 / 反馈：获得 victim_sid 的一张牌"""
+    action_type: PendingType = PendingType.ASK_FOR_SNATCH
+    victim_sid: str = ""
+    skill_name: Optional[str] = None
+    msg: Optional[str] = None
+
+    def extra(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"target_to_snatch": self.victim_sid}
+        if self.skill_name: data["skill_name"] = self.skill_name
+        if self.msg: data["msg"] = self.msg
+        return data
+
+@dataclass(slots=True, eq=False)
+class AoePending(Pending):
+    """南蛮入侵 / 万箭齐发：按 aoe_targets 顺序逐个询问"""
+    aoe_targets: List[str] = field(default_factory=list)
+    current_index: int = 0
+    card_name: str = ""
+
+    def advance(self) -> bool:
+        """轮到队列中的下一位，队列结束时返回 False"""
+        nxt = self.current_index + 1
+        if nxt >= len(self.aoe_targets): return False
+        self.current_index = nxt
+        self.target_sid = self.aoe_targets[nxt]
+        return True
+
+    def extra(self) -> Dict[str, Any]:
+        return {"aoe_targets": self.aoe_targets, "current_index": self.current_index, "card_name": self.card_name}
+
+@dataclass(slots=True, eq=False)
+class AoeWindowPending(AoePending):
+    """
+    AOE 同时响应窗口：所有目标同时被询问，waiting 中的玩家都可以响应
+    响应先记录在 responses 中 (sid -> 打出的牌，放弃为 None)，收齐或超时后按 aoe_targets 座次结算
+    target_sid 始终指向第一位尚未响应的玩家 (兼容只认单一响应者的前端)
+    """
+    waiting: List[str] = field(default_factory=list)
+    responses: Dict[str, Optional[Card]] = field(default_factory=dict)
+    deadline: float = 0.0        # 截止时间 (time.time() 时间戳)
+
+    def accepts(self, sid: str) -> bool:
+        return sid in self.waiting
+
+    def record(self, sid: str, card: Optional[Card]) -> bool:
+        """记录一名玩家的响应，返回窗口是否已收齐"""
+        self.responses[sid] = card
+        self.waiting.remove(sid)
+        if self.waiting: self.target_sid = self.waiting[0]
+        return not self.waiting
+
+    def extra(self) -> Dict[str, Any]:
+        return {"aoe_targets": self.aoe_targets, "current_index": self.current_index, "card_name": self.card_name,
+                "simultaneous": True, "waiting": self.waiting, "deadline": self.deadline}
+
+@dataclass(slots=True, eq=False)
+class WuxiePending(Pending):
+    """
+    无懈可击窗口：锦囊生效前同时询问所有持有无懈可击的角色
+    有人打出后 nullified 翻转、chain +1，并对剩余持有者重新开窗 (可以无懈对无懈)；
+    所有人放弃或超时后关闭，未被抵消则把 effect 步骤压栈，被抵消则压入 cancel 步骤 (如有)
+    """
+    action_type: PendingType = PendingType.ASK_FOR_WUXIE
+    trick_name: str = ""
+    trick_target: Optional[str] = None
+    effect: Tuple[Any, ...] = ()              # (房间方法名, 参数...)
+    cancel: Optional[Tuple[Any, ...]] = None
+    nullified: bool = False
+    chain: int = 0
+    waiting: List[str] = field(default_factory=list)
+    deadline: float = 0.0
+
+    def accepts(self, sid: str) -> bool:
+        return sid in self.waiting
+
+    def reopen(self, holders: List[str], deadline: float):
+        self.waiting = holders
+        self.target_sid = holders[0]
+        self.deadline = deadline
+
+    def record_pass(self, sid: str) -> bool:
+        """记录一名角色放弃，返回窗口是否已无人等待"""
+        self.waiting.remove(sid)
+        if self.waiting: self.target_sid = self.waiting[0]
+        return not self.waiting
+
+    def extra(self) -> Dict[str, Any]:
+        return {"trick_name": self.trick_name, "trick_target": self.trick_target, "nullified": self.nullified,
+                "chain": self.chain, "waiting": self.waiting, "deadline": self.deadline}
+
+@dataclass(slots=True, eq=False)
+class ChooseCardPending(Pending):
+    """五谷丰登：按 aoe_targets 顺序从亮出的牌中各选一张"""
+    action_type: PendingType = PendingType.ASK_FOR_CHOOSE_CARD
+    wugu_cards: List[Card] = field(default_factory=list)
+    aoe_targets: List[str] = field(default_factory=list)
+    current_index: int = 0
+
+    def extra(self) -> Dict[str, Any]:
+        return {"wugu_cards": self.wugu_cards, "aoe_targets": self.aoe_targets, "current_index": self.current_index}
+
+@dataclass(slots=True, eq=False)
+class DuelPending(Pending):
+    """决斗 / 离间：双方轮流出杀"""
+    action_type: PendingType = PendingType.ASK_FOR_SHA
+    duel_source: str = ""
+    duel_target: str = ""
+
+    def opponent_of(self, sid: str) -> str:
+        return self.duel_source if sid == self.duel_target else self.duel_target
+
+    def extra(self) -> Dict[str, Any]:
+        return {"is_duel": True, "duel_source": self.duel_source, "duel_target": self.duel_target,
+                "current_turn": self.target_sid}
+
+@dataclass(slots=True, eq=False)
+class SkillConfirmPending(Pending):
+    """是否发动某技能 (如奸雄)"""
+    action_type: PendingType = PendingType.ASK_FOR_SKILL_CONFIRM
+    skill_name: str = ""
+    transform_name: str = ""
+    related_card_id: Optional[str] = None
+    msg: str = ""
+
+    def extra(self) -> Dict[str, Any]:
+        return {"skill_name": self.skill_name, "transform_name": self.transform_name,
+                "card_id": self.related_card_id, "msg": self.msg}
+
+@dataclass(slots=True, eq=False)
+class PeachPending(Pending):
+    """濒死求桃：按座次只询问 rescuers 中能救助的角色 (target_sid 为当前被询问者)"""
+    action_type: PendingType = PendingType.ASK_FOR_PEACH
+    victim_sid: str = ""
+    killer_sid: Optional[str] = None
+    rescuers: List[str] = field(default_factory=list)
+    current_index: int = 0
+
+    def extra(self) -> Dict[str, Any]:
+        return {"dying_sid": self.victim_sid, "rescuers": self.rescuers, "current_index": self.current_index}
+
+@dataclass(slots=True, eq=False)
+class YijiPending(Pending):
+    """遗计：分配刚摸到的牌"""
+    action_type: PendingType = PendingType.ASK_FOR_YIJI
+    draw_cards: List[str] = field(default_factory=list)
+
+    def extra(self) -> Dict[str, Any]:
+        return {"draw_cards": self.draw_cards, "draw_count": len(self.draw_cards)}
+
+@dataclass(slots=True, eq=False)
+class GangliePending(Pending):
+    """刚烈：是否对伤害来源发动"""
+    action_type: PendingType = PendingType.ASK_FOR_GANGLIE
+    damage_source_sid: str = ""
+    msg: str = ""
+
+    def extra(self) -> Dict[str, Any]:
+        return {"source_sid": self.damage_source_sid, "msg": self.msg}
+
+# 同时询问多名角色的窗口 (都有 waiting 与 deadline)
+WINDOW_PENDINGS = (AoeWindowPending, WuxiePending)
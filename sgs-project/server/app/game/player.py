@@ -1,46 +1,126 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
-from .card import Card
+from dataclasses import dataclass, field, fields
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from .skills.general import SkillHooks
+from .zones import CardRegistry, CardZone, EquipZone, ZoneKind
 
-class Player(BaseModel):
+@dataclass(slots=True, eq=False)
+class Player:
+    """
+    引擎内部的玩家状态 (轻量数据类，每局被修改成百上千次)
+    发送给前端时通过 to_wire() / to_schema() 转换为 PlayerSchema 的结构
+    """
     # === 基础连接信息 ===
     sid: str
     seat_id: int
     is_host: bool = False
     is_ready: bool = False
-    
+    is_online: bool = True  # 断线保留座位期间为 False
+    is_bot: bool = False    # 由机器人托管 (逃跑、断线超时或连续超时后)
+
     # === 用户身份信息 ===
-    username: str = ""          
-    nickname: str = "无名氏"     
-    avatar: str = "default.png" 
-    
+    username: str = ""
+    nickname: str = "无名氏"
+    avatar: str = "default.png"
+
     # === 武将信息 ===
-    general_id: str = ""        
-    general_candidates: List[str] = [] 
-    kingdom: str = "god"        
-    skills: List[str] = []      
+    general_id: str = ""
+    general_candidates: List[str] = field(default_factory=list)
+    kingdom: str = "god"
+    skills: List[str] = field(default_factory=list)
+    hooks: SkillHooks = field(default_factory=SkillHooks) # 技能钩子分发表 (开局时编译)
 
     # === 游戏数值状态 ===
     hp: int = 4
     max_hp: int = 4
     is_alive: bool = True
-    
-    # === 区域 ===
-    hand_cards: List[Card] = [] 
-    
-    # 装备区
-    equips: Dict[str, Optional[Card]] = {
-        "weapon": None,
-        "armor": None,
-        "horse_plus": None,
-        "horse_minus": None
-    }
-    
-    judging_cards: List[Card] = []
+
+    # === 区域 (开局时登记到房间的卡牌位置索引，只通过 room.move_cards 修改) ===
+    hand_cards: CardZone = field(default_factory=lambda: CardZone(ZoneKind.HAND))
+
+    # 装备区 (weapon / armor / horse_plus / horse_minus 四个固定栏位)
+    equips: EquipZone = field(default_factory=EquipZone)
+
+    judging_cards: CardZone = field(default_factory=lambda: CardZone(ZoneKind.JUDGE))
 
     # 🌟 新增：本回合出杀计数 (解决无限杀Bug)
-    sha_count: int = 0 
+    sha_count: int = 0
+
+    # 自动放弃响应的来源牌名 (如 "南蛮入侵"：被南蛮询问出杀时直接放弃)
+    # 不可变集合，修改时整体替换，克隆房间可以直接共享
+    auto_pass: frozenset = frozenset()
 
     @property
     def card_count(self) -> int:
-        return len(self.hand_cards)
\ No newline at end of file
+        return len(self.hand_cards)
+
+    def has_usable(self, as_card_name: str) -> bool:
+        """手牌中是否有可当作 as_card_name 使用/打出的牌 (含转化技)，O(1)"""
+        return self.hand_cards.has_any(self.hooks.usable_mask(as_card_name))
+
+    def count_usable(self, as_card_name: str) -> int:
+        return self.hand_cards.count_in(self.hooks.usable_mask(as_card_name))
+
+    def clone(self, registry: Optional[CardRegistry] = None) -> 'Player':
+        """
+        复制玩家状态 (用于 GameRoom.clone)
+        区域按 registry 映射到克隆房间中的写时复制副本；技能钩子表开局后不再修改，直接共享
+        """
+        twin = object.__new__(Player)
+        for name in _SCALAR_FIELDS:
+            setattr(twin, name, getattr(self, name))
+        twin.general_candidates = self.general_candidates[:]
+        twin.skills = self.skills[:]
+        if registry is not None:
+            twin.hand_cards = registry.twin_of(self.hand_cards)
+            twin.equips = registry.twin_of(self.equips)
+            twin.judging_cards = registry.twin_of(self.judging_cards)
+        else:
+            twin.hand_cards = self.hand_cards.fork(None)
+            twin.equips = self.equips.fork(None)
+            twin.judging_cards = self.judging_cards.fork(None)
+        return twin
+
+    def to_wire(self, show_candidates: bool = False) -> Dict:
+        """公开信息字典 (字段与 PlayerSchema 一致，跳过校验，每次广播都会调用)"""
+        return {
+            "sid": self.sid, "seat_id": self.seat_id, "hp": self.hp, "max_hp": self.max_hp,
+            "nickname": self.nickname, "avatar": self.avatar, "general_id": self.general_id,
+            "kingdom": self.kingdom, "is_alive": self.is_alive, "is_ready": self.is_ready, "is_host": self.is_host,
+            "is_online": self.is_online, "is_bot": self.is_bot,
+            "card_count": len(self.hand_cards),
+            "equips": {k: (v.name if v else None) for k, v in self.equips.items()},
+            "sha_count": self.sha_count,
+            "skills": list(self.skills),
+            "candidates": list(self.general_candidates) if show_candidates else []
+        }
+
+    def to_schema(self, show_candidates: bool = False) -> 'PlayerSchema':
+        return PlayerSchema(**self.to_wire(show_candidates))
+
+# clone() 中按引用复制的字段 (不可变值与共享的钩子表)
+_SCALAR_FIELDS = tuple(
+    f.name for f in fields(Player)
+    if f.name not in ("general_candidates", "skills", "hand_cards", "equips", "judging_cards")
+)
+
+class PlayerSchema(BaseModel):
+    """前端看到的玩家公开信息 (房间广播协议)"""
+    sid: str
+    seat_id: int
+    hp: int
+    max_hp: int
+    nickname: str
+    avatar: str
+    general_id: str
+    kingdom: str
+    is_alive: bool
+    is_ready: bool
+    is_host: bool
+    is_online: bool = True
+    is_bot: bool = False
+    card_count: int
+    equips: Dict[str, Optional[str]]
+    sha_count: int
+    skills: List[str]
+    candidates: List[str] = []
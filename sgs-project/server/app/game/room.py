@@ -1,27 +1,37 @@
-import json
-import os
 import random
-from typing import List, Optional, Dict, Tuple, Any
-from pydantic import BaseModel
+import time
+from typing import Any, List, Optional, Dict, Tuple
 
-from .card import Card, CardType
-from .engine import GameDeck
+from app.core.config import (
+    AOE_RESPONSE_MODE, PICK_GENERAL_SECONDS, PLAY_PHASE_SECONDS, PROMPT_SECONDS, RESPONSE_SECONDS,
+    WUXIE_WINDOW_SECONDS,
+)
+
+from .card import Card, CardType, VirtualCard
+from .engine import GameDeck, get_card_catalog
 from .enums import GamePhase, PendingType
-from .player import Player 
+from .events import AutoPassed, CardPlayed, CardsMoved, Damaged, GameEvent, GameOver, HpChanged, Notice, PlayerDied
+from .player import Player
+from .pending import (
+    WINDOW_PENDINGS, AoePending, AoeWindowPending, DiscardPending, DismantlePending, DuelPending, Pending,
+    PeachPending, WuxiePending,
+)
+from .generals import GeneralCatalog, get_general_catalog
+from .legal import ACTIVE_SKILL_RULES, LegalActions, generate_legal_actions
+from .seating import AliveRing
+from .stack import ResolutionStack, command
+from .tracker import CardTracker
+from .zones import CardRegistry, CardZone, EquipZone, ZoneKind
 
 # 引入技能注册表
 from .skills.standard import SKILL_REGISTRY
-from .skills.general import GENERAL_SKILL_REGISTRY
+from .skills.general import SkillHooks, compile_skill_hooks
 
-# === 核心数据模型 ===
+# 可以设置自动放弃的询问 (按来源牌名)
+AUTO_PASS_CHOICES = ("杀", "决斗", "南蛮入侵", "万箭齐发")
 
-class PendingAction(BaseModel):
-    """当前正在等待的交互详情"""
-    source_sid: str                          # 发起者 (谁出的牌/谁触发的技能)
-    target_sid: str                          # 当前需要响应的玩家
-    card_id: Optional[str] = None            # 关联卡牌ID (用于前端显示来源)
-    action_type: PendingType                 # 响应类型 (出杀/出闪/选牌/技能确认/弃牌...)
-    extra_data: Dict[str, Any] = {}          # 复杂上下文 (如五谷的牌堆、AOE的队列、弃牌数量等)
+# 询问类型 -> 需要打出的牌
+_ANSWER_OF = {PendingType.ASK_FOR_SHAN: "闪", PendingType.ASK_FOR_SHA: "杀"}
 
 # === 房间逻辑引擎 ===
 
@@ -32,18 +42,107 @@ class GameRoom:
         self.current_player_idx: int = 0
         self.phase: GamePhase = GamePhase.WAITING
         self.is_started: bool = False
-        self.deck = GameDeck()
-        self.pending_action: Optional[PendingAction] = None
+        self.rng = random                           # 随机源 (默认全局；克隆房间使用独立的 random.Random)
+        self.deck = GameDeck(self.rng)
+        self.card_registry = CardRegistry(get_card_catalog()) # 卡牌位置索引 (card -> 所在区域)
+        self.processing = CardZone(ZoneKind.PROCESSING)      # 处理区 (五谷亮出的牌等)
+        self.tracker = CardTracker()                         # 记牌器 (公开信息下未见的牌、已知的手牌)
+        self.deck.tracker = self.tracker
+        self.pending_action: Optional[Pending] = None
+        self.stack = ResolutionStack()              # 结算栈 (回合阶段/伤害/AOE 轮询的延续)
+        self.events: Optional[List[GameEvent]] = [] # 领域事件发件箱 (传输层每条指令后取出)
+        self.version: int = 0                       # 状态版本，每条指令执行后 +1
+        self._legal_cache: Dict[str, LegalActions] = {}
         self.winner_sid: Optional[str] = None 
+        self.aoe_mode: str = AOE_RESPONSE_MODE     # AOE 响应模式 (sequential / simultaneous)
+        self.turn_no: int = 0                       # 本局第几个回合 (出牌阶段计时按回合区分)
+        self.deadline_at: Optional[float] = None    # 当前等待的截止时间 (time.time() 时间戳)
+        self._deadline_key: Optional[tuple] = None
+        self._play_deadline: Tuple[int, float] = (-1, 0.0)
+        self.alive_ring = AliveRing()            # 存活座位环 (开局后维护，阵亡/逃跑时摘除)
         
-        self.generals_data = self._load_generals()
+        # 本局使用的武将目录 (开局时锁定，热更新不影响进行中的对局)
+        self.generals: GeneralCatalog = get_general_catalog()
+
+    # --- 克隆 (搜索/推演用) ---
+
+    def clone(self, seed: Optional[int] = None) -> 'GameRoom':
+        """
+        复制出一个完全独立的房间状态，供机器人搜索、提示系统与模拟推演使用
+        - 卡牌目录、武将目录、卡牌对象均不可变，直接共享
+        - 所有区域写时复制，克隆本身只复制位置索引与少量标量
+        - 克隆体使用独立的随机源 (seed 为 None 时随机初始化)，推演不会影响原房间的随机序列
+        """
+        twin = object.__new__(GameRoom)
+        twin.room_id = self.room_id
+        twin.current_player_idx = self.current_player_idx
+        twin.phase = self.phase
+        twin.is_started = self.is_started
+        twin.winner_sid = self.winner_sid
+        twin.aoe_mode = self.aoe_mode
+        twin.turn_no = self.turn_no
+        twin.deadline_at = self.deadline_at
+        twin._deadline_key = None # 推演不计时
+        twin._play_deadline = self._play_deadline
+        twin.generals = self.generals
+        twin.alive_ring = self.alive_ring.clone()
+        twin.rng = random.Random(seed)
+
+        registry = twin.card_registry = self.card_registry.fork()
+        twin.processing = registry.twin_of(self.processing)
+        twin.deck = GameDeck(twin.rng)
+        twin.tracker = twin.deck.tracker = self.tracker.clone()
+        twin.deck.draw_pile = registry.twin_of(self.deck.draw_pile)
+        twin.deck.discard_pile = registry.twin_of(self.deck.discard_pile)
+        twin.players = [p.clone(registry) for p in self.players]
+        twin.pending_action = self.pending_action.clone() if self.pending_action else None
+        pending_map = {id(self.pending_action): twin.pending_action} if self.pending_action else {}
+        twin.stack = self.stack.clone(pending_map)
+        twin.events = None # 推演不产生对外事件
+        twin.version = self.version
+        twin._legal_cache = {}
+        return twin
+
+    # --- 合法动作 ---
+
+    def legal_actions(self, sid: str) -> LegalActions:
+        """sid 当前的全部合法动作 (同一状态版本内只生成一次)"""
+        cached = self._legal_cache.get(sid)
+        if cached is not None and cached.version == self.version: return cached
+        if cached is not None or len(self._legal_cache) > len(self.players):
+            self._legal_cache = {k: v for k, v in self._legal_cache.items() if v.version == self.version}
+        result = self._legal_cache[sid] = generate_legal_actions(self, sid)
+        return result
+
+    def acting_sids(self) -> List[str]:
+        """当前需要行动的玩家：等待响应者 (同时响应窗口为全部未响应者)，否则为出牌阶段的当前回合者"""
+        act = self.pending_action
+        if act is not None:
+            return list(act.waiting) if isinstance(act, WINDOW_PENDINGS) else [act.target_sid]
+        if self.phase == GamePhase.PLAY and self.players:
+            return [self.players[self.current_player_idx].sid]
+        return []
 
-    def _load_generals(self):
-        """读取武将数据"""
-        path = os.path.join(os.path.dirname(__file__), "data/generals.json")
-        if not os.path.exists(path): return []
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+    # --- 领域事件 ---
+
+    def emit(self, event: GameEvent):
+        if self.events is not None: self.events.append(event)
+
+    def notify(self, msg: str):
+        """向房间内所有人发送一条系统提示"""
+        self.emit(Notice(msg))
+
+    def drain_events(self) -> List[GameEvent]:
+        """取出并清空发件箱"""
+        events = self.events or []
+        if self.events is not None: self.events = []
+        return events
+
+    def change_hp(self, p: Player, delta: int) -> int:
+        """修改体力 (回复为正，伤害/流失为负)，返回修改后的体力"""
+        p.hp += delta
+        self.emit(HpChanged(p.sid, p.hp, delta))
+        return p.hp
 
     # --- 辅助方法 ---
     
@@ -54,17 +153,19 @@ class GameRoom:
 
     def get_next_alive_player(self, current: Player) -> Optional[Player]:
         """获取逆时针的下一位存活玩家"""
-        if not self.players: return None
-        try:
-            idx = self.players.index(current)
-        except ValueError:
-            return None
-            
-        count = len(self.players)
-        for i in range(1, count):
-            p = self.players[(idx + i) % count]
-            if p.is_alive: return p
-        return None
+        idx = self.alive_ring.next_of(current.seat_id - 1)
+        return self.players[idx] if idx >= 0 else None
+
+    def get_prev_alive_player(self, current: Player) -> Optional[Player]:
+        """获取顺时针的上一位存活玩家 (上家)"""
+        idx = self.alive_ring.prev_of(current.seat_id - 1)
+        return self.players[idx] if idx >= 0 else None
+
+    def iter_alive_from(self, start: Player, include_self: bool = False):
+        """从 start 开始逆时针遍历存活玩家 (AOE/五谷的结算顺序)"""
+        players = self.players
+        for idx in self.alive_ring.iter_from(start.seat_id - 1, include_self):
+            yield players[idx]
 
     # --- 玩家管理 ---
 
@@ -86,7 +187,8 @@ class GameRoom:
             is_host=is_first, is_ready=is_first,
             username=new_username,
             nickname=user_info.get("nickname", f"群雄{len(self.players) + 1}"),
-            avatar=user_info.get("avatar", "default.png")
+            avatar=user_info.get("avatar", "default.png"),
+            auto_pass=frozenset(n for n in user_info.get("auto_pass", ()) if n in AUTO_PASS_CHOICES)
         )
         self.players.append(new_player)
         return True, "加入成功"
@@ -107,6 +209,8 @@ class GameRoom:
             self.players[0].is_ready = True
             
         for i, pl in enumerate(self.players): pl.seat_id = i + 1
+        if self.is_started:
+            self.alive_ring.reset(len(self.players), [pl.is_alive for pl in self.players])
 
     def kick_player(self, host_sid: str, target_sid: str) -> Tuple[bool, str]:
         host = self.get_player(host_sid)
@@ -114,6 +218,16 @@ class GameRoom:
         self.remove_player(target_sid)
         return True, "踢出成功"
 
+    @command
+    def set_auto_pass(self, sid: str, names: List[str]) -> Tuple[bool, str]:
+        """设置自动放弃的询问 (立即对当前询问生效)"""
+        p = self.get_player(sid)
+        if not p: return False, "玩家不存在"
+        invalid = [n for n in names if n not in AUTO_PASS_CHOICES]
+        if invalid: return False, f"不支持自动放弃：{','.join(invalid)}"
+        p.auto_pass = frozenset(names)
+        return True, "自动响应设置已保存"
+
     def toggle_ready(self, sid: str):
         p = self.get_player(sid)
         if p and not p.is_host: p.is_ready = not p.is_ready
@@ -121,6 +235,7 @@ class GameRoom:
 
     # --- 游戏中途退出/死亡逻辑 ---
 
+    @command
     def handle_disconnect_during_game(self, sid: str) -> str:
         p = self.get_player(sid)
         if not p or not p.is_alive: return "玩家已死亡或不存在"
@@ -128,15 +243,7 @@ class GameRoom:
         print(f"🏃 {p.nickname} 逃跑，判定死亡")
         
         # 寻找上家 (逆时针最近的存活者) 接收遗产
-        my_idx = self.players.index(p)
-        receiver = None
-        count = len(self.players)
-        for i in range(1, count):
-            check_idx = (my_idx - i + count) % count
-            candidate = self.players[check_idx]
-            if candidate.is_alive and candidate.sid != sid:
-                receiver = candidate
-                break
+        receiver = self.get_prev_alive_player(p)
         
         self.kill_player(p, receiver)
         msg = f"{p.nickname} 逃跑，判定阵亡！"
@@ -144,19 +251,28 @@ class GameRoom:
         # 如果导致游戏结束，直接返回
         if self.phase == GamePhase.GAME_OVER: return msg
 
-        # 清理与该玩家相关的 Pending 状态
-        if self.pending_action and self.pending_action.target_sid == sid:
-            self.pending_action = None 
+        # 清理与该玩家相关的 Pending 状态 (AOE 跳过此人继续轮询)
+        act = self.pending_action
+        if isinstance(act, AoeWindowPending) and act.accepts(sid):
+            if act.record(sid, None): self._close_aoe_window(act)
+        elif isinstance(act, WuxiePending) and act.accepts(sid):
+            if act.record_pass(sid): self._close_wuxie_window(act)
+        elif isinstance(act, PeachPending) and act.victim_sid == sid:
+            self.pending_action = None
+        elif isinstance(act, PeachPending) and act.target_sid == sid:
+            self._ask_next_rescuer(act)
+        elif act and act.target_sid == sid:
+            self.pending_action = None
+            if isinstance(act, AoePending):
+                self.stack.push("_step_aoe_next", act)
 
-        # 如果是当前回合者逃跑，强制结束回合
+        # 如果是当前回合者逃跑，强制结束回合 (丢弃其回合内尚未结算的步骤)
         current_p = self.players[self.current_player_idx]
         if current_p.sid == sid:
-            self.pending_action = None
-            next_p = self.get_next_alive_player(p)
-            if next_p:
-                self._enter_turn_cycle(next_p)
-            else:
-                self.phase = GamePhase.GAME_OVER
+            # 他人的濒死求桃继续进行，结算完毕后再进入下一回合
+            if not isinstance(self.pending_action, PeachPending): self.pending_action = None
+            self.stack.clear()
+            self.stack.push("_step_next_turn", sid)
 
         # 房主转移
         if p.is_host:
@@ -170,28 +286,33 @@ class GameRoom:
         """执行死亡结算"""
         victim.hp = 0
         victim.is_alive = False
+        self.alive_ring.remove(victim.seat_id - 1)
         
+        # 当前回合者在出牌阶段阵亡：其余结算完成后直接进入下一名角色的回合
+        if self.phase == GamePhase.PLAY and self.players[self.current_player_idx] is victim:
+            self.stack.defer("_step_next_turn", victim.sid)
+
+        self.emit(PlayerDied(victim.sid, killer.sid if killer else None))
+        legacy = list(victim.hand_cards) + [card for card in victim.equips.values() if card]
         if killer:
             print(f"💀 {victim.nickname} 阵亡，遗产归 {killer.nickname}")
-            killer.hand_cards.extend(victim.hand_cards)
-            for k, card in victim.equips.items():
-                if card: killer.hand_cards.append(card)
+            self.move_cards(legacy, killer.hand_cards)
         else:
             print(f"💀 {victim.nickname} 阵亡，遗产弃置")
-            self.deck.discard_pile.extend(victim.hand_cards)
-            for k, card in victim.equips.items():
-                if card: self.deck.discard_pile.append(card)
-        
-        victim.hand_cards = []
-        victim.equips = {k: None for k in victim.equips}
+            self.move_cards(legacy, self.deck.discard_pile)
 
         self._check_game_over()
 
     def _check_game_over(self):
-        alive_players = [pl for pl in self.players if pl.is_alive]
-        if len(alive_players) <= 1:
+        if self.alive_ring.count <= 1:
             self.phase = GamePhase.GAME_OVER
+            alive_players = [pl for pl in self.players if pl.is_alive]
             self.winner_sid = alive_players[0].sid if alive_players else None
+            self.emit(GameOver(self.winner_sid))
+            if alive_players:
+                winner = alive_players[0]
+                winner_name = winner.nickname if winner.nickname != "无名氏" else f"{winner.seat_id}号位"
+                self.notify(f"🏆 游戏结束！胜利者是：{winner_name}")
 
     # --- 属性计算 ---
 
@@ -208,9 +329,8 @@ class GameRoom:
         minus = 1 if p1.equips["horse_minus"] else 0
         dist = phys_dist + plus - minus
         
-        for s in p1.skills:
-            skill = GENERAL_SKILL_REGISTRY.get(s)
-            if skill: dist = skill.modify_distance(self, p1, p2, dist)
+        for skill in p1.hooks.distance:
+            dist = skill.modify_distance(self, p1, p2, dist)
         
         return max(1, dist)
 
@@ -221,28 +341,107 @@ class GameRoom:
         rng = wp.attack_range if wp else 1
         return rng >= self.get_distance(from_sid, to_sid)
 
+    # --- 卡牌移动 ---
+
+    def move_cards(self, cards: List[Card], dst: CardZone) -> List[Card]:
+        """
+        唯一的移牌原语：把牌从当前所在区域 (由位置索引 O(1) 定位) 移到 dst
+        除判定区外，转化牌离开原区域后都还原为实体牌
+        """
+        registry = self.card_registry
+        tracker = self.tracker
+        outbox = self.events
+        batch, batch_src = None, None
+        for card in cards:
+            src = registry.zone_of(card)
+            if src is not None: src.remove(card)
+            moved = card if dst.kind is ZoneKind.JUDGE else card.base
+            dst.add(moved)
+            tracker.on_move(card, src, dst)
+            if outbox is not None:
+                # 同一来源区域的连续移动合并为一个事件
+                if batch is None or src is not batch_src:
+                    batch, batch_src = CardsMoved([], src.kind if src else None, src.owner if src else None,
+                                                  dst.kind, dst.owner), src
+                    outbox.append(batch)
+                batch.cards.append(moved)
+        return cards
+
+    def move_card(self, card: Card, dst: CardZone) -> Card:
+        self.move_cards((card,), dst)
+        return card
+
+    def draw_cards(self, dst: CardZone, count: int) -> List[Card]:
+        """从牌堆摸 count 张放入 dst (牌堆不足时自动洗入弃牌堆)"""
+        cards = self.deck.draw(count)
+        for card in cards:
+            dst.add(card)
+            self.tracker.on_move(card, None, dst)
+        if cards: self.emit(CardsMoved(cards, ZoneKind.DRAW, None, dst.kind, dst.owner))
+        return cards
+
+    def judge(self) -> Optional[Card]:
+        """亮出牌堆顶一张作为判定牌，判定牌直接进入弃牌堆"""
+        cards = self.draw_cards(self.deck.discard_pile, 1)
+        return cards[0] if cards else None
+
+    def find_card(self, card_id: str) -> Tuple[Optional[Card], Optional[CardZone]]:
+        """按 card_id 返回 (实体牌, 所在区域)"""
+        return self.card_registry.locate(card_id)
+
+    def resolve_hand_card(self, p: Player, index: Optional[int] = None, card_id: Optional[str] = None) -> Optional[Card]:
+        """按 card_id (优先) 或手牌下标取出玩家手中的牌，不在其手中时返回 None"""
+        if card_id is not None:
+            card, zone = self.card_registry.locate(card_id)
+            return card if zone is p.hand_cards else None
+        if index is not None and 0 <= index < len(p.hand_cards):
+            return p.hand_cards[index]
+        return None
+
+    def resolve_hand_cards(self, p: Player, indices: Optional[List[int]] = None, card_ids: Optional[List[str]] = None) -> List[Card]:
+        """批量版本：忽略无效或重复的牌"""
+        if card_ids:
+            found = [self.resolve_hand_card(p, card_id=cid) for cid in card_ids]
+        else:
+            found = [self.resolve_hand_card(p, index=idx) for idx in (indices or [])]
+        cards, seen = [], set()
+        for c in found:
+            if c is not None and c.uid not in seen:
+                seen.add(c.uid)
+                cards.append(c)
+        return cards
+
+    def check_card_integrity(self) -> List[str]:
+        """校验所有牌恰好位于一个区域 (调试/测试用)"""
+        if not self.is_started or self.phase == GamePhase.PICK_GENERAL: return []
+        return self.card_registry.check_integrity()
+
     # --- 游戏初始化 ---
 
     def start_game(self) -> Tuple[bool, str]:
         if len(self.players) < 2: return False, "人数不足2人"
         if not all(p.is_ready for p in self.players): return False, "有玩家未准备"
-        if not self.generals_data: return False, "武将数据未加载"
+        self.generals = get_general_catalog()
+        if not self.generals: return False, "武将数据未加载"
 
         self.is_started = True
         self.winner_sid = None
+        self.alive_ring.reset(len(self.players))
         
-        g_ids = [g['id'] for g in self.generals_data]
-        random.shuffle(g_ids)
+        g_ids = list(self.generals.ids)
+        self.rng.shuffle(g_ids)
         if len(g_ids) < len(self.players) * 3: return False, "武将池不足"
 
         for p in self.players:
             p.general_id = "" 
             p.skills = []
+            p.hooks = SkillHooks()
             p.general_candidates = [g_ids.pop() for _ in range(3)]
 
         self.phase = GamePhase.PICK_GENERAL
         return True, "进入选将阶段"
 
+    @command
     def select_general(self, sid: str, general_id: str) -> Tuple[bool, str]:
         if self.phase != GamePhase.PICK_GENERAL: return False, "非选将阶段"
         p = self.get_player(sid)
@@ -255,177 +454,315 @@ class GameRoom:
         return True, "选将成功"
 
     def _finalize_setup(self):
+        # 每局重新登记所有区域，牌的位置只由 move_cards 维护
+        registry = self.card_registry
+        registry.reset()
+        self.deck.attach(registry)
+        self.processing = registry.register(CardZone(ZoneKind.PROCESSING))
+        for p in self.players:
+            p.hand_cards = registry.register(CardZone(ZoneKind.HAND, p.sid))
+            p.equips = registry.register(EquipZone(p.sid))
+            p.judging_cards = registry.register(CardZone(ZoneKind.JUDGE, p.sid))
+
         self.deck.init_deck()
+        self.tracker.reset(self.deck.draw_pile)
         self.deck.shuffle()
-        gen_map = {g['id']: g for g in self.generals_data}
-
         for p in self.players:
-            info = gen_map.get(p.general_id)
+            info = self.generals.get(p.general_id)
             if info:
-                p.kingdom = info["kingdom"]
-                p.max_hp = p.hp = info["max_hp"]
-                p.skills = info["skills"]
-            p.hand_cards = self.deck.draw(4)
-            p.equips = {k: None for k in p.equips}
+                p.kingdom = info.kingdom
+                p.max_hp = p.hp = info.max_hp
+                p.skills = list(info.skills)
+            p.hooks = compile_skill_hooks(p)
+            self.draw_cards(p.hand_cards, 4)
             p.is_alive = True
 
+        self.alive_ring.reset(len(self.players))
         self.current_player_idx = 0
-        self._enter_turn_cycle(self.players[0])
+        self.turn_no = 0
+        self.stack.clear()
+        self.stack.push("_step_start_turn", self.players[0].sid)
 
     # ==================================================
     # 🌟 核心逻辑：回合循环 (Turn Cycle)
+    # 每个阶段都是结算栈上的一个步骤 (见 stack.py)，由 @command 在指令结束后迭代推进
     # ==================================================
-    def _enter_turn_cycle(self, player: Player):
+    def _step_start_turn(self, sid: str):
+        player = self.get_player(sid)
         if not player.is_alive:
-            nxt = self.get_next_alive_player(player)
-            if nxt: self._enter_turn_cycle(nxt)
+            self.stack.push("_step_next_turn", sid)
             return
 
-        self.current_player_idx = self.players.index(player)
+        self.current_player_idx = player.seat_id - 1
+        self.turn_no += 1
         
         # 1. 准备阶段
         self.phase = GamePhase.START
-        for s in player.skills:
-            skill = GENERAL_SKILL_REGISTRY.get(s)
-            if skill: skill.on_phase_start(self, player, "start")
+        for skill in player.hooks.phase_start:
+            skill.on_phase_start(self, player, "start")
+
+        # 2. 判定阶段 (逐张判定，结束后进入摸牌阶段)
+        self.stack.push("_step_judge", sid)
+
+    def _step_judge(self, sid: str):
+        player = self.get_player(sid)
+        if not player.is_alive:
+            self.stack.push("_step_next_turn", sid)
+            return
 
-        # 2. 判定阶段
         self.phase = GamePhase.JUDGE
-        while player.judging_cards:
-            card = player.judging_cards.pop()
-            print(f"⚖️ {player.nickname} 判定 {card.name}...")
-            
-            judge_card = self.deck.draw(1)[0]
-            self.deck.discard_pile.append(judge_card)
-            print(f"   结果：{judge_card.suit} {judge_card.number}")
-            
-            # (TODO: 司马懿鬼才改判点，需在此处插入 PendingAction，暂略)
-
-            if card.name == "乐不思蜀":
-                if judge_card.suit != "heart":
-                    print("❌ 乐不思蜀生效")
-                    self.deck.discard_pile.append(card)
-                    self.phase = GamePhase.DISCARD
-                    self.try_end_turn(player.sid)
-                    return
-                else:
-                    print("✅ 乐不思蜀失效")
-                    self.deck.discard_pile.append(card)
-
-            elif card.name == "闪电":
-                if judge_card.suit == "spade" and 2 <= judge_card.number <= 9:
-                    print("⚡ 闪电劈中！")
-                    self.deck.discard_pile.append(card)
-                    self.apply_damage(player.sid, 3, source_sid=None, card=card)
-                    if not player.is_alive: return 
-                else:
-                    print("↪️ 闪电移至下家")
-                    nxt = self.get_next_alive_player(player)
-                    if nxt: nxt.judging_cards.append(card)
+        if not player.judging_cards:
+            self.stack.push("_step_draw", sid)
+            return
 
+        # 延时锦囊判定前同样可以被无懈可击抵消
+        card = player.judging_cards[-1]
+        self.open_wuxie_window(card.name, sid, sid, card,
+                               ("_step_judge_card", sid, card), ("_step_judge_nullified", sid, card))
+
+    def _step_judge_nullified(self, sid: str, card: Card):
+        """延时锦囊被抵消：乐不思蜀弃置，闪电移至下家，然后继续判定下一张"""
+        player = self.get_player(sid)
+        self.stack.push("_step_judge", sid)
+        nxt = self.get_next_alive_player(player) if card.name == "闪电" else None
+        self.move_card(card, nxt.judging_cards if nxt else self.deck.discard_pile)
+
+    def _step_judge_card(self, sid: str, card: Card):
+        player = self.get_player(sid)
+        print(f"⚖️ {player.nickname} 判定 {card.name}...")
+        
+        judge_card = self.judge()
+        if judge_card is None: # 牌堆与弃牌堆均已耗尽
+            self.stack.push("_step_draw", sid)
+            return
+        print(f"   结果：{judge_card.suit} {judge_card.number}")
+        
+        # (TODO: 司马懿鬼才改判点，需在此处插入 PendingAction，暂略)
+
+        if card.name == "乐不思蜀" and judge_card.suit != "heart":
+            print("❌ 乐不思蜀生效")
+            self.move_card(card, self.deck.discard_pile)
+            self.stack.push("_step_discard", sid) # 跳过摸牌与出牌阶段
+            return
+
+        # 先压入“继续判定下一张”，本张的效果 (伤害等) 压在其上先结算
+        self.stack.push("_step_judge", sid)
+        if card.name == "乐不思蜀":
+            print("✅ 乐不思蜀失效")
+            self.move_card(card, self.deck.discard_pile)
+
+        elif card.name == "闪电":
+            if judge_card.suit == "spade" and 2 <= judge_card.number <= 9:
+                print("⚡ 闪电劈中！")
+                self.move_card(card, self.deck.discard_pile)
+                self.apply_damage(player.sid, 3, source_sid=None, card=card)
+            else:
+                print("↪️ 闪电移至下家")
+                nxt = self.get_next_alive_player(player)
+                self.move_card(card, nxt.judging_cards if nxt else self.deck.discard_pile)
+
+        else:
+            self.move_card(card, self.deck.discard_pile)
+
+    def _step_draw(self, sid: str):
         # 3. 摸牌阶段
+        player = self.get_player(sid)
         self.phase = GamePhase.DRAW
         player.sha_count = 0
         draw_count = 2
-        for s in player.skills:
-            skill = GENERAL_SKILL_REGISTRY.get(s)
-            if skill: draw_count = skill.modify_draw_count(self, player, draw_count)
-        player.hand_cards.extend(self.deck.draw(draw_count))
+        for skill in player.hooks.draw_count:
+            draw_count = skill.modify_draw_count(self, player, draw_count)
+        self.draw_cards(player.hand_cards, draw_count)
         
-        # 4. 出牌阶段
+        # 4. 出牌阶段 (等待玩家指令，栈在此处自然停下)
         self.phase = GamePhase.PLAY
 
+    @command
     def try_end_turn(self, sid: str) -> Tuple[bool, str]:
         if self.pending_action: return False, "有待处理的操作"
-        p = self.get_player(sid)
         if self.players[self.current_player_idx].sid != sid: return False, "非当前回合"
+        self.stack.push("_step_discard", sid)
+        return True, "回合结束"
 
+    def _step_discard(self, sid: str):
         # 5. 弃牌阶段 (Manual Discard)
+        p = self.get_player(sid)
         self.phase = GamePhase.DISCARD
         limit = max(0, p.hp)
-        for s in p.skills:
-            skill = GENERAL_SKILL_REGISTRY.get(s)
-            if skill: limit = skill.modify_hand_limit(self, p, limit)
+        for skill in p.hooks.hand_limit:
+            limit = skill.modify_hand_limit(self, p, limit)
 
-        # 🌟 询问玩家弃牌 (非自动)
+        # 结束阶段排在弃牌之后；需要弃牌时先挂起等待玩家选择
+        self.stack.push("_step_finish", sid)
         current_hand_count = len(p.hand_cards)
         if current_hand_count > limit:
             diff = current_hand_count - limit
             print(f"📦 {p.nickname} 需要弃置 {diff} 张牌")
-            self.pending_action = PendingAction(
-                source_sid=sid,
-                target_sid=sid,
-                action_type=PendingType.ASK_FOR_DISCARD,
-                extra_data={"discard_count": diff}
-            )
-            return True, f"请弃置 {diff} 张牌"
-        
-        # 不需要弃牌，直接进入结束流程
-        return self._proceed_to_finish(p)
+            self.pending_action = DiscardPending(source_sid=sid, target_sid=sid, discard_count=diff)
 
-    def _proceed_to_finish(self, p: Player) -> Tuple[bool, str]:
+    def _step_finish(self, sid: str):
         # 6. 结束阶段
+        p = self.get_player(sid)
         self.phase = GamePhase.FINISH
-        for s in p.skills:
-            skill = GENERAL_SKILL_REGISTRY.get(s)
-            if skill: skill.on_phase_start(self, p, "finish")
+        if p.is_alive:
+            for skill in p.hooks.phase_start:
+                skill.on_phase_start(self, p, "finish")
+        self.stack.push("_step_next_turn", sid)
 
-        nxt = self.get_next_alive_player(p)
+    def _step_next_turn(self, sid: str):
+        nxt = self.get_next_alive_player(self.get_player(sid))
         if nxt:
-            self._enter_turn_cycle(nxt)
-            return True, "回合结束"
+            self.stack.push("_step_start_turn", nxt.sid)
         else:
             self.phase = GamePhase.GAME_OVER
-            return True, "游戏结束"
 
     # ==================================================
     # 🌟 核心逻辑：伤害结算
     # ==================================================
     def apply_damage(self, sid: str, amount: int, source_sid: Optional[str] = None, card: Optional[Card] = None):
+        """造成伤害：压入伤害步骤，在当前步骤/指令结束后结算"""
+        self.stack.push("_step_damage", sid, amount, source_sid, card)
+
+    def _step_damage(self, sid: str, amount: int, source_sid: Optional[str], card: Optional[Card]):
         p = self.get_player(sid)
-        source = self.get_player(source_sid) if source_sid else None
         if not p or not p.is_alive: return
 
-        p.hp -= amount
+        self.emit(Damaged(sid, amount, source_sid, card.name if card else None))
+        self.change_hp(p, -amount)
         print(f"🩸 {p.nickname} 受到 {amount} 点伤害，剩余 {p.hp}")
 
-        # 触发受伤技能钩子 (如遗计、刚烈)
-        for s_name in p.skills:
-            skill = GENERAL_SKILL_REGISTRY.get(s_name)
-            if skill:
-                if skill.on_receive_damage(self, p, source, amount, card):
-                    return # 技能中断了结算（如遗计需要等待响应）
+        # 先结算濒死，存活时再依次触发受伤技能 (如遗计、刚烈)
+        self.stack.push_seq(
+            ("_step_dying", sid, source_sid),
+            ("_step_damage_hooks", sid, source_sid, amount, card, 0),
+        )
+
+    def _step_dying(self, sid: str, source_sid: Optional[str]):
+        """
+        濒死结算：只询问能救助的角色 (持有桃，或回合外持有红牌的急救角色)，按座次从当前回合者开始
+        无人能救时立即阵亡，不产生任何询问
+        """
+        victim = self.get_player(sid)
+        if not victim or not victim.is_alive or victim.hp > 0: return
+        rescuers = self._rescuers()
+        if not rescuers:
+            self.kill_player(victim, self.get_player(source_sid) if source_sid else None)
+            return
+        self.notify(f"🆘 {victim.nickname} 濒死，向 {len(rescuers)} 名角色求桃")
+        self.pending_action = PeachPending(
+            source_sid=sid, target_sid=rescuers[0],
+            victim_sid=sid, killer_sid=source_sid, rescuers=rescuers
+        )
+
+    def rescue_mask(self, p: Player) -> int:
+        """p 手中可以当桃使用的牌 (位掩码)；急救只在回合外生效"""
+        if self.players[self.current_player_idx] is p:
+            return self.card_registry.catalog.name_mask.get("桃", 0)
+        return p.hooks.usable_mask("桃")
+
+    def _rescuers(self) -> List[str]:
+        """当前能救助濒死角色的存活角色 (从当前回合者开始按座次)"""
+        players, n = self.players, len(self.players)
+        start = self.current_player_idx
+        order = (players[(start + i) % n] for i in range(n))
+        return [q.sid for q in order if q.is_alive and q.hand_cards.has_any(self.rescue_mask(q))]
+
+    def _respond_peach(self, p: Player, act: PeachPending, card: Optional[Card]) -> Tuple[bool, str]:
+        victim = self.get_player(act.victim_sid)
+        if not victim or not victim.is_alive:
+            self.pending_action = None
+            return True, "濒死角色已阵亡"
+        msg = "放弃救助"
+        if card is not None and card.bit & self.rescue_mask(p):
+            self.move_card(card, self.deck.discard_pile)
+            heal = 1
+            for skill in victim.hooks.rescue_heal:
+                heal = skill.modify_rescue_heal(self, p, victim, heal)
+            self.change_hp(victim, min(heal, victim.max_hp - victim.hp))
+            if victim.hp > 0:
+                self.pending_action = None
+                return True, f"用【桃】救回了 {victim.nickname}"
+            msg = f"对 {victim.nickname} 使用了【桃】"
+            # 仍处于濒死：同一角色还能救则继续询问
+            if p.hand_cards.has_any(self.rescue_mask(p)): return True, msg
+        self._ask_next_rescuer(act)
+        return True, msg
+
+    def _ask_next_rescuer(self, act: PeachPending):
+        """轮到下一位仍能救助的角色 (中途可能有人已用光桃或离开)；无人可救则濒死角色阵亡"""
+        rescuers = act.rescuers
+        idx = act.current_index + 1
+        while idx < len(rescuers):
+            q = self.get_player(rescuers[idx])
+            if q and q.is_alive and q.hand_cards.has_any(self.rescue_mask(q)):
+                act.current_index, act.target_sid = idx, q.sid
+                return
+            idx += 1
+        self.pending_action = None
+        victim = self.get_player(act.victim_sid)
+        if victim and victim.is_alive:
+            self.kill_player(victim, self.get_player(act.killer_sid) if act.killer_sid else None)
 
-        self._resolve_death_state(p, source)
+    def _step_draw_if_alive(self, sid: str, count: int):
+        p = self.get_player(sid)
+        if p and p.is_alive: self.draw_cards(p.hand_cards, count)
 
-    def _resolve_death_state(self, victim: Player, killer: Optional[Player]):
-        if victim.hp <= 0:
-            # 简化：直接死亡 (TODO: 濒死求桃)
-            self.kill_player(victim, killer)
+    def _step_damage_hooks(self, sid: str, source_sid: Optional[str], amount: int, card: Optional[Card], index: int):
+        p = self.get_player(sid)
+        hooks = p.hooks.receive_damage
+        if not p.is_alive or index >= len(hooks): return
+        # 下一个技能排在本技能之后；本技能若挂起交互 (如遗计分牌)，响应完成后才继续
+        self.stack.push("_step_damage_hooks", sid, source_sid, amount, card, index + 1)
+        source = self.get_player(source_sid) if source_sid else None
+        hooks[index].on_receive_damage(self, p, source, amount, card)
 
     # ==================================================
     # 🌟 核心修复：Play Card (出牌)
     # ==================================================
-    def play_card(self, sid: str, index: int, target_sid: Optional[str]) -> Tuple[bool, str, Optional[Card]]:
+    @command
+    def play_card(self, sid: str, index: Optional[int], target_sid: Optional[str], card_id: Optional[str] = None) -> Tuple[bool, str, Optional[Card]]:
         if self.pending_action or self.phase == GamePhase.GAME_OVER: 
             return False, "禁止操作", None
         
         p = self.get_player(sid)
         if not p or not p.is_alive or self.players[self.current_player_idx].sid != sid: 
             return False, "非当前回合", None
-        if index >= len(p.hand_cards): return False, "索引无效", None
-        
-        card = p.hand_cards[index]
+        card = self.resolve_hand_card(p, index, card_id)
+        if card is None: return False, "索引无效", None
+
+        handler, skill_name, can_transform = self.play_handler(p, card, target_sid)
+        if not handler: return False, f"未实现卡牌 {skill_name}", None
+
+        # 豁免技 (空城、谦逊)
+        target = self.get_player(target_sid) if target_sid else None
+        if target and not self.can_target(p, target, skill_name):
+            return False, f"{target.nickname} 不能成为【{skill_name}】的目标", None
+
+        # 校验
+        ok, msg = handler.validate(self, p, card, target_sid)
+        if not ok: return False, msg, None
+
+        # 执行 (出牌事件排在这张牌引起的事件之前)
+        mark = len(self.events) if self.events is not None else 0
+        ok, msg = handler.execute(self, p, card, target_sid)
+        if ok:
+            if self.events is not None: self.events.insert(mark, CardPlayed(sid, target_sid, card))
+            if can_transform: msg = f"(转化) {msg}"
+            return True, msg, card
+        return False, msg, None
+
+    def play_handler(self, p: Player, card: Card, target_sid: Optional[str]):
+        """
+        出牌时实际使用的处理器：(处理器, 视为的牌名, 是否经过转化)
+        合法动作生成器与 play_card 共用，保证两者判断一致
+        """
         skill_name = card.name
         can_transform = False
 
         # --- 技能转化判断 (修复 Bug) ---
         # ⚠️ 仅保留“隐式转化”（无歧义的攻击动作），移除“显式转化”（如奇袭、国色）
-        if target_sid:
-            for s_name in p.skills:
-                skill = GENERAL_SKILL_REGISTRY.get(s_name)
-                if not skill: continue
-                
+        if target_sid and p.hooks.transform_to_sha:
+            for skill in p.hooks.transformers("杀"):
                 # 武圣：红牌 -> 杀 (无歧义，因为红牌除了桃和装备通常不能主动指定敌人)
                 if skill.can_transform_card(p, card, "杀"):
                     skill_name = "杀"; can_transform = True; break
@@ -442,171 +779,120 @@ class GameRoom:
             handler = SKILL_REGISTRY["equip_handler"]
         else:
             handler = SKILL_REGISTRY.get(skill_name)
+        return handler, skill_name, can_transform
 
-        if not handler: return False, f"未实现卡牌 {skill_name}", None
-
-        # 校验
-        ok, msg = handler.validate(self, p, card, target_sid)
-        if not ok: return False, msg, None
-
-        # 执行
-        ok, msg = handler.execute(self, p, card, target_sid)
-        if ok:
-            if can_transform: msg = f"(转化) {msg}"
-            return True, msg, card
-        return False, msg, None
+    def can_target(self, user: Player, target: Player, card_name: str) -> bool:
+        """target 能否成为 user 使用的 card_name 的目标 (豁免技：空城、谦逊)"""
+        if card_name not in target.hooks.avoid_card_names: return True
+        return not any(sk.can_avoid_target(self, user, target, card_name) for sk in target.hooks.avoid_target)
 
     # ==================================================
     # 🌟 核心新增：Active Skill Trigger (主动技能)
     # ==================================================
-    def trigger_active_skill(self, sid: str, skill_name: str, targets: List[str], card_indices: List[int]) -> Tuple[bool, str]:
+    @command
+    def trigger_active_skill(self, sid: str, skill_name: str, targets: List[str], card_indices: List[int], card_ids: Optional[List[str]] = None) -> Tuple[bool, str]:
         """
         处理前端点击按钮触发的技能 (解决奇袭、国色等无法主动发动的问题)
+        所选的牌可以用 card_ids (优先) 或手牌下标 card_indices 指定
         """
         p = self.get_player(sid)
         if self.phase != GamePhase.PLAY or self.players[self.current_player_idx].sid != sid:
             return False, "非出牌阶段"
+        rule = ACTIVE_SKILL_RULES.get(skill_name)
+        if rule is None or skill_name not in p.skills: return False, "技能未实现或条件不符"
+        cards = self.resolve_hand_cards(p, card_indices, card_ids)
+        # 青囊未指定目标时视为对自己发动
+        if skill_name == "qingnang" and not targets: targets = [sid]
+        target_ps = [self.get_player(t) for t in targets]
+        if not all(target_ps): return False, "目标无效"
+        # 牌与目标的要求与合法动作生成器共用 ACTIVE_SKILL_RULES
+        ok, msg = rule.check(self, p, cards, target_ps)
+        if not ok: return False, msg
+        discard = self.deck.discard_pile
 
         # --- 奇袭 (甘宁)：黑牌当拆 ---
         if skill_name == "qixi":
-            if not targets or len(card_indices) != 1: return False, "需选1张牌和1个目标"
-            c = p.hand_cards[card_indices[0]]
-            if c.suit not in ["spade", "club"]: return False, "必须是黑色牌"
-            
             # 消耗牌 (进弃牌堆)
-            consumed_card = p.hand_cards.pop(card_indices[0])
-            self.deck.discard_pile.append(consumed_card)
+            self.move_card(cards[0], discard)
             
             # 效果：视为对目标使用过河拆桥
             # 由于拆桥需要交互(选对方的牌)，这里挂起 PendingAction
-            target_p = self.get_player(targets[0])
-            if not target_p: return False, "目标无效"
-            
-            self.pending_action = PendingAction(
+            self.pending_action = DismantlePending(
                 source_sid=sid,
                 target_sid=sid, # 这里的target是发起者自己，因为需要发起者去点选对方的牌
-                action_type=PendingType.ASK_FOR_DISMANTLE,
-                extra_data={"target_to_dismantle": target_p.sid}
+                victim_sid=target_ps[0].sid
             )
             return True, f"发动奇袭，请选择要拆卸的牌"
 
         # --- 国色 (大乔)：方块当乐 ---
         if skill_name == "guose":
-            if not targets or len(card_indices) != 1: return False, "需选1张牌和1个目标"
-            c = p.hand_cards[card_indices[0]]
-            if c.suit != "diamond": return False, "必须是方块牌"
-            
-            target_p = self.get_player(targets[0])
-            if not target_p: return False, "目标无效"
-            # 检查判定区是否已有乐
-            for jc in target_p.judging_cards:
-                if jc.name == "乐不思蜀": return False, "目标已有乐不思蜀"
-
-            # 消耗牌并移入目标判定区
-            consumed_card = p.hand_cards.pop(card_indices[0])
-            # 变身
-            consumed_card.name = "乐不思蜀"
-            consumed_card.card_type = CardType.DELAYED # 需确保枚举兼容，或单纯依赖 name 判断
-            
-            target_p.judging_cards.append(consumed_card)
+            target_p = target_ps[0]
+            # 消耗牌并移入目标判定区 (以转化覆盖层的形式，实体牌本身不变)
+            self.move_card(VirtualCard(cards[0], "乐不思蜀", CardType.DELAYED), target_p.judging_cards)
             return True, f"对 {target_p.nickname} 发动国色 (乐不思蜀)"
 
         # --- 离间 (貂蝉) ---
         if skill_name == "lijian":
-            if len(targets) != 2: return False, "需选择两名男性角色"
-            if len(card_indices) != 1: return False, "需弃置一张牌"
             # TODO: 校验男性 (这里暂略，假设全员皆可)
-            
-            c = p.hand_cards.pop(card_indices[0])
-            self.deck.discard_pile.append(c)
+            self.move_card(cards[0], discard)
             
             # 视为 targets[0] 对 targets[1] 决斗
-            self.pending_action = PendingAction(
-                source_sid=targets[0],
-                target_sid=targets[1],
-                action_type=PendingType.ASK_FOR_SHA,
-                extra_data={
-                    "is_duel": True,
-                    "duel_source": targets[0],
-                    "duel_target": targets[1]
-                }
+            self.pending_action = DuelPending(
+                source_sid=target_ps[0].sid,
+                target_sid=target_ps[1].sid,
+                duel_source=target_ps[0].sid,
+                duel_target=target_ps[1].sid
             )
-            return True, f"发动离间！{self.get_player(targets[0]).nickname} 对 {self.get_player(targets[1]).nickname} 决斗"
+            return True, f"发动离间！{target_ps[0].nickname} 对 {target_ps[1].nickname} 决斗"
 
         # --- 仁德 (刘备) ---
         if skill_name == "rende":
-            if not targets or not card_indices: return False, "需选择目标和至少一张牌"
-            target_p = self.get_player(targets[0])
-            
-            cards_to_give = []
-            for idx in sorted(card_indices, reverse=True):
-                if idx < len(p.hand_cards):
-                    cards_to_give.append(p.hand_cards.pop(idx))
-            
-            target_p.hand_cards.extend(cards_to_give)
+            target_p = target_ps[0]
+            self.move_cards(cards, target_p.hand_cards)
             # TODO: 仁德回血逻辑 (记录本回合给牌数量，满2张回1血)
-            return True, f"仁德：给了 {target_p.nickname} {len(cards_to_give)} 张牌"
+            return True, f"仁德：给了 {target_p.nickname} {len(cards)} 张牌"
 
         # --- 青囊 (华佗) ---
         if skill_name == "qingnang":
-            if len(card_indices) != 1: return False, "需弃置一张手牌"
-            target_id = targets[0] if targets else sid
-            target_p = self.get_player(target_id)
-            
-            if target_p.hp >= target_p.max_hp: return False, "目标体力已满"
-            
-            c = p.hand_cards.pop(card_indices[0])
-            self.deck.discard_pile.append(c)
+            target_p = target_ps[0]
+            self.move_card(cards[0], discard)
             
-            target_p.hp += 1
+            self.change_hp(target_p, 1)
             return True, f"发动青囊，{target_p.nickname} 回复1点体力"
 
         # --- 苦肉 (黄盖) ---
         if skill_name == "kurou":
-            p.hp -= 1
+            self.change_hp(p, -1)
             print(f"🩸 {p.nickname} 苦肉失去1点体力")
-            if p.hp <= 0:
-                self._resolve_death_state(p, None)
-                if not p.is_alive: return True, "苦肉自尽"
-            
-            p.hand_cards.extend(self.deck.draw(2))
+            # 先结算濒死 (可能求桃)，存活才摸牌
+            self.stack.push_seq(("_step_dying", sid, None), ("_step_draw_if_alive", sid, 2))
             return True, "苦肉：失去1点体力，摸两张牌"
 
         # --- 制衡 (孙权) ---
         if skill_name == "zhiheng":
-            if not card_indices: return False, "至少弃置一张牌"
-            count = len(card_indices)
-            for idx in sorted(card_indices, reverse=True):
-                if idx < len(p.hand_cards):
-                    self.deck.discard_pile.append(p.hand_cards.pop(idx))
+            count = len(cards)
+            self.move_cards(cards, discard)
             
-            p.hand_cards.extend(self.deck.draw(count))
+            self.draw_cards(p.hand_cards, count)
             return True, f"制衡：重铸了 {count} 张牌"
             
         # --- 结姻 (孙尚香) ---
         if skill_name == "jieyin":
-            if len(card_indices) != 2: return False, "需弃置两张手牌"
-            if len(targets) != 1: return False, "需选择一名男性角色"
-            target_p = self.get_player(targets[0])
-            
-            if p.hp >= p.max_hp and target_p.hp >= target_p.max_hp:
-                return False, "双方体力均已满" # 至少一人受伤才可发动(规则细则略有不同，简化处理)
-
-            for idx in sorted(card_indices, reverse=True):
-                self.deck.discard_pile.append(p.hand_cards.pop(idx))
+            target_p = target_ps[0]
+            self.move_cards(cards, discard)
             
-            if p.hp < p.max_hp: p.hp += 1
-            if target_p.hp < target_p.max_hp: target_p.hp += 1
+            if p.hp < p.max_hp: self.change_hp(p, 1)
+            if target_p.hp < target_p.max_hp: self.change_hp(target_p, 1)
             return True, f"结姻：与 {target_p.nickname} 各回复1点体力"
 
         # --- 反间 (周瑜) ---
         if skill_name == "fanjian":
             # 反间交互极其复杂(猜花色)，这里做简化版：直接令对方弃牌或扣血
             # 完整版需要 PendingType.ASK_FOR_FANJIAN
-            if len(targets) != 1: return False, "需选择一名目标"
-            target_p = self.get_player(targets[0])
+            target_p = target_ps[0]
             # 简化：对方直接流失1点体力 (TODO: 实现猜花色交互)
-            target_p.hp -= 1
+            self.change_hp(target_p, -1)
+            self.stack.push("_step_dying", target_p.sid, sid)
             return True, f"反间(简化)：{target_p.nickname} 受到折磨"
 
         return False, "技能未实现或条件不符"
@@ -614,38 +900,38 @@ class GameRoom:
     # ==================================================
     # 🌟 核心逻辑：响应处理器
     # ==================================================
-    def handle_response(self, sid: str, card_index: Optional[int], target_area: Optional[str] = None, extra_payload: dict = None) -> Tuple[bool, str]:
-        if not self.pending_action or self.pending_action.target_sid != sid:
+    @command
+    def handle_response(self, sid: str, card_index: Optional[int], target_area: Optional[str] = None, extra_payload: dict = None, card_id: Optional[str] = None) -> Tuple[bool, str]:
+        return self._handle_response(sid, card_index, target_area, extra_payload, card_id)
+
+    def _handle_response(self, sid: str, card_index: Optional[int], target_area: Optional[str] = None, extra_payload: dict = None, card_id: Optional[str] = None) -> Tuple[bool, str]:
+        if not self.pending_action or not self.pending_action.accepts(sid):
             return False, "无需响应"
             
         act = self.pending_action
         p = self.get_player(sid)
+        discard = self.deck.discard_pile
 
         # --- 手动弃牌 (ASK_FOR_DISCARD) ---
         if act.action_type == PendingType.ASK_FOR_DISCARD:
-            if not extra_payload or "indices" not in extra_payload:
+            if not extra_payload or ("indices" not in extra_payload and "card_ids" not in extra_payload):
                 return False, "请选择要弃置的牌"
             
-            indices = sorted(extra_payload["indices"], reverse=True)
-            required_count = act.extra_data["discard_count"]
+            cards = self.resolve_hand_cards(p, extra_payload.get("indices"), extra_payload.get("card_ids"))
+            required_count = act.discard_count
             
-            if len(indices) != required_count:
+            if len(cards) != required_count:
                 return False, f"数量错误，需弃 {required_count} 张"
             
-            discarded_names = []
-            for idx in indices:
-                if idx < len(p.hand_cards):
-                    c = p.hand_cards.pop(idx)
-                    self.deck.discard_pile.append(c)
-                    discarded_names.append(c.name)
+            self.move_cards(cards, discard)
+            discarded_names = [c.name for c in cards]
             
-            self.pending_action = None
-            self._proceed_to_finish(p)
+            self.pending_action = None # 结束阶段已在栈上，随后继续
             return True, f"弃置了 {','.join(discarded_names)}"
 
         # --- 奇袭/拆桥后续 (ASK_FOR_DISMANTLE) ---
         if act.action_type == PendingType.ASK_FOR_DISMANTLE:
-            target_p = self.get_player(act.extra_data["target_to_dismantle"])
+            target_p = self.get_player(act.victim_sid)
             if not target_p: return False, "目标丢失"
             # target_area 由前端传回: 'hand', 'weapon', 'armor', 'horse_plus', 'horse_minus'
             self._move_card_response(target_p, p, target_area, to_hand=False) # 拆：进弃牌堆
@@ -654,7 +940,7 @@ class GameRoom:
 
         # --- 顺手牵羊后续 (ASK_FOR_SNATCH) ---
         if act.action_type == PendingType.ASK_FOR_SNATCH:
-            target_p = self.get_player(act.extra_data["target_to_snatch"])
+            target_p = self.get_player(act.victim_sid)
             if not target_p: return False, "目标丢失"
             self._move_card_response(target_p, p, target_area, to_hand=True) # 顺：进手牌
             self.pending_action = None
@@ -662,50 +948,65 @@ class GameRoom:
 
         # --- 五谷丰登 (ASK_FOR_CHOOSE_CARD) ---
         if act.action_type == PendingType.ASK_FOR_CHOOSE_CARD:
+            wugu_cards = act.wugu_cards
+            if card_id is not None:
+                card_index = next((i for i, c in enumerate(wugu_cards) if c.card_id == card_id), None)
             if card_index is None: return False, "必须选牌"
-            wugu_cards = act.extra_data["wugu_cards"]
-            if card_index >= len(wugu_cards): return False, "无效选择"
+            if not 0 <= card_index < len(wugu_cards): return False, "无效选择"
             
             # 拿牌
-            c_data = wugu_cards.pop(card_index)
-            chosen = Card(**c_data)
-            p.hand_cards.append(chosen)
+            chosen = wugu_cards.pop(card_index)
+            self.move_card(chosen, p.hand_cards)
             
             # 轮转
-            targets = act.extra_data["aoe_targets"]
-            next_idx = act.extra_data["current_index"] + 1
+            targets = act.aoe_targets
+            next_idx = act.current_index + 1
             if next_idx < len(targets) and wugu_cards:
                 act.target_sid = targets[next_idx]
-                act.extra_data["current_index"] = next_idx
+                act.current_index = next_idx
                 return True, f"获得了 {chosen.name}"
             else:
                 # 剩余进弃牌
-                for d in wugu_cards: self.deck.discard_pile.append(Card(**d))
+                self.move_cards(wugu_cards, discard)
                 self.pending_action = None
                 return True, "五谷丰登结束"
 
+        # --- 濒死求桃 (ASK_FOR_PEACH) ---
+        if isinstance(act, PeachPending):
+            return self._respond_peach(p, act, self.resolve_hand_card(p, card_index, card_id))
+
+        # --- 无懈可击窗口 ---
+        if isinstance(act, WuxiePending):
+            c = self.resolve_hand_card(p, card_index, card_id)
+            if c is not None and p.hooks.can_use_as(c, "无懈可击"):
+                return self._play_wuxie(p, act, c)
+            if act.record_pass(sid): self._close_wuxie_window(act)
+            return True, "不使用无懈可击"
+
+        # --- 南蛮/万箭同时响应窗口 ---
+        if isinstance(act, AoeWindowPending):
+            return self._respond_aoe_window(p, act, self.resolve_hand_card(p, card_index, card_id))
+
         # --- 决斗/南蛮/万箭 (ASK_FOR_SHA / SHAN) ---
         # 1. 响应【杀】(决斗/南蛮)
         if act.action_type == PendingType.ASK_FOR_SHA:
-            is_duel = act.extra_data.get("is_duel", False)
-            if card_index is not None:
-                c = p.hand_cards[card_index]
-                if c.name == "杀": # 暂不处理转化
-                    p.hand_cards.pop(card_index)
-                    self.deck.discard_pile.append(c)
-                    if is_duel:
-                        # 决斗：踢皮球
-                        opp = act.extra_data["duel_source"] if sid == act.extra_data["duel_target"] else act.extra_data["duel_target"]
-                        act.target_sid = opp
-                        return True, "打出【杀】"
-                    else:
-                        # 南蛮：下一位
-                        return self._next_aoe_target(p)
+            is_duel = isinstance(act, DuelPending)
+            c = self.resolve_hand_card(p, card_index, card_id)
+            # 与自动放弃、同时响应窗口使用同一判定 (含武圣/龙胆等转化)
+            if c is not None and p.hooks.can_use_as(c, "杀"):
+                self.move_card(c, discard)
+                if is_duel:
+                    # 决斗：踢皮球
+                    act.target_sid = act.opponent_of(sid)
+                    return True, "打出【杀】"
+                else:
+                    # 南蛮：下一位
+                    return self._next_aoe_target(p)
             
             # 放弃
             if is_duel:
                 self.pending_action = None
-                src = act.extra_data["duel_source"] if sid == act.extra_data["duel_target"] else act.extra_data["duel_target"]
+                src = act.opponent_of(sid)
                 self.apply_damage(sid, 1, source_sid=src)
                 return True, "决斗失败，受到伤害"
             else:
@@ -713,19 +1014,12 @@ class GameRoom:
 
         # 2. 响应【闪】(普通杀/万箭)
         if act.action_type == PendingType.ASK_FOR_SHAN:
-            is_aoe = "aoe_targets" in act.extra_data
-            if card_index is not None:
-                c = p.hand_cards[card_index]
-                is_valid = (c.name == "闪")
-                # 倾国检查
-                if not is_valid:
-                    for s in p.skills:
-                        skill = GENERAL_SKILL_REGISTRY.get(s)
-                        if skill and skill.can_transform_card(p, c, "闪"): is_valid = True; break
-                
-                if is_valid:
-                    p.hand_cards.pop(card_index)
-                    self.deck.discard_pile.append(c)
+            is_aoe = isinstance(act, AoePending)
+            c = self.resolve_hand_card(p, card_index, card_id)
+            if c is not None:
+                # 本名闪或经倾国/龙胆转化 (预计算位掩码)
+                if p.hooks.can_use_as(c, "闪"):
+                    self.move_card(c, discard)
                     if is_aoe: return self._next_aoe_target(p)
                     else:
                         self.pending_action = None
@@ -742,25 +1036,21 @@ class GameRoom:
         if act.action_type == PendingType.ASK_FOR_YIJI:
             if extra_payload:
                 target_p = self.get_player(extra_payload.get("target_id"))
-                cid = extra_payload.get("card_id")
-                found = next((c for c in p.hand_cards if c.card_id == cid), None)
+                found = self.resolve_hand_card(p, card_id=extra_payload.get("card_id"))
                 
                 if target_p and found:
-                    p.hand_cards.remove(found)
-                    target_p.hand_cards.append(found)
+                    self.move_card(found, target_p.hand_cards)
                     self.pending_action = None
-                    self._resolve_death_state(p, None)
                     return True, f"分牌给 {target_p.nickname}"
             
             self.pending_action = None
-            self._resolve_death_state(p, None)
             return True, "结束遗计"
 
         # --- 刚烈 (ASK_FOR_GANGLIE) ---
         if act.action_type == PendingType.ASK_FOR_GANGLIE:
             self.pending_action = None
             if target_area == "confirm":
-                src = act.extra_data["source_sid"]
+                src = act.damage_source_sid
                 self.apply_damage(src, 1, source_sid=sid)
                 return True, "刚烈生效"
             return True, "放弃刚烈"
@@ -769,9 +1059,8 @@ class GameRoom:
         if act.action_type == PendingType.ASK_FOR_COLLATERAL:
             wp = p.equips.get("weapon")
             if wp:
-                p.equips["weapon"] = None
                 src = self.get_player(act.source_sid)
-                if src: src.hand_cards.append(wp)
+                self.move_card(wp, src.hand_cards if src else discard)
                 self.pending_action = None
                 return True, "交出武器"
             self.pending_action = None
@@ -784,73 +1073,249 @@ class GameRoom:
     def _move_card_response(self, from_p: Player, to_p: Player, area: str, to_hand: bool):
         card = None
         if area == "hand" and from_p.hand_cards:
-            idx = random.randint(0, len(from_p.hand_cards)-1)
-            card = from_p.hand_cards.pop(idx)
-        elif area in from_p.equips:
+            idx = self.rng.randint(0, len(from_p.hand_cards)-1)
+            card = from_p.hand_cards[idx]
+        elif area in from_p.equips.slots:
             card = from_p.equips[area]
-            if card: from_p.equips[area] = None
         
         if card:
-            if to_hand: to_p.hand_cards.append(card)
-            else: self.deck.discard_pile.append(card)
+            self.move_card(card, to_p.hand_cards if to_hand else self.deck.discard_pile)
 
     def _next_aoe_target(self, current_p: Player) -> Tuple[bool, str]:
         act = self.pending_action
-        targets = act.extra_data["aoe_targets"]
-        curr_idx = act.extra_data["current_index"]
-        next_idx = curr_idx + 1
-        
-        if next_idx >= len(targets):
-            self.pending_action = None
-            return True, "锦囊结算完毕"
-        
-        act.target_sid = targets[next_idx]
-        act.extra_data["current_index"] = next_idx
+        self.pending_action = None
+        self.stack.push("_step_aoe_next", act)
         return True, "轮到下一位响应"
 
-    def _fail_aoe_response(self, p: Player, act: PendingAction) -> Tuple[bool, str]:
-        saved_data = act.extra_data.copy()
-        saved_source = act.source_sid
-        saved_type = act.action_type
-        
+    def _fail_aoe_response(self, p: Player, act: AoePending) -> Tuple[bool, str]:
+        # 伤害 (及其触发的技能交互) 结算完后，再轮到队列中的下一位
         self.pending_action = None
-        self.apply_damage(p.sid, 1, source_sid=saved_source)
-        
-        if not self.pending_action and p.is_alive:
-            # 恢复AOE
-            targets = saved_data["aoe_targets"]
-            curr_idx = saved_data["current_index"]
-            next_idx = curr_idx + 1
-            if next_idx < len(targets):
-                self.pending_action = PendingAction(
-                    source_sid=saved_source,
-                    target_sid=targets[next_idx],
-                    action_type=saved_type,
-                    extra_data=saved_data
-                )
-                self.pending_action.extra_data["current_index"] = next_idx
-                return True, "轮转下一位"
-            else:
-                return True, "结算完毕"
+        self.stack.push("_step_aoe_next", act)
+        self.apply_damage(p.sid, 1, source_sid=act.source_sid)
         return True, "受到伤害"
 
+    def _step_aoe_next(self, act: AoePending):
+        """AOE 轮询：询问队列中下一名存活角色，队列结束则锦囊结算完毕"""
+        while act.advance():
+            target = self.get_player(act.target_sid)
+            if target and target.is_alive:
+                self.pending_action = act
+                return
+
+    # --- 自动放弃 ---
+
+    def _prompt_source_name(self, act: Pending) -> Optional[str]:
+        """询问的来源牌名 (对应 AUTO_PASS_CHOICES)"""
+        if isinstance(act, AoePending): return act.card_name
+        if isinstance(act, DuelPending): return "决斗"
+        if act.action_type == PendingType.ASK_FOR_SHAN: return "杀"
+        return None
+
+    def _should_auto_pass(self, p: Player, act: Pending) -> bool:
+        need = _ANSWER_OF.get(act.action_type)
+        if need is None: return False
+        # 手中没有可当作所需牌使用的牌 (位掩码 O(1) 判断，含倾国/龙胆等转化)
+        if not p.has_usable(need): return True
+        return bool(p.auto_pass) and self._prompt_source_name(act) in p.auto_pass
+
+    def auto_respond(self) -> bool:
+        """
+        替当前无法响应 (或设置了自动放弃) 的玩家放弃响应，省去一次客户端往返
+        返回是否处理了任何响应；由 @command 在结算栈暂停后反复调用
+        """
+        act = self.pending_action
+        if act is None: return False
+        if isinstance(act, AoeWindowPending):
+            passing = [sid for sid in act.waiting if self._should_auto_pass(self.get_player(sid), act)]
+            for sid in passing:
+                self.emit(AutoPassed(sid, act.action_type))
+                if act.record(sid, None): self._close_aoe_window(act)
+            return bool(passing)
+        p = self.get_player(act.target_sid)
+        if p is None or not self._should_auto_pass(p, act): return False
+        self.emit(AutoPassed(p.sid, act.action_type))
+        self._handle_response(p.sid, None) # 已在指令内，直接调用未装饰的处理器
+        return True
+
+    # --- 锦囊与无懈可击窗口 ---
+
+    def use_trick(self, trick_name: str, user: Player, card: Card, target_sid: Optional[str]):
+        """使用普通锦囊：先经过无懈可击窗口，未被抵消才结算 SKILL_REGISTRY[trick_name].resolve"""
+        self.open_wuxie_window(trick_name, user.sid, target_sid, card,
+                               ("_step_trick_effect", trick_name, user.sid, card, target_sid))
+
+    def open_wuxie_window(self, trick_name: str, source_sid: str, target_sid: Optional[str], card: Optional[Card],
+                          effect: Tuple[Any, ...], cancel: Optional[Tuple[Any, ...]] = None):
+        """
+        同时询问所有持有无懈可击的角色；场上无人持有时效果直接压栈，不产生任何等待
+        effect / cancel 为 (房间方法名, 参数...)，分别在未被抵消 / 被抵消时执行
+        """
+        holders = self._wuxie_holders()
+        if not holders:
+            self.stack.push(*effect)
+            return
+        self.pending_action = WuxiePending(
+            source_sid=source_sid,
+            target_sid=holders[0],
+            card_id=card.card_id if card else None,
+            trick_name=trick_name,
+            trick_target=target_sid,
+            effect=effect,
+            cancel=cancel,
+            waiting=holders,
+            deadline=time.time() + WUXIE_WINDOW_SECONDS
+        )
+
+    def _wuxie_holders(self) -> List[str]:
+        """手中有无懈可击的存活角色 (位掩码 O(1) 判断)"""
+        return [p.sid for p in self.players if p.is_alive and p.has_usable("无懈可击")]
+
+    def _play_wuxie(self, p: Player, act: WuxiePending, card: Card) -> Tuple[bool, str]:
+        """打出无懈可击：翻转抵消状态，再对仍持有无懈可击的角色开窗 (无懈对无懈)"""
+        self.move_card(card, self.deck.discard_pile)
+        act.nullified = not act.nullified
+        act.chain += 1
+        self.notify(f"🛡️ {p.nickname} 打出【无懈可击】，【{act.trick_name}】{'被抵消' if act.nullified else '重新生效'}")
+        holders = self._wuxie_holders()
+        if holders: act.reopen(holders, time.time() + WUXIE_WINDOW_SECONDS)
+        else: self._close_wuxie_window(act)
+        return True, "打出【无懈可击】"
+
+    def _close_wuxie_window(self, act: WuxiePending):
+        self.pending_action = None
+        if act.nullified:
+            if act.cancel: self.stack.push(*act.cancel)
+        else:
+            self.stack.push(*act.effect)
+
+    def _step_trick_effect(self, trick_name: str, source_sid: str, card: Card, target_sid: Optional[str]):
+        user = self.get_player(source_sid)
+        if not user or not user.is_alive: return
+        target = self.get_player(target_sid) if target_sid else None
+        if target is not None and not target.is_alive: return # 目标已阵亡，锦囊失效
+        SKILL_REGISTRY[trick_name].resolve(self, user, card, target_sid)
+
+    # --- AOE 同时响应窗口 ---
+
+    def _respond_aoe_window(self, p: Player, act: AoeWindowPending, card: Optional[Card]) -> Tuple[bool, str]:
+        """只记录响应 (牌在结算到该角色时才打出)，收齐后关闭窗口"""
+        need = "杀" if act.action_type == PendingType.ASK_FOR_SHA else "闪"
+        if card is not None and not p.hooks.can_use_as(card, need): card = None
+        if act.record(p.sid, card): self._close_aoe_window(act)
+        return True, f"准备打出【{need}】" if card else "放弃响应"
+
+    def _close_aoe_window(self, act: AoeWindowPending):
+        self.pending_action = None
+        self.stack.push("_step_aoe_window_resolve", act, 0)
+
+    def _step_aoe_window_resolve(self, act: AoeWindowPending, index: int):
+        """按座次结算第 index 个目标：打出记录的牌，否则受到伤害 (伤害触发的技能结算完再轮到下一位)"""
+        targets = act.aoe_targets
+        if index >= len(targets): return
+        self.stack.push("_step_aoe_window_resolve", act, index + 1)
+        target = self.get_player(targets[index])
+        if not target or not target.is_alive: return
+        act.current_index = index
+        card = act.responses.get(target.sid)
+        # 窗口关闭后牌可能已离开手牌 (如被前面角色的技能拿走)，此时视为未响应
+        if card is not None and self.card_registry.zone_of(card) is target.hand_cards:
+            self.move_card(card, self.deck.discard_pile)
+            self.notify(f"{target.nickname} 打出【{card.name}】")
+            return
+        self.apply_damage(target.sid, 1, source_sid=act.source_sid)
+
+    # --- 超时 ---
+
+    def _waiting_key(self) -> Optional[tuple]:
+        """当前在等待什么 (变化时重新计时)：询问对象与响应者 / 选将 / 某个回合的出牌阶段"""
+        if not self.is_started or not self.players or self.phase == GamePhase.GAME_OVER: return None
+        act = self.pending_action
+        if act is not None: return ("prompt", act, act.target_sid)
+        if self.phase == GamePhase.PICK_GENERAL: return ("pick",)
+        if self.phase == GamePhase.PLAY: return ("play", self.turn_no)
+        return None
+
+    def refresh_deadline(self, now: float) -> Optional[float]:
+        """
+        按当前等待的对象更新截止时间并返回 (None 表示无需计时)，由传输层在每条指令后调用
+        - 同时响应窗口沿用窗口自己的截止时间 (无懈对无懈会顺延)
+        - 出牌阶段整个阶段共用一个时限，中途的询问结束后不重新计时
+        """
+        key = self._waiting_key()
+        act = self.pending_action
+        if key is None:
+            self.deadline_at = None
+        elif isinstance(act, WINDOW_PENDINGS):
+            self.deadline_at = act.deadline
+        elif key != self._deadline_key:
+            if key[0] == "play":
+                if self._play_deadline[0] != self.turn_no:
+                    self._play_deadline = (self.turn_no, now + PLAY_PHASE_SECONDS)
+                self.deadline_at = self._play_deadline[1]
+            elif key[0] == "pick":
+                self.deadline_at = now + PICK_GENERAL_SECONDS
+            else:
+                self.deadline_at = now + PROMPT_SECONDS.get(act.action_type.value, RESPONSE_SECONDS)
+        self._deadline_key = key
+        return self.deadline_at
+
+    @command
+    def expire_deadline(self) -> Tuple[bool, str]:
+        """等待超时：按默认方式替未行动的玩家行动 (由传输层在截止时间到达后调用)"""
+        act = self.pending_action
+        if isinstance(act, WuxiePending):
+            act.waiting.clear()
+            self._close_wuxie_window(act)
+            return True, "无懈可击窗口关闭"
+        if isinstance(act, AoeWindowPending):
+            # 未响应的角色视为放弃，立即结算
+            for sid in act.waiting: act.responses[sid] = None
+            act.waiting.clear()
+            self._close_aoe_window(act)
+            return True, "响应超时"
+        if act is not None:
+            return self._default_response(act)
+        if self.phase == GamePhase.PICK_GENERAL:
+            for p in self.players:
+                if not p.general_id: p.general_id = p.general_candidates[0]
+            self._finalize_setup()
+            return True, "选将超时，已自动选择武将"
+        if self.phase == GamePhase.PLAY:
+            cur = self.players[self.current_player_idx]
+            self.stack.push("_step_discard", cur.sid)
+            return True, f"{cur.nickname} 出牌超时，回合结束"
+        return False, "无需处理"
+
+    def _default_response(self, act: Pending) -> Tuple[bool, str]:
+        """询问超时的默认选择：弃牌弃最后获得的牌；能放弃则放弃；否则取第一个合法选项"""
+        sid = act.target_sid
+        p = self.get_player(sid)
+        if p is None:
+            self.pending_action = None
+            return True, "询问已撤销"
+        if isinstance(act, DiscardPending):
+            cards = list(p.hand_cards)[-act.discard_count:]
+            return self._handle_response(sid, None, extra_payload={"card_ids": [c.card_id for c in cards]})
+        legal = self.legal_actions(sid)
+        result = False, ""
+        if legal.can_pass: result = self._handle_response(sid, None)
+        elif legal.areas: result = self._handle_response(sid, None, target_area=legal.areas[0])
+        elif legal.answers: result = self._handle_response(sid, None, card_id=legal.answers[0])
+        if result[0]: return result
+        # 没有合法选项 (如要拆的角色已无牌) 或默认选择被拒绝：撤销询问，栈上的后续照常推进，房间不会卡死
+        if self.pending_action is act: self.pending_action = None
+        return True, "询问已撤销"
+
     def get_public_state(self):
+        """房间广播数据：内部状态只在这里转换为对外协议"""
+        show_candidates = self.phase == GamePhase.PICK_GENERAL
         return {
             "room_id": self.room_id, "phase": self.phase, 
             "current_seat": self.players[self.current_player_idx].seat_id if self.players else 0,
             "is_started": self.is_started, "deck_count": len(self.deck.draw_pile),
-            "pending": self.pending_action.model_dump() if self.pending_action else None,
+            "pending": self.pending_action.to_wire() if self.pending_action else None,
             "winner_sid": self.winner_sid,
-            "players": [
-                {
-                    "sid": p.sid, "seat_id": p.seat_id, "hp": p.hp, "max_hp": p.max_hp,
-                    "nickname": p.nickname, "avatar": p.avatar, "general_id": p.general_id,
-                    "kingdom": p.kingdom, "is_alive": p.is_alive, "is_ready": p.is_ready, "is_host": p.is_host,
-                    "card_count": len(p.hand_cards),
-                    "equips": {k: (v.name if v else None) for k, v in p.equips.items()},
-                    "sha_count": p.sha_count,
-                    "skills": p.skills,
-                    "candidates": p.general_candidates if self.phase == GamePhase.PICK_GENERAL else []
-                } for p in self.players
-            ]
+            "deadline": self.deadline_at,
+            "version": self.version,
+            "players": [p.to_wire(show_candidates) for p in self.players]
         }
\ No newline at end of file
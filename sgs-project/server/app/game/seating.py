@@ -0,0 +1,76 @@
+from typing import Iterator, List
+
+
+class AliveRing:
+    """
+    存活座位的双向环形链表 (下标即 room.players 中的位置)
+    - 阵亡/逃跑时 O(1) 摘除节点
+    - 查询上家/下家 O(1)，AOE 轮询只遍历存活者
+    被摘除的节点保留原指针，因此从阵亡者出发仍能找到其后的第一名存活者
+    """
+    __slots__ = ("next", "prev", "alive", "count")
+
+    def __init__(self, size: int = 0):
+        self.next: List[int] = []
+        self.prev: List[int] = []
+        self.alive: List[bool] = []
+        self.count: int = 0
+        self.reset(size)
+
+    def reset(self, size: int, alive: List[bool] = None):
+        """按座位数重建环；alive 为空时视为全员存活"""
+        self.alive = list(alive) if alive is not None else [True] * size
+        self.next = [0] * size
+        self.prev = [0] * size
+        seats = [i for i in range(size) if self.alive[i]]
+        self.count = len(seats)
+        for k, i in enumerate(seats):
+            self.next[i] = seats[(k + 1) % len(seats)]
+            self.prev[i] = seats[k - 1]
+        # 已阵亡的座位指向其后/前最近的存活者
+        for i in range(size):
+            if self.alive[i] or not seats: continue
+            self.next[i] = next((j for j in seats if j > i), seats[0])
+            self.prev[i] = next((j for j in reversed(seats) if j < i), seats[-1])
+
+    def clone(self) -> 'AliveRing':
+        twin = object.__new__(AliveRing)
+        twin.next, twin.prev, twin.alive, twin.count = self.next[:], self.prev[:], self.alive[:], self.count
+        return twin
+
+    def remove(self, i: int):
+        """摘除座位 i (阵亡/逃跑)"""
+        if i >= len(self.alive) or not self.alive[i]: return
+        n, p = self.next[i], self.prev[i]
+        self.next[p] = n
+        self.prev[n] = p
+        self.alive[i] = False
+        self.count -= 1
+
+    def next_of(self, i: int) -> int:
+        """i 之后(逆时针)的下一名存活者，不存在(或只剩自己)时返回 -1"""
+        if self.count == 0 or i >= len(self.alive): return -1
+        j = self.next[i]
+        while not self.alive[j]:
+            j = self.next[j]
+        return -1 if j == i else j
+
+    def prev_of(self, i: int) -> int:
+        """i 之前(顺时针)的上一名存活者，不存在(或只剩自己)时返回 -1"""
+        if self.count == 0 or i >= len(self.alive): return -1
+        j = self.prev[i]
+        while not self.alive[j]:
+            j = self.prev[j]
+        return -1 if j == i else j
+
+    def iter_from(self, i: int, include_self: bool = False) -> Iterator[int]:
+        """从 i 开始逆时针遍历一圈存活座位"""
+        if include_self and i < len(self.alive) and self.alive[i]:
+            yield i
+        j = self.next_of(i)
+        first = j
+        while j != -1:
+            yield j
+            j = self.next[j]
+            if j == first or j == i:
+                break
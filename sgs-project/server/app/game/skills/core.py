@@ -4,7 +4,7 @@ from typing import Optional, Tuple, TYPE_CHECKING
 # 使用 TYPE_CHECKING 避免运行时循环引用
 if TYPE_CHECKING:
     from app.game.room import GameRoom
-    from app.game.player import PlayerState
+    from app.game.player import Player
     from app.game.card import Card
 
 class CardSkill(ABC):
@@ -18,7 +18,7 @@ class CardSkill(ABC):
         """技能/卡牌名称，用于注册表查找"""
         pass
 
-    def validate(self, room: 'GameRoom', player: 'PlayerState', card: 'Card', target_sid: Optional[str]) -> Tuple[bool, str]:
+    def validate(self, room: 'GameRoom', player: 'Player', card: 'Card', target_sid: Optional[str]) -> Tuple[bool, str]:
         """
         校验当前是否可以使用此牌
         :return: (是否合法, 错误信息)
@@ -28,7 +28,7 @@ class CardSkill(ABC):
         return True, ""
 
     @abstractmethod
-    def execute(self, room: 'GameRoom', player: 'PlayerState', card: 'Card', target_sid: Optional[str]) -> Tuple[bool, str]:
+    def execute(self, room: 'GameRoom', player: 'Player', card: 'Card', target_sid: Optional[str]) -> Tuple[bool, str]:
         """
         执行卡牌的核心逻辑
         :return: (执行是否成功, 提示信息)
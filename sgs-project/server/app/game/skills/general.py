@@ -1,9 +1,11 @@
 from abc import ABC
-from typing import TYPE_CHECKING, List, Optional, Tuple
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 import random
 
 from app.game.card import Card, CardType
-from app.game.enums import PendingType
+from app.game.engine import get_card_catalog
+from app.game.pending import GangliePending, SkillConfirmPending, SnatchPending, YijiPending
 
 if TYPE_CHECKING:
     from app.game.room import GameRoom
@@ -14,6 +16,11 @@ class GeneralSkill(ABC):
     武将技能基类 (策略模式)
     包含游戏流程中的各种 '钩子(Hooks)'
     """
+    # 转化技声明：can_transform_card 可能返回 True 的目标牌名 (编译钩子表时使用)
+    transform_targets: Tuple[str, ...] = ()
+    # 豁免技声明：can_avoid_target 可能生效的牌名
+    avoid_card_names: Tuple[str, ...] = ()
+
     def __init__(self, name: str):
         self.name = name
 
@@ -30,9 +37,16 @@ class GeneralSkill(ABC):
         """[钩子] 修改手牌上限 (如：权计，吕蒙-克己逻辑在弃牌阶段处理)"""
         return limit
 
+    def modify_rescue_heal(self, room: 'GameRoom', rescuer: 'Player', victim: 'Player', amount: int) -> int:
+        """[钩子] 自己濒死时被桃救助的回复量 (如：救援)"""
+        return amount
+
     # --- 2. 卡牌转化类钩子 ---
     def can_transform_card(self, player: 'Player', card: Card, as_card_name: str) -> bool:
-        """[钩子] 转化技：判断手牌 card 是否可以当做 as_card_name 使用 (如：龙胆、武圣)"""
+        """
+        [钩子] 转化技：判断手牌 card 是否可以当做 as_card_name 使用 (如：龙胆、武圣)
+        ⚠️ 结果只应取决于牌面 (开局时会对整副牌预计算成位掩码)
+        """
         return False
 
     # --- 3. 规则豁免类钩子 ---
@@ -83,17 +97,13 @@ class JianxiongSkill(GeneralSkill):
         # 如果是卡牌造成的伤害，且卡牌还在处理区/弃牌堆（简化逻辑：只要有 card 对象就询问）
         if card:
             # 这是一个询问技能，需要前端确认
-            from app.game.room import PendingAction
-            room.pending_action = PendingAction(
+            room.pending_action = SkillConfirmPending(
                 source_sid=player.sid,
                 target_sid=player.sid,
-                action_type=PendingType.ASK_FOR_SKILL_CONFIRM,
-                extra_data={
-                    "skill_name": "奸雄",
-                    "transform_name": "获得伤害牌", # 用于前端显示
-                    "card_id": card.card_id,
-                    "msg": f"是否发动【奸雄】获得 {card.name}？"
-                }
+                skill_name="奸雄",
+                transform_name="获得伤害牌", # 用于前端显示
+                related_card_id=card.card_id,
+                msg=f"是否发动【奸雄】获得 {card.name}？"
             )
             return True # 中断结算，等待玩家确认
         return False
@@ -113,24 +123,14 @@ class YijiSkill(GeneralSkill):
     def on_receive_damage(self, room: 'GameRoom', player: 'Player', source: Optional['Player'], amount: int, card: Optional[Card]) -> bool:
         # 1. 直接摸牌 (每点伤害2张)
         count = amount * 2
-        new_cards = room.deck.draw(count)
-        player.hand_cards.extend(new_cards)
-        room.notify_room(room.room_id, f"⚡ {player.nickname} 发动【遗计】，摸了 {count} 张牌")
-        
-        # 通知前端更新手牌
-        import socketio
-        async_task = room.broadcast_room_state(room) # 这一步通常在 room 外部调用，但在 Websocket 框架下需要注意异步
+        new_cards = room.draw_cards(player.hand_cards, count)
+        room.notify(f"⚡ {player.nickname} 发动【遗计】，摸了 {count} 张牌")
         
         # 2. 设置 PendingAction 等待分牌
-        from app.game.room import PendingAction
-        room.pending_action = PendingAction(
+        room.pending_action = YijiPending(
             source_sid=player.sid,
             target_sid=player.sid,
-            action_type=PendingType.ASK_FOR_YIJI,
-            extra_data={
-                "draw_cards": [c.card_id for c in new_cards], # 标记刚刚摸到的牌
-                "draw_count": count
-            }
+            draw_cards=[c.card_id for c in new_cards] # 标记刚刚摸到的牌
         )
         return True # 中断
 
@@ -140,16 +140,12 @@ class FankuiSkill(GeneralSkill):
 
     def on_receive_damage(self, room: 'GameRoom', player: 'Player', source: Optional['Player'], amount: int, card: Optional[Card]) -> bool:
         if source and source.sid != player.sid and (source.hand_cards or any(source.equips.values())):
-            from app.game.room import PendingAction
-            room.pending_action = PendingAction(
+            room.pending_action = SnatchPending( # 复用顺手牵羊的 UI 逻辑
                 source_sid=player.sid,
                 target_sid=source.sid, # 目标是伤害来源
-                action_type=PendingType.ASK_FOR_SNATCH, # 复用顺手牵羊的 UI 逻辑
-                extra_data={
-                    "skill_name": "反馈",
-                    "target_to_snatch": source.sid,
-                    "msg": f"是否对 {source.nickname} 发动【反馈】？"
-                }
+                victim_sid=source.sid,
+                skill_name="反馈",
+                msg=f"是否对 {source.nickname} 发动【反馈】？"
             )
             return True
         return False
@@ -164,15 +160,11 @@ class GanglieSkill(GeneralSkill):
 
     def on_receive_damage(self, room: 'GameRoom', player: 'Player', source: Optional['Player'], amount: int, card: Optional[Card]) -> bool:
         if source:
-            from app.game.room import PendingAction
-            room.pending_action = PendingAction(
+            room.pending_action = GangliePending(
                 source_sid=player.sid,
                 target_sid=player.sid, # 先询问自己是否发动
-                action_type=PendingType.ASK_FOR_GANGLIE,
-                extra_data={
-                    "source_sid": source.sid,
-                    "msg": f"是否对 {source.nickname} 发动【刚烈】？"
-                }
+                damage_source_sid=source.sid,
+                msg=f"是否对 {source.nickname} 发动【刚烈】？"
             )
             return True
         return False
@@ -193,26 +185,27 @@ class LuoshenSkill(GeneralSkill):
         if phase == "start": # 准备阶段
             # 简化版：直接进行一次判定，不处理无限循环（防止死循环）
             # 完整版应该是一个递归的 PendingAction，这里为了演示流程，做一次自动判定
-            judge = room.deck.draw(1)[0]
-            room.deck.discard_pile.append(judge)
-            room.notify_room(room.room_id, f"🎲 {player.nickname} 发动【洛神】，判定结果：{judge.suit} {judge.number}")
+            judge = room.judge()
+            if judge is None: return False
+            room.notify(f"🎲 {player.nickname} 发动【洛神】，判定结果：{judge.suit} {judge.number}")
             
-            if judge.suit in ["spade", "club"]: # 黑色
-                room.notify_room(room.room_id, "✅ 洛神生效，获得该牌")
-                player.hand_cards.append(judge)
-                room.deck.discard_pile.remove(judge) # 从弃牌堆拿回来
+            if judge.is_black:
+                room.notify("✅ 洛神生效，获得该牌")
+                room.move_card(judge, player.hand_cards) # 从弃牌堆拿回来
                 # TODO: 这里应该允许继续判定，为了代码结构不崩塌，暂只判一次
             else:
-                room.notify_room(room.room_id, "❌ 洛神失效")
+                room.notify("❌ 洛神失效")
             return False # 不中断阶段流转
         return False
 
 class QingguoSkill(GeneralSkill):
     """【倾国】：黑色当闪"""
+    transform_targets = ("闪",)
+
     def __init__(self): super().__init__("qingguo")
     
     def can_transform_card(self, player: 'Player', card: Card, as_card_name: str) -> bool:
-        if as_card_name == "闪" and card.suit in ["spade", "club"]:
+        if as_card_name == "闪" and card.is_black:
             return True
         return False
 
@@ -231,10 +224,12 @@ class JijiangSkill(GeneralSkill):
 
 class WushengSkill(GeneralSkill):
     """【武圣】：红色当杀"""
+    transform_targets = ("杀",)
+
     def __init__(self): super().__init__("wusheng")
     
     def can_transform_card(self, player: 'Player', card: Card, as_card_name: str) -> bool:
-        if as_card_name == "杀" and card.suit in ["heart", "diamond"]:
+        if as_card_name == "杀" and card.is_red:
             return True
         return False
 
@@ -252,6 +247,8 @@ class GuanxingSkill(GeneralSkill):
 
 class KongchengSkill(GeneralSkill):
     """【空城】：无手牌不能成为杀/决斗目标"""
+    avoid_card_names = ("杀", "决斗")
+
     def __init__(self): super().__init__("kongcheng")
     
     def can_avoid_target(self, room: 'GameRoom', user: 'Player', target: 'Player', card_name: str) -> bool:
@@ -261,6 +258,8 @@ class KongchengSkill(GeneralSkill):
 
 class LongdanSkill(GeneralSkill):
     """【龙胆】：杀当闪，闪当杀"""
+    transform_targets = ("杀", "闪")
+
     def __init__(self): super().__init__("longdan")
     
     def can_transform_card(self, player: 'Player', card: Card, as_card_name: str) -> bool:
@@ -282,7 +281,7 @@ class TieqiSkill(GeneralSkill):
     def on_use_card(self, room: 'GameRoom', player: 'Player', card: Card) -> bool:
         if card.name == "杀":
             # 简化版：这里只是打印，完整版需要加入 PendingAction 强行判定
-            room.notify_room(room.room_id, f"🐎 {player.nickname} 发动【铁骑】")
+            room.notify(f"🐎 {player.nickname} 发动【铁骑】")
         return False
 
 class JizhiSkill(GeneralSkill):
@@ -291,8 +290,8 @@ class JizhiSkill(GeneralSkill):
 
     def on_use_card(self, room: 'GameRoom', player: 'Player', card: Card) -> bool:
         if card.card_type.name in ["STRATEGY", "SCROLL", "DELAYED"]: # 只要是锦囊
-            player.hand_cards.extend(room.deck.draw(1))
-            room.notify_room(room.room_id, f"💡 {player.nickname} 发动【集智】，摸了一张牌")
+            room.draw_cards(player.hand_cards, 1)
+            room.notify(f"💡 {player.nickname} 发动【集智】，摸了一张牌")
         return False
 
 class QicaiSkill(GeneralSkill):
@@ -309,15 +308,22 @@ class ZhihengSkill(GeneralSkill):
     def __init__(self): super().__init__("zhiheng")
 
 class JiuyuanSkill(GeneralSkill):
-    """【救援】：主公技"""
+    """【救援】：主公技，其他吴势力角色在你濒死时对你使用桃，回复量 +1 (本引擎无身份，对所有持有者生效)"""
     def __init__(self): super().__init__("jiuyuan")
 
+    def modify_rescue_heal(self, room: 'GameRoom', rescuer: 'Player', victim: 'Player', amount: int) -> int:
+        if rescuer is not victim and rescuer.kingdom == "wu":
+            return amount + 1
+        return amount
+
 class QixiSkill(GeneralSkill):
     """【奇袭】：黑色当过河拆桥"""
+    transform_targets = ("过河拆桥",)
+
     def __init__(self): super().__init__("qixi")
     
     def can_transform_card(self, player: 'Player', card: Card, as_card_name: str) -> bool:
-        if as_card_name == "过河拆桥" and card.suit in ["spade", "club"]:
+        if as_card_name == "过河拆桥" and card.is_black:
             return True
         return False
 
@@ -342,6 +348,8 @@ class FanjianSkill(GeneralSkill):
 
 class GuoseSkill(GeneralSkill):
     """【国色】：方块当乐不思蜀"""
+    transform_targets = ("乐不思蜀",)
+
     def __init__(self): super().__init__("guose")
     
     def can_transform_card(self, player: 'Player', card: Card, as_card_name: str) -> bool:
@@ -355,6 +363,8 @@ class LiuliSkill(GeneralSkill):
 
 class QianxunSkill(GeneralSkill):
     """【谦逊】：不受乐/顺手"""
+    avoid_card_names = ("乐不思蜀", "顺手牵羊")
+
     def __init__(self): super().__init__("qianxun")
     
     def can_avoid_target(self, room: 'GameRoom', user: 'Player', target: 'Player', card_name: str) -> bool:
@@ -368,8 +378,8 @@ class LianyingSkill(GeneralSkill):
 
     def on_lose_card(self, room: 'GameRoom', player: 'Player', cards: List[Card], move_type: str) -> bool:
         if not player.hand_cards:
-            player.hand_cards.extend(room.deck.draw(1))
-            room.notify_room(room.room_id, f"🔥 {player.nickname} 发动【连营】，摸了一张牌")
+            room.draw_cards(player.hand_cards, 1)
+            room.notify(f"🔥 {player.nickname} 发动【连营】，摸了一张牌")
         return False
 
 class JieyinSkill(GeneralSkill):
@@ -385,8 +395,8 @@ class XiaojiSkill(GeneralSkill):
         if move_type == "equip":
             count = len(cards) * 2
             if count > 0:
-                player.hand_cards.extend(room.deck.draw(count))
-                room.notify_room(room.room_id, f"💃 {player.nickname} 发动【枭姬】，摸了 {count} 张牌")
+                room.draw_cards(player.hand_cards, count)
+                room.notify(f"💃 {player.nickname} 发动【枭姬】，摸了 {count} 张牌")
         return False
 
 
@@ -399,9 +409,14 @@ class QingnangSkill(GeneralSkill):
     def __init__(self): super().__init__("qingnang")
 
 class JijiuSkill(GeneralSkill):
-    """【急救】：回合外红色当桃 (在 Room 濒死结算时判断)"""
+    """【急救】：回合外红色当桃 (回合外的限制在 Room 濒死结算时判断)"""
+    transform_targets = ("桃",)
+
     def __init__(self): super().__init__("jijiu")
 
+    def can_transform_card(self, player: 'Player', card: Card, as_card_name: str) -> bool:
+        return as_card_name == "桃" and card.is_red
+
 class WushuangSkill(GeneralSkill):
     """【无双】：攻击需要两张闪/杀"""
     def __init__(self): super().__init__("wushuang")
@@ -419,8 +434,8 @@ class BiyueSkill(GeneralSkill):
 
     def on_phase_start(self, room: 'GameRoom', player: 'Player', phase: str) -> bool:
         if phase == "finish": # 结束阶段
-            player.hand_cards.extend(room.deck.draw(1))
-            room.notify_room(room.room_id, f"🌙 {player.nickname} 发动【闭月】，摸了一张牌")
+            room.draw_cards(player.hand_cards, 1)
+            room.notify(f"🌙 {player.nickname} 发动【闭月】，摸了一张牌")
         return False
 
 class YongsiSkill(GeneralSkill):
@@ -439,9 +454,9 @@ class YaowuSkill(GeneralSkill):
     def __init__(self): super().__init__("yaowu")
     
     def on_receive_damage(self, room: 'GameRoom', player: 'Player', source: Optional['Player'], amount: int, card: Optional[Card]) -> bool:
-        if source and card and card.name == "杀" and card.suit in ["heart", "diamond"]:
-            source.hand_cards.extend(room.deck.draw(1))
-            room.notify_room(room.room_id, f"👹 {player.nickname} 【耀武】生效，伤害来源摸了一张牌")
+        if source and card and card.name == "杀" and card.is_red:
+            room.draw_cards(source.hand_cards, 1)
+            room.notify(f"👹 {player.nickname} 【耀武】生效，伤害来源摸了一张牌")
         return False
 
 class FuyongSkill(GeneralSkill):
@@ -476,4 +491,109 @@ GENERAL_SKILL_REGISTRY = {
     "qingnang": QingnangSkill(), "jijiu": JijiuSkill(), "wushuang": WushuangSkill(),
     "lijian": LijianSkill(), "biyue": BiyueSkill(), "yongsi": YongsiSkill(),
     "weidi": WeidiSkill(), "yaowu": YaowuSkill(), "fuyong": FuyongSkill()
-}
\ No newline at end of file
+}
+
+# ==========================================
+#        钩子分发表 (开局时按玩家预编译)
+# ==========================================
+class SkillHooks:
+    """
+    单个玩家的技能钩子分发表
+    每个列表只包含真正重写了对应钩子的技能对象，热路径上不再调用基类的空实现
+    """
+    __slots__ = (
+        "distance", "draw_count", "hand_limit", "receive_damage", "phase_start",
+        "use_card", "lose_card", "transform", "avoid_target", "two_cards",
+        "unlimited_sha", "transform_to_shan", "transform_to_sha", "avoid_card_names",
+        "usable", "rescue_heal",
+    )
+
+    def __init__(self):
+        self.distance: Tuple[GeneralSkill, ...] = ()
+        self.draw_count: Tuple[GeneralSkill, ...] = ()
+        self.hand_limit: Tuple[GeneralSkill, ...] = ()
+        self.receive_damage: Tuple[GeneralSkill, ...] = ()
+        self.phase_start: Tuple[GeneralSkill, ...] = ()
+        self.use_card: Tuple[GeneralSkill, ...] = ()
+        self.lose_card: Tuple[GeneralSkill, ...] = ()
+        self.avoid_target: Tuple[GeneralSkill, ...] = ()
+        self.two_cards: Tuple[GeneralSkill, ...] = ()
+        self.rescue_heal: Tuple[GeneralSkill, ...] = ()
+        # 转化技按目标牌名分组: {"闪": (倾国, 龙胆), "杀": (武圣, 龙胆), ...}
+        self.transform: Dict[str, Tuple[GeneralSkill, ...]] = {}
+
+        # --- 缓存的布尔能力 ---
+        self.unlimited_sha: bool = False
+        self.transform_to_shan: bool = False
+        self.transform_to_sha: bool = False
+        self.avoid_card_names: frozenset = frozenset()
+        # 牌名 -> 可当作该牌使用/打出的实体牌位掩码 (本名牌 + 转化技可转化的牌)
+        self.usable: Dict[str, int] = {}
+
+    def transformers(self, as_card_name: str) -> Tuple[GeneralSkill, ...]:
+        """可以把手牌转化为 as_card_name 的技能 (无则返回空元组)"""
+        return self.transform.get(as_card_name, ())
+
+    def can_transform(self, player: 'Player', card: Card, as_card_name: str) -> bool:
+        for skill in self.transform.get(as_card_name, ()):
+            if skill.can_transform_card(player, card, as_card_name):
+                return True
+        return False
+
+    def usable_mask(self, as_card_name: str) -> int:
+        return self.usable.get(as_card_name, 0)
+
+    def can_use_as(self, card: Card, as_card_name: str) -> bool:
+        """card 能否当作 as_card_name 使用/打出 (本名或经转化)，O(1)"""
+        return (card.bit & self.usable.get(as_card_name, 0)) != 0
+
+
+# 钩子方法名 -> SkillHooks 中的分发列表字段
+_HOOK_SLOTS = {
+    "modify_distance": "distance",
+    "modify_draw_count": "draw_count",
+    "modify_hand_limit": "hand_limit",
+    "on_receive_damage": "receive_damage",
+    "on_phase_start": "phase_start",
+    "on_use_card": "use_card",
+    "on_lose_card": "lose_card",
+    "can_avoid_target": "avoid_target",
+    "attack_requires_two_cards": "two_cards",
+    "modify_rescue_heal": "rescue_heal",
+}
+
+def _overrides(skill: GeneralSkill, method: str) -> bool:
+    return getattr(type(skill), method) is not getattr(GeneralSkill, method)
+
+@lru_cache(maxsize=None)
+def _transform_source_mask(skill_name: str, as_card_name: str) -> int:
+    """某转化技可以转化为 as_card_name 的所有实体牌 (整副牌只计算一次)"""
+    skill = GENERAL_SKILL_REGISTRY[skill_name]
+    return get_card_catalog().mask_where(lambda c: skill.can_transform_card(None, c, as_card_name))
+
+def compile_skill_hooks(player: 'Player') -> SkillHooks:
+    """根据玩家当前的技能列表生成钩子分发表 (在 _finalize_setup 中调用)"""
+    hooks = SkillHooks()
+    skills = [GENERAL_SKILL_REGISTRY[s] for s in player.skills if s in GENERAL_SKILL_REGISTRY]
+
+    for method, slot in _HOOK_SLOTS.items():
+        setattr(hooks, slot, tuple(sk for sk in skills if _overrides(sk, method)))
+
+    transform: Dict[str, List[GeneralSkill]] = {}
+    for sk in skills:
+        if not _overrides(sk, "can_transform_card"): continue
+        for as_name in sk.transform_targets:
+            transform.setdefault(as_name, []).append(sk)
+    hooks.transform = {k: tuple(v) for k, v in transform.items()}
+
+    hooks.unlimited_sha = any(sk.has_unlimited_sha(player) for sk in skills if _overrides(sk, "has_unlimited_sha"))
+    hooks.transform_to_shan = "闪" in hooks.transform
+    hooks.transform_to_sha = "杀" in hooks.transform
+    hooks.avoid_card_names = frozenset(n for sk in hooks.avoid_target for n in sk.avoid_card_names)
+
+    usable = dict(get_card_catalog().name_mask)
+    for as_name, sks in hooks.transform.items():
+        for sk in sks:
+            usable[as_name] = usable.get(as_name, 0) | _transform_source_mask(sk.name, as_name)
+    hooks.usable = usable
+    return hooks
@@ -1,9 +1,16 @@
+from abc import abstractmethod
 from typing import Optional, Tuple, TYPE_CHECKING, List
 import random
+import time
 
 from app.game.skills.core import CardSkill
-from app.game.card import Card, CardType
+from app.game.card import Card
 from app.game.enums import PendingType
+from app.core.config import AOE_WINDOW_SECONDS
+from app.game.pending import (
+    AoePending, AoeWindowPending, ChooseCardPending, DismantlePending, DuelPending, Pending, SnatchPending,
+)
+from app.game.zones import SLOT_OF_TYPE
 
 if TYPE_CHECKING:
     from app.game.room import GameRoom
@@ -11,17 +18,8 @@ if TYPE_CHECKING:
 
 # --- 工具函数 ---
 def consume_card_from_hand(player: 'Player', card: Card, room: 'GameRoom', to_discard: bool = True):
-    if card in player.hand_cards:
-        player.hand_cards.remove(card)
-    else:
-        # 容错：按ID查找
-        for c in player.hand_cards:
-            if c.card_id == card.card_id:
-                player.hand_cards.remove(c)
-                break
-    
-    if to_discard:
-        room.deck.discard_pile.append(card)
+    """使用一张手牌：进入弃牌堆，或 (to_discard=False) 暂放处理区，由调用方再移到最终区域"""
+    room.move_card(card, room.deck.discard_pile if to_discard else room.processing)
 
 # ==========================================
 # 1. 装备牌处理逻辑
@@ -35,17 +33,11 @@ class EquipSkill(CardSkill):
         return True, ""
 
     def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
-        slot = "weapon"
-        if card.card_type == CardType.EQUIP_ARMOR: slot = "armor"
-        elif card.card_type == CardType.EQUIP_HORSE_PLUS: slot = "horse_plus"
-        elif card.card_type == CardType.EQUIP_HORSE_MINUS: slot = "horse_minus"
-        
-        old_item = player.equips.get(slot)
+        old_item = player.equips.get(SLOT_OF_TYPE[card.card_type])
         if old_item:
-            room.deck.discard_pile.append(old_item)
+            room.move_card(old_item, room.deck.discard_pile)
         
-        consume_card_from_hand(player, card, room, to_discard=False)
-        player.equips[slot] = card
+        room.move_card(card, player.equips)
         return True, f"装备了 【{card.name}】"
 
 # ==========================================
@@ -75,8 +67,7 @@ class DelayedTrickSkill(CardSkill):
 
     def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
         target = player if self._name == "闪电" else room.get_player(target_sid)
-        consume_card_from_hand(player, card, room, to_discard=False)
-        target.judging_cards.append(card)
+        room.move_card(card, target.judging_cards)
         return True, f"对 {target.nickname} 使用了 【{card.name}】"
 
 # ==========================================
@@ -94,23 +85,16 @@ class ShaSkill(CardSkill):
         
         # 诸葛连弩/咆哮检测
         has_crossbow = player.equips.get("weapon") and player.equips["weapon"].name == "诸葛连弩"
-        has_unlimited = False
-        from app.game.skills.general import GENERAL_SKILL_REGISTRY
-        for s in player.skills:
-            skill = GENERAL_SKILL_REGISTRY.get(s)
-            if skill and skill.has_unlimited_sha(player): has_unlimited = True
-        
-        if not has_crossbow and not has_unlimited and player.sha_count >= 1:
+        if not has_crossbow and not player.hooks.unlimited_sha and player.sha_count >= 1:
             return False, "本回合出杀次数已耗尽"
 
         return True, ""
 
     def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
-        from app.game.room import PendingAction
         consume_card_from_hand(player, card, room)
         player.sha_count += 1
         
-        room.pending_action = PendingAction(
+        room.pending_action = Pending(
             source_sid=player.sid,
             target_sid=target_sid,
             card_id=card.card_id,
@@ -129,13 +113,32 @@ class TaoSkill(CardSkill):
 
     def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
         consume_card_from_hand(player, card, room)
-        player.hp = min(player.hp + 1, player.max_hp)
+        if player.hp < player.max_hp: room.change_hp(player, 1)
         return True, "回复了1点体力"
 
 # ==========================================
 # 4. 锦囊：拆 / 顺 / 无中
 # ==========================================
-class ShunshouSkill(CardSkill):
+class TrickSkill(CardSkill):
+    """
+    普通锦囊：execute 只用掉这张牌并打开无懈可击窗口，锦囊效果写在 resolve 中，
+    窗口关闭且未被抵消时才结算 (场上无人持有无懈可击时立即结算)
+    """
+    use_message: str = ""  # 使用时的提示
+
+    def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
+        consume_card_from_hand(player, card, room)
+        room.use_trick(self.name, player, card, target_sid)
+        return True, self.use_message or f"{self.name}！"
+
+    @abstractmethod
+    def resolve(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
+        """锦囊生效"""
+        pass
+
+class ShunshouSkill(TrickSkill):
+    use_message = "请选择要获得的牌"
+
     @property
     def name(self) -> str:
         return "顺手牵羊"
@@ -145,19 +148,18 @@ class ShunshouSkill(CardSkill):
         if room.get_distance(player.sid, target_sid) > 1: return False, "距离过远"
         return True, ""
 
-    def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
-        from app.game.room import PendingAction
-        consume_card_from_hand(player, card, room)
-        room.pending_action = PendingAction(
+    def resolve(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
+        room.pending_action = SnatchPending(
             source_sid=player.sid,
             target_sid=player.sid, # 自己操作
             card_id=card.card_id,
-            action_type=PendingType.ASK_FOR_SNATCH,
-            extra_data={"target_to_snatch": target_sid}
+            victim_sid=target_sid
         )
         return True, "请选择要获得的牌"
 
-class GuoheSkill(CardSkill):
+class GuoheSkill(TrickSkill):
+    use_message = "请选择要弃置的牌"
+
     @property
     def name(self) -> str:
         return "过河拆桥"
@@ -166,34 +168,34 @@ class GuoheSkill(CardSkill):
         if not target_sid or target_sid == player.sid: return False, "无效目标"
         return True, ""
 
-    def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
-        from app.game.room import PendingAction
-        consume_card_from_hand(player, card, room)
-        room.pending_action = PendingAction(
+    def resolve(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
+        room.pending_action = DismantlePending(
             source_sid=player.sid,
             target_sid=player.sid,
             card_id=card.card_id,
-            action_type=PendingType.ASK_FOR_DISMANTLE,
-            extra_data={"target_to_dismantle": target_sid}
+            victim_sid=target_sid
         )
         return True, "请选择要弃置的牌"
 
-class WuzhongSkill(CardSkill):
+class WuzhongSkill(TrickSkill):
+    use_message = "摸了两张牌"
+
     @property
     def name(self) -> str:
         return "无中生有"
 
-    def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
-        consume_card_from_hand(player, card, room)
-        player.hand_cards.extend(room.deck.draw(2))
+    def resolve(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
+        room.draw_cards(player.hand_cards, 2)
         return True, "摸了两张牌"
 
 # ==========================================
 # 5. 复杂锦囊：决斗 / 借刀 / 桃园 / 五谷 / 南蛮 / 万箭 / 无懈
 # ==========================================
 
-class JuedouSkill(CardSkill):
+class JuedouSkill(TrickSkill):
     """【决斗】：出牌阶段，对一名其他角色使用。由其开始，其与你轮流打出一张【杀】，直到有一方不打。"""
+    use_message = "决斗开始！等待对方出杀"
+
     @property
     def name(self) -> str:
         return "决斗"
@@ -202,28 +204,22 @@ class JuedouSkill(CardSkill):
         if not target_sid or target_sid == player.sid: return False, "需指定一名其他角色"
         return True, ""
 
-    def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
-        from app.game.room import PendingAction
-        consume_card_from_hand(player, card, room)
-        
+    def resolve(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
         # 决斗逻辑：首先询问目标出杀
-        # extra_data 记录 "duel_source" (发起者)，用于轮询逻辑回弹
-        room.pending_action = PendingAction(
+        # 记录 duel_source (发起者)，用于轮询逻辑回弹；target_sid 即当前该谁出杀
+        room.pending_action = DuelPending(
             source_sid=player.sid,
             target_sid=target_sid,
             card_id=card.card_id,
-            action_type=PendingType.ASK_FOR_SHA, # 必须在 enums.py 添加 ASK_FOR_SHA
-            extra_data={
-                "is_duel": True, 
-                "duel_source": player.sid, 
-                "duel_target": target_sid,
-                "current_turn": target_sid # 当前该谁出杀
-            }
+            duel_source=player.sid,
+            duel_target=target_sid
         )
         return True, "决斗开始！等待对方出杀"
 
-class JiedaoSkill(CardSkill):
+class JiedaoSkill(TrickSkill):
     """【借刀杀人】：对有武器的角色使用，令其杀指定角色或交出武器"""
+    use_message = "等待对方响应：出杀或交出武器"
+
     @property
     def name(self) -> str:
         return "借刀杀人"
@@ -234,16 +230,13 @@ class JiedaoSkill(CardSkill):
         if not target.equips.get("weapon"): return False, "目标没有装备武器"
         return True, ""
 
-    def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
-        from app.game.room import PendingAction
-        consume_card_from_hand(player, card, room)
-        
+    def resolve(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
         # 借刀逻辑稍微复杂，需要前端先选“借谁的刀”，再选“杀谁”
         # 这里简化为：前端 play_card 时已经传了 target_sid (被借刀的人)
         # 我们需要在 extra_data 里记录“要杀谁”，但这需要前端支持 play_card 传两个目标
         # 暂时简化：服务器挂起，让被借刀的人选择“给武器”或“选择一名角色出杀”
         
-        room.pending_action = PendingAction(
+        room.pending_action = Pending(
             source_sid=player.sid,
             target_sid=target_sid,
             card_id=card.card_id,
@@ -251,55 +244,61 @@ class JiedaoSkill(CardSkill):
         )
         return True, "等待对方响应：出杀或交出武器"
 
-class TaoyuanSkill(CardSkill):
+class TaoyuanSkill(TrickSkill):
     """【桃园结义】：全体回1血"""
+    use_message = "桃园结义，万物复苏"
+
     @property
     def name(self) -> str:
         return "桃园结义"
 
-    def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
-        consume_card_from_hand(player, card, room)
+    def resolve(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
         for p in room.players:
             if p.is_alive and p.hp < p.max_hp:
-                p.hp += 1
-                room.notify_room(room.room_id, f"🍑 {p.nickname} 回复了1点体力")
+                room.change_hp(p, 1)
+                room.notify(f"🍑 {p.nickname} 回复了1点体力")
         return True, "桃园结义，万物复苏"
 
-class NanmanSkill(CardSkill):
+class NanmanSkill(TrickSkill):
     """【南蛮入侵】：所有其他人出杀，否则掉血"""
     @property
     def name(self) -> str:
         return "南蛮入侵"
 
-    def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
-        consume_card_from_hand(player, card, room)
+    def resolve(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
         return self._start_aoe(room, player, card, PendingType.ASK_FOR_SHA)
 
     def _start_aoe(self, room: 'GameRoom', source: 'Player', card: Card, action_type: PendingType):
         # 构建受害者队列 (逆时针，排除自己)
-        targets = []
-        idx = room.players.index(source)
-        count = len(room.players)
-        for i in range(1, count):
-            p = room.players[(idx + i) % count]
-            if p.is_alive:
-                targets.append(p.sid)
+        targets = [p.sid for p in room.iter_alive_from(source)]
         
         if not targets: return True, "场上无其他存活角色"
 
+        # 同时响应模式：一次性询问所有目标，收齐后由房间按座次结算
+        if room.aoe_mode == "simultaneous":
+            room.pending_action = AoeWindowPending(
+                source_sid=source.sid,
+                target_sid=targets[0],
+                card_id=card.card_id,
+                action_type=action_type,
+                aoe_targets=targets,
+                current_index=-1,
+                card_name=card.name,
+                waiting=targets[:],
+                deadline=time.time() + AOE_WINDOW_SECONDS
+            )
+            return True, f"{card.name}！所有角色同时响应..."
+
         # 启动第一个询问
-        from app.game.room import PendingAction
         first_target = targets[0]
-        room.pending_action = PendingAction(
+        room.pending_action = AoePending(
             source_sid=source.sid,
             target_sid=first_target,
             card_id=card.card_id,
             action_type=action_type,
-            extra_data={
-                "aoe_targets": targets, # 完整队列
-                "current_index": 0,     # 当前进度
-                "card_name": card.name
-            }
+            aoe_targets=targets, # 完整队列
+            current_index=0,     # 当前进度
+            card_name=card.name
         )
         return True, f"{card.name}！轮流响应中..."
 
@@ -309,71 +308,50 @@ class WanjianSkill(NanmanSkill): # 复用 AOE 逻辑
     def name(self) -> str:
         return "万箭齐发"
 
-    def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
-        consume_card_from_hand(player, card, room)
+    def resolve(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
         return self._start_aoe(room, player, card, PendingType.ASK_FOR_SHAN)
 
-class WuguSkill(CardSkill):
+class WuguSkill(TrickSkill):
     """【五谷丰登】：亮出 N 张牌，轮流选择"""
+    use_message = "五谷丰登！"
+
     @property
     def name(self) -> str:
         return "五谷丰登"
 
-    def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
-        consume_card_from_hand(player, card, room)
-        
+    def resolve(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
         # 1. 亮牌
-        alive_count = len([p for p in room.players if p.is_alive])
-        wugu_cards = room.deck.draw(alive_count)
+        alive_count = room.alive_ring.count
+        wugu_cards = room.draw_cards(room.processing, alive_count) # 亮出的牌放在处理区
         
-        # 这里的 public_pile 建议在 GameRoom 中定义一个临时字段，或者直接放在 extra_data
-        # 为了前端展示，放在 extra_data 最方便
+        # 亮出的牌同时记录在挂起状态中，前端通过 extra_data.wugu_cards 展示
         
         # 2. 构建轮询队列 (从自己开始)
-        targets = []
-        idx = room.players.index(player)
-        count = len(room.players)
-        for i in range(count):
-            p = room.players[(idx + i) % count]
-            if p.is_alive:
-                targets.append(p.sid)
-
-        from app.game.room import PendingAction
-        room.pending_action = PendingAction(
+        targets = [p.sid for p in room.iter_alive_from(player, include_self=True)]
+
+        room.pending_action = ChooseCardPending(
             source_sid=player.sid,
             target_sid=targets[0],
             card_id=card.card_id,
-            action_type=PendingType.ASK_FOR_CHOOSE_CARD, # 需在 enums 添加
-            extra_data={
-                "wugu_cards": [c.model_dump() for c in wugu_cards],
-                "aoe_targets": targets,
-                "current_index": 0
-            }
+            wugu_cards=wugu_cards, # 序列化时转为字典
+            aoe_targets=targets,
+            current_index=0
         )
         # 广播一下亮出的牌
         card_names = "、".join([c.name for c in wugu_cards])
+        room.notify(f"五谷丰登！亮出了: {card_names}")
         return True, f"五谷丰登！亮出了: {card_names}"
 
 class WuxieSkill(CardSkill):
-    """【无懈可击】：抵消锦囊 (作为响应牌使用)"""
+    """【无懈可击】：抵消锦囊 (只能在锦囊生效前的无懈可击窗口中响应打出，见 GameRoom.use_trick)"""
     @property
     def name(self) -> str:
         return "无懈可击"
 
     def validate(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
-        # 只能在有 PendingAction 且是锦囊结算时使用
-        # 由于逻辑极其复杂（此时是别人的回合），主要作为 handle_response 的 payload 使用
-        # 这里的 validate 主要用于 "是否能点得动"
-        if not room.pending_action: return False, "当前无锦囊可抵消"
-        return True, ""
+        return False, "无懈可击只能在锦囊生效前响应使用"
 
     def execute(self, room: 'GameRoom', player: 'Player', card: Card, target_sid: Optional[str]) -> Tuple[bool, str]:
-        # 通常不直接由 play_card 调用，而是由 respond_action 调用
-        # 如果非要主动用，那就是取消当前的 PendingAction
-        if room.pending_action:
-            consume_card_from_hand(player, card, room)
-            room.pending_action = None # 简单粗暴抵消
-            return True, "无懈可击！锦囊失效"
         return False, "无效使用"
 
 # ==========================================
@@ -0,0 +1,125 @@
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, List, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .room import GameRoom
+
+# 单次推进最多执行的步骤数 (防止规则错误导致死循环卡死事件循环)
+MAX_STEPS_PER_RUN = 100_000
+
+class Step:
+    """
+    一个待执行的结算步骤：GameRoom 上的方法名 + 参数
+    参数只使用 sid / 数值 / 不可变卡牌 / Pending 对象，不引用 Player，便于克隆房间时原样复制
+    """
+    __slots__ = ("name", "args")
+
+    def __init__(self, name: str, args: Tuple[Any, ...]):
+        self.name = name
+        self.args = args
+
+    def __repr__(self) -> str:
+        return f"Step({self.name}{self.args})"
+
+class ResolutionStack:
+    """
+    结算栈 (延续队列)：回合阶段、伤害、技能触发、AOE 轮询都拆成步骤压栈，由 run() 迭代执行
+    - 后压入的先执行；需要按顺序执行的一组步骤用 push_seq
+    - 出现 pending_action (等待玩家响应) 或游戏结束时暂停，响应处理完后由 @command 再次 run()
+    - 每个步骤都是一次可计量的单元，profile=True 时记录各步骤的次数与耗时
+    """
+    __slots__ = ("steps", "running", "profile", "stats")
+
+    def __init__(self, profile: bool = False):
+        self.steps: List[Step] = []
+        self.running: bool = False
+        self.profile: bool = profile
+        self.stats: Dict[str, List[float]] = {}   # 步骤名 -> [执行次数, 累计耗时(秒)]
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def push(self, name: str, *args: Any):
+        """压入一个步骤 (下一个执行)"""
+        self.steps.append(Step(name, args))
+
+    def defer(self, name: str, *args: Any):
+        """压到栈底：当前所有结算完成后才执行"""
+        self.steps.insert(0, Step(name, args))
+
+    def push_seq(self, *steps: Tuple[Any, ...]):
+        """按给定顺序依次执行的一组步骤，每项为 (方法名, 参数...)"""
+        for name, *args in reversed(steps):
+            self.steps.append(Step(name, tuple(args)))
+
+    def clear(self):
+        self.steps.clear()
+
+    def run(self, room: 'GameRoom') -> int:
+        """推进结算直到需要玩家输入、栈空或游戏结束，返回本次执行的步骤数"""
+        if self.running: return 0
+        from .enums import GamePhase
+        self.running = True
+        executed = 0
+        try:
+            steps = self.steps
+            while steps and room.pending_action is None:
+                if room.phase == GamePhase.GAME_OVER:
+                    steps.clear()
+                    break
+                if executed >= MAX_STEPS_PER_RUN:
+                    print(f"⚠️ 结算步骤超过 {MAX_STEPS_PER_RUN}，已中止：{steps[-1]!r}")
+                    steps.clear()
+                    break
+                step = steps.pop()
+                executed += 1
+                if self.profile:
+                    t = time.perf_counter()
+                    getattr(room, step.name)(*step.args)
+                    entry = self.stats.setdefault(step.name, [0, 0.0])
+                    entry[0] += 1
+                    entry[1] += time.perf_counter() - t
+                else:
+                    getattr(room, step.name)(*step.args)
+        finally:
+            self.running = False
+        return executed
+
+    def clone(self, pending_map: Dict[int, Any]) -> 'ResolutionStack':
+        """复制栈 (参数中的 Pending 对象按 pending_map 映射或单独复制)"""
+        from .pending import Pending
+        twin = ResolutionStack(self.profile)
+        for step in self.steps:
+            args = step.args
+            if any(isinstance(a, Pending) for a in args):
+                args = tuple(
+                    (pending_map.get(id(a)) or a.clone()) if isinstance(a, Pending) else a
+                    for a in args
+                )
+            twin.steps.append(Step(step.name, args))
+        return twin
+
+def command(method: Callable) -> Callable:
+    """
+    玩家指令装饰器：指令本身只修改状态并压入后续步骤，返回前统一推进结算栈
+    在步骤执行过程中被调用时不重复推进 (由外层循环继续)
+    """
+    @wraps(method)
+    def wrapper(room: 'GameRoom', *args, **kwargs):
+        if room.stack.running: return method(room, *args, **kwargs)
+        before = room.pending_action
+        before_target = before.target_sid if before else None
+        result = method(room, *args, **kwargs)
+        room.stack.run(room)
+        # 替无法 (或设置了不) 响应的玩家立即放弃，放弃后可能引出新的结算与询问
+        while room.auto_respond():
+            room.stack.run(room)
+        room.version += 1 # 状态版本 (合法动作等按版本缓存的结果随之失效)
+        # 等待响应的对象或响应者发生变化时通知前端
+        act = room.pending_action
+        if act is not None and (act is not before or act.target_sid != before_target):
+            from .events import PromptOpened
+            room.emit(PromptOpened(act.target_sid, act.action_type, act.source_sid))
+        return result
+    return wrapper
@@ -0,0 +1,114 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# ==========================================
+# 分层时间轮：全服所有房间的超时共用一个实例，由传输层的单个任务按 tick 推进
+# - 共 levels 层，每层 2**bits 个槽；第 k 层的一个槽跨 2**(bits*k) 个 tick
+# - schedule / cancel 为 O(1)；每个 tick 只处理一个底层槽，高层槽在下一层转满一圈时下放
+# - 同一 key 只保留最后一次 schedule，旧定时器惰性作废 (不在槽里查找删除)
+# ==========================================
+
+@dataclass(slots=True, eq=False)
+class _Timer:
+    key: Hashable
+    expires: int        # 到期 tick
+    payload: Any
+    alive: bool = True
+
+class TimingWheel:
+    def __init__(self, tick: float = 0.1, bits: int = 6, levels: int = 4, now: Optional[float] = None):
+        self.tick = tick
+        self._bits = bits
+        self._mask = (1 << bits) - 1
+        self._levels = levels
+        self._origin = time.time() if now is None else now
+        self._current = 0                                 # 已处理到的 tick
+        self._wheels: List[List[List[_Timer]]] = [[[] for _ in range(1 << bits)] for _ in range(levels)]
+        self._overflow: List[_Timer] = []                # 超出最高层范围的定时器 (最高层转满一圈时重新放置)
+        self._due: List[_Timer] = []                     # 放入时已到期，下次 advance 立即触发
+        self._by_key: Dict[Hashable, _Timer] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._by_key
+
+    def _tick_of(self, when: float) -> int:
+        return int((when - self._origin) / self.tick)
+
+    def schedule(self, key: Hashable, when: float, payload: Any = None):
+        """在 when (time.time() 时间戳) 触发 key；已有同 key 的定时器时替换之"""
+        old = self._by_key.get(key)
+        if old is not None: old.alive = False
+        # 向上取整到 tick，保证不会早于 when 触发
+        expires = self._tick_of(when)
+        if self._origin + expires * self.tick < when: expires += 1
+        timer = self._by_key[key] = _Timer(key, expires, payload)
+        if expires <= self._current: self._due.append(timer)
+        else: self._place(timer)
+
+    def cancel(self, key: Hashable) -> bool:
+        timer = self._by_key.pop(key, None)
+        if timer is None: return False
+        timer.alive = False
+        return True
+
+    def _place(self, timer: _Timer):
+        # 下放时到期 tick 可能正是当前 tick：落入当前底层槽，本 tick 随后处理
+        cur, exp = self._current, timer.expires
+        bits = self._bits
+        for level in range(self._levels):
+            # 到期 tick 与当前 tick 在更高位一致：落在本层这一圈内
+            if (exp ^ cur) >> (bits * (level + 1)) == 0:
+                self._wheels[level][(exp >> (bits * level)) & self._mask].append(timer)
+                return
+        self._overflow.append(timer)
+
+    def advance(self, now: Optional[float] = None) -> List[Tuple[Hashable, Any]]:
+        """推进到 now，返回到期的 (key, payload)，按到期先后排列"""
+        target = self._tick_of(time.time() if now is None else now)
+        fired: List[Tuple[Hashable, Any]] = []
+        if self._due:
+            due, self._due = self._due, []
+            self._collect(due, fired)
+        if not self._by_key:
+            # 空轮直接跳到目标 tick，长时间空闲不产生逐 tick 开销
+            self._current = max(self._current, target)
+            return fired
+
+        bits, mask, wheels = self._bits, self._mask, self._wheels
+        while self._current < target:
+            t = self._current = self._current + 1
+            # 低位归零时从高到低下放对应的高层槽
+            if t & mask == 0:
+                top = self._levels
+                for level in range(1, self._levels):
+                    if (t >> (bits * level)) & mask: top = level; break
+                if top == self._levels and self._overflow:
+                    overflow, self._overflow = self._overflow, []
+                    self._cascade(overflow)
+                for level in range(min(top, self._levels - 1), 0, -1):
+                    slot = (t >> (bits * level)) & mask
+                    bucket, wheels[level][slot] = wheels[level][slot], []
+                    self._cascade(bucket)
+            slot = t & mask
+            if wheels[0][slot]:
+                bucket, wheels[0][slot] = wheels[0][slot], []
+                self._collect(bucket, fired)
+            if not self._by_key:
+                self._current = target
+                break
+        return fired
+
+    def _cascade(self, bucket: List[_Timer]):
+        for timer in bucket:
+            if timer.alive: self._place(timer)
+
+    def _collect(self, bucket: List[_Timer], fired: List[Tuple[Hashable, Any]]):
+        for timer in bucket:
+            if not timer.alive: continue
+            timer.alive = False
+            if self._by_key.get(timer.key) is timer: del self._by_key[timer.key]
+            fired.append((timer.key, timer.payload))
@@ -0,0 +1,203 @@
+from typing import Dict, Iterable, List, Optional, TYPE_CHECKING
+
+from .card import Card, Suit
+from .zones import CardZone, ZoneKind
+
+if TYPE_CHECKING:
+    from .player import Player
+
+# ==========================================
+# 公开信息下的记牌器 (每个房间一个)
+# 随每次移牌增量更新 (GameRoom.move_cards / draw_cards / 重洗牌堆)，查询均为 O(1)：
+# - 未见的牌：摸牌堆 + 各手牌中身份未公开的牌，按牌名/花色/颜色计数
+# - 公开的手牌：从公开区域 (弃牌堆/处理区/装备区/判定区) 进入手牌的牌，如五谷丰登选走的牌、顺走的装备
+# - 私下知道的手牌：手牌之间暗中转移的牌 (仁德、遗计分牌、顺手牵羊拿走手牌)，给出方知道牌去了谁手里
+# 某名玩家视角的未见数 = 公开未见数 - 自己手中未公开的牌 - 自己私下知道的他人手牌
+# ==========================================
+
+# 牌的身份对所有人隐藏的区域
+_HIDDEN = (ZoneKind.DRAW, ZoneKind.HAND)
+
+class CardCounts:
+    """一组牌按牌名/花色/颜色的计数"""
+    __slots__ = ("total", "names", "suits", "red")
+
+    def __init__(self, cards: Iterable[Card] = ()):
+        self.total = 0
+        self.names: Dict[str, int] = {}
+        self.suits: Dict[Suit, int] = {}
+        self.red = 0
+        for c in cards: self.add(c)
+
+    def copy(self) -> 'CardCounts':
+        twin = object.__new__(CardCounts)
+        twin.total, twin.names, twin.suits, twin.red = self.total, dict(self.names), dict(self.suits), self.red
+        return twin
+
+    def add(self, card: Card):
+        self.total += 1
+        self.names[card.name] = self.names.get(card.name, 0) + 1
+        self.suits[card.suit] = self.suits.get(card.suit, 0) + 1
+        if card.is_red: self.red += 1
+
+    def remove(self, card: Card):
+        self.total -= 1
+        self.names[card.name] -= 1
+        self.suits[card.suit] -= 1
+        if card.is_red: self.red -= 1
+
+    def count_name(self, name: str) -> int:
+        return self.names.get(name, 0)
+
+    def count_suit(self, suit: Suit) -> int:
+        return self.suits.get(suit, 0)
+
+class KnownCards(CardCounts):
+    """某名角色手中身份已知的牌 (按 uid 索引)"""
+    __slots__ = ("cards",)
+
+    def __init__(self):
+        super().__init__()
+        self.cards: Dict[int, Card] = {}
+
+    def copy(self) -> 'KnownCards':
+        twin = object.__new__(KnownCards)
+        twin.total, twin.names, twin.suits, twin.red = self.total, dict(self.names), dict(self.suits), self.red
+        twin.cards = dict(self.cards)
+        return twin
+
+    def __contains__(self, card: Card) -> bool:
+        return card.uid in self.cards
+
+    def add(self, card: Card):
+        if card.uid in self.cards: return
+        self.cards[card.uid] = card
+        super().add(card)
+
+    def discard(self, card: Card) -> bool:
+        if self.cards.pop(card.uid, None) is None: return False
+        super().remove(card)
+        return True
+
+class CardTracker:
+    __slots__ = ("unseen", "public", "private", "private_counts")
+
+    def __init__(self):
+        self.unseen = CardCounts()                          # 公开视角未见的牌
+        self.public: Dict[str, KnownCards] = {}             # owner -> 公开的手牌
+        self.private: Dict[str, Dict[str, KnownCards]] = {} # viewer -> owner -> 私下知道的手牌
+        self.private_counts: Dict[str, CardCounts] = {}     # viewer -> 私下知道的牌合计
+
+    def reset(self, cards: Iterable[Card]):
+        """开局：整副牌都未见"""
+        self.unseen = CardCounts(cards)
+        self.public, self.private, self.private_counts = {}, {}, {}
+
+    def clone(self) -> 'CardTracker':
+        twin = object.__new__(CardTracker)
+        twin.unseen = self.unseen.copy()
+        twin.public = {owner: known.copy() for owner, known in self.public.items()}
+        twin.private = {viewer: {owner: known.copy() for owner, known in by_owner.items()}
+                        for viewer, by_owner in self.private.items()}
+        twin.private_counts = {viewer: counts.copy() for viewer, counts in self.private_counts.items()}
+        return twin
+
+    def keep_private_of(self, viewer: str):
+        """只保留 viewer 的私下信息 (推演中重新发牌后，其他人私下知道的牌已不在原处)"""
+        self.private = {viewer: self.private[viewer]} if viewer in self.private else {}
+        self.private_counts = {viewer: self.private_counts[viewer]} if viewer in self.private_counts else {}
+
+    # --- 更新 ---
+
+    def on_move(self, card: Card, src: Optional[CardZone], dst: CardZone):
+        """一张实体牌从 src 移到 dst (src 为 None 视为来自隐藏区域)"""
+        card = card.base
+        src_kind = src.kind if src is not None else ZoneKind.DRAW
+        src_hand = src.owner if src_kind is ZoneKind.HAND else None
+        was_public = src_kind not in _HIDDEN or (src_hand is not None and self._drop_public(src_hand, card))
+        if src_hand is not None: self._drop_private(src_hand, card)
+
+        if dst.kind not in _HIDDEN:
+            if not was_public: self.unseen.remove(card) # 亮出
+        elif dst.kind is ZoneKind.HAND:
+            if was_public:
+                known = self.public.get(dst.owner)
+                if known is None: known = self.public[dst.owner] = KnownCards()
+                known.add(card)
+            elif src_hand is not None and src_hand != dst.owner:
+                self._add_private(src_hand, dst.owner, card) # 暗中交出：给出方知道
+        elif was_public:
+            self.unseen.add(card) # 公开的牌放回摸牌堆
+
+    def on_reshuffle(self, draw_pile: CardZone):
+        """弃牌堆洗回摸牌堆：其中的牌重新变为未见"""
+        for card in draw_pile: self.unseen.add(card)
+
+    def _drop_public(self, owner: str, card: Card) -> bool:
+        known = self.public.get(owner)
+        return known is not None and known.discard(card)
+
+    def _drop_private(self, owner: str, card: Card):
+        for viewer, by_owner in self.private.items():
+            known = by_owner.get(owner)
+            if known is not None and known.discard(card): self.private_counts[viewer].remove(card)
+
+    def _add_private(self, viewer: str, owner: str, card: Card):
+        by_owner = self.private.get(viewer)
+        if by_owner is None: by_owner = self.private[viewer] = {}
+        known = by_owner.get(owner)
+        if known is None: known = by_owner[owner] = KnownCards()
+        known.add(card)
+        counts = self.private_counts.get(viewer)
+        if counts is None: counts = self.private_counts[viewer] = CardCounts()
+        counts.add(card)
+
+    # --- 查询 ---
+    # viewer 为 None 时是旁观者视角；否则扣除 viewer 自己手中未公开的牌与其私下知道的他人手牌
+
+    def unseen_total(self, viewer: Optional['Player'] = None) -> int:
+        total = self.unseen.total
+        if viewer is not None:
+            public, private = self.public.get(viewer.sid), self.private_counts.get(viewer.sid)
+            total -= len(viewer.hand_cards) - (public.total if public else 0)
+            if private is not None: total -= private.total
+        return total
+
+    def unseen_name(self, name: str, viewer: Optional['Player'] = None) -> int:
+        count = self.unseen.count_name(name)
+        if viewer is not None:
+            public, private = self.public.get(viewer.sid), self.private_counts.get(viewer.sid)
+            count -= viewer.hand_cards.count_name(name) - (public.count_name(name) if public else 0)
+            if private is not None: count -= private.count_name(name)
+        return count
+
+    def unseen_suit(self, suit: Suit, viewer: Optional['Player'] = None) -> int:
+        count = self.unseen.count_suit(suit)
+        if viewer is not None:
+            public, private = self.public.get(viewer.sid), self.private_counts.get(viewer.sid)
+            count -= viewer.hand_cards.count_suit(suit) - (public.count_suit(suit) if public else 0)
+            if private is not None: count -= private.count_suit(suit)
+        return count
+
+    def unseen_red(self, viewer: Optional['Player'] = None) -> int:
+        count = self.unseen.red
+        if viewer is not None:
+            public, private = self.public.get(viewer.sid), self.private_counts.get(viewer.sid)
+            count -= viewer.hand_cards.red_count - (public.red if public else 0)
+            if private is not None: count -= private.red
+        return count
+
+    def known_cards(self, owner: str, viewer: Optional[str] = None) -> List[Card]:
+        """owner 手中身份已知的牌 (公开的 + viewer 私下知道的)"""
+        cards = list(self.public[owner].cards.values()) if owner in self.public else []
+        if viewer is not None:
+            known = self.private.get(viewer, {}).get(owner)
+            if known is not None: cards.extend(known.cards.values())
+        return cards
+
+    def is_known(self, card: Card, owner: str, viewer: Optional[str] = None) -> bool:
+        known = self.public.get(owner)
+        if known is not None and card in known: return True
+        if viewer is None: return False
+        known = self.private.get(viewer, {}).get(owner)
+        return known is not None and card in known
@@ -0,0 +1,311 @@
+from enum import Enum
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+from .card import Card, CardType, Suit
+
+if TYPE_CHECKING:
+    from .engine import CardCatalog
+
+class ZoneKind(str, Enum):
+    """卡牌区域类型"""
+    DRAW = "draw"              # 摸牌堆
+    DISCARD = "discard"        # 弃牌堆
+    PROCESSING = "processing"  # 处理区 (正在结算的牌、五谷亮出的牌)
+    HAND = "hand"              # 手牌
+    EQUIP = "equip"            # 装备区
+    JUDGE = "judge"            # 判定区
+
+UNPLACED = -1  # 不在任何区域 (刚从牌堆摸出、尚未放下)
+
+# === 装备栏位 ===
+EQUIP_SLOTS: Tuple[str, ...] = ("weapon", "armor", "horse_plus", "horse_minus")
+SLOT_OF_TYPE: Dict[CardType, str] = {
+    CardType.EQUIP_WEAPON: "weapon",
+    CardType.EQUIP_ARMOR: "armor",
+    CardType.EQUIP_HORSE_PLUS: "horse_plus",
+    CardType.EQUIP_HORSE_MINUS: "horse_minus",
+}
+
+
+class CardZone:
+    """
+    有序的卡牌区域 (手牌 / 判定区 / 牌堆 / 处理区)
+    读操作兼容列表用法；写操作只应由 GameRoom.move_cards 与 GameDeck 调用，以保证位置索引同步
+    除有序列表外，还增量维护：
+    - mask: 区域内实体牌的位集合 (对应 CardCatalog 的各类掩码)
+    - names / suits / red: 按牌名、花色、颜色的计数 (判定区的转化牌按转化后的牌名计)
+    fork() 得到的副本与原区域共享底层容器 (写时复制)，任一方首次修改前才真正复制
+    """
+    __slots__ = ("kind", "owner", "zid", "registry", "cards", "mask", "names", "suits", "red", "shared")
+
+    def __init__(self, kind: ZoneKind, owner: Optional[str] = None):
+        self.kind = kind
+        self.owner = owner                          # 所属玩家 sid (公共区域为 None)
+        self.zid: int = UNPLACED                    # 在 CardRegistry 中的编号
+        self.registry: Optional['CardRegistry'] = None
+        self.cards: List[Card] = []
+        self.mask: int = 0
+        self.names: Dict[str, int] = {}
+        self.suits: Dict[Suit, int] = {}
+        self.red: int = 0
+        self.shared: bool = False                   # 底层容器是否与其他副本共享
+
+    def __repr__(self) -> str:
+        return f"CardZone({self.kind.value}, owner={self.owner}, {len(self.cards)} cards)"
+
+    # --- 只读接口 ---
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def __bool__(self) -> bool:
+        return bool(self.cards)
+
+    def __iter__(self) -> Iterator[Card]:
+        return iter(self.cards)
+
+    def __getitem__(self, index):
+        return self.cards[index]
+
+    def __contains__(self, card: Card) -> bool:
+        if self.registry is not None:
+            return self.registry.location[card.uid] == self.zid
+        return any(c.uid == card.uid for c in self.cards)
+
+    # --- 计数查询 (均为 O(1)) ---
+    def count_name(self, name: str) -> int:
+        return self.names.get(name, 0)
+
+    def has_name(self, name: str) -> bool:
+        return self.names.get(name, 0) > 0
+
+    def count_suit(self, suit: Suit) -> int:
+        return self.suits.get(suit, 0)
+
+    @property
+    def red_count(self) -> int:
+        return self.red
+
+    @property
+    def black_count(self) -> int:
+        return len(self.cards) - self.red
+
+    def has_any(self, mask: int) -> bool:
+        """区域内是否有任意一张牌落在 mask 中"""
+        return (self.mask & mask) != 0
+
+    def count_in(self, mask: int) -> int:
+        return (self.mask & mask).bit_count()
+
+    # --- 写时复制 ---
+    def _own(self):
+        """修改前确保底层容器为本区域独占"""
+        self.cards = self.cards[:]
+        self.names = dict(self.names)
+        self.suits = dict(self.suits)
+        self.shared = False
+
+    def writable(self) -> List[Card]:
+        """返回可原地修改 (洗牌/调整顺序) 的牌列表；只能改变顺序，不能增删"""
+        if self.shared: self._own()
+        return self.cards
+
+    def fork(self, registry: Optional['CardRegistry']) -> 'CardZone':
+        """O(1) 复制出一个属于 registry 的副本 (共享容器，双方标记为写时复制)"""
+        twin = object.__new__(type(self))
+        twin.kind, twin.owner, twin.zid, twin.registry = self.kind, self.owner, self.zid, registry
+        twin.cards, twin.names, twin.suits = self.cards, self.names, self.suits
+        twin.mask, twin.red = self.mask, self.red
+        twin.shared = self.shared = True
+        return twin
+
+    # --- 增量统计 ---
+    def _track(self, card: Card):
+        self.mask |= card.bit
+        self.names[card.name] = self.names.get(card.name, 0) + 1
+        self.suits[card.suit] = self.suits.get(card.suit, 0) + 1
+        if card.is_red: self.red += 1
+
+    def _untrack(self, card: Card):
+        self.mask &= ~card.bit
+        self.names[card.name] -= 1
+        self.suits[card.suit] -= 1
+        if card.is_red: self.red -= 1
+
+    # --- 低层写接口 ---
+    def add(self, card: Card):
+        if self.shared: self._own()
+        self.cards.append(card)
+        self._track(card)
+        if self.registry is not None:
+            self.registry.location[card.uid] = self.zid
+
+    def remove(self, card: Card) -> bool:
+        """移出一张牌 (转化牌按实体牌匹配)，返回是否存在"""
+        if self.shared: self._own()
+        cards = self.cards
+        try:
+            idx = cards.index(card)
+        except ValueError:
+            uid = card.uid
+            idx = next((i for i, c in enumerate(cards) if c.uid == uid), -1)
+            if idx < 0: return False
+        self._untrack(cards[idx])
+        del cards[idx]
+        if self.registry is not None:
+            self.registry.location[card.uid] = UNPLACED
+        return True
+
+    def take_top(self, count: int) -> List[Card]:
+        """从列表末尾 (牌堆顶) 批量取出 count 张，第一个元素为最顶上的牌"""
+        if count <= 0 or not self.cards: return []
+        if self.shared: self._own()
+        cards = self.cards
+        taken = cards[-count:] if count < len(cards) else cards[:]
+        del cards[-len(taken):]
+        taken.reverse()
+        for c in taken: self._untrack(c)
+        if self.registry is not None:
+            location = self.registry.location
+            for c in taken:
+                location[c.uid] = UNPLACED
+        return taken
+
+    def reset(self, cards: Iterable[Card] = ()):
+        """整体替换区域内容 (开局，以及推演时对隐藏区域重新发牌)"""
+        self.cards = list(cards)
+        self.mask, self.names, self.suits, self.red = 0, {}, {}, 0
+        self.shared = False
+        for c in self.cards: self._track(c)
+        if self.registry is not None:
+            location, zid = self.registry.location, self.zid
+            for c in self.cards:
+                location[c.uid] = zid
+
+
+class EquipZone(CardZone):
+    """装备区：固定四个栏位，每个栏位最多一张牌"""
+    __slots__ = ("slots",)
+
+    def __init__(self, owner: Optional[str] = None):
+        super().__init__(ZoneKind.EQUIP, owner)
+        self.slots: Dict[str, Optional[Card]] = dict.fromkeys(EQUIP_SLOTS)
+
+    # --- 栏位访问 ---
+    def __getitem__(self, slot: str) -> Optional[Card]:
+        return self.slots[slot]
+
+    def get(self, slot: str) -> Optional[Card]:
+        return self.slots.get(slot)
+
+    def items(self):
+        return self.slots.items()
+
+    def values(self):
+        return self.slots.values()
+
+    # --- 写时复制 ---
+    def _own(self):
+        super()._own()
+        self.slots = dict(self.slots)
+
+    def fork(self, registry: Optional['CardRegistry']) -> 'EquipZone':
+        twin = super().fork(registry)
+        twin.slots = self.slots
+        return twin
+
+    # --- 写接口 ---
+    def add(self, card: Card):
+        if self.shared: self._own()
+        slot = SLOT_OF_TYPE[card.card_type]
+        if self.slots[slot] is not None:
+            raise ValueError(f"装备栏 {slot} 已被占用，请先移走旧装备")
+        self.slots[slot] = card
+        super().add(card)
+
+    def remove(self, card: Card) -> bool:
+        if not super().remove(card): return False
+        for slot, c in self.slots.items():
+            if c is not None and c.uid == card.uid:
+                self.slots[slot] = None
+                break
+        return True
+
+    def reset(self, cards: Iterable[Card] = ()):
+        self.slots = dict.fromkeys(EQUIP_SLOTS)
+        super().reset(())
+        for c in cards: self.add(c)
+
+
+class CardRegistry:
+    """
+    房间级卡牌位置索引：uid -> 当前所在区域
+    所有区域的增删都会同步更新，因此定位、移动与完整性检查都是 O(1) / O(N)
+    """
+    __slots__ = ("catalog", "zones", "location")
+
+    def __init__(self, catalog: 'CardCatalog'):
+        self.catalog = catalog
+        self.zones: List[CardZone] = []
+        self.location: List[int] = [UNPLACED] * len(catalog)
+
+    def reset(self):
+        """新开一局：清空所有区域登记"""
+        for zone in self.zones:
+            zone.registry = None
+        self.zones = []
+        self.location = [UNPLACED] * len(self.catalog)
+
+    def fork(self) -> 'CardRegistry':
+        """复制整个位置索引：区域全部写时复制，索引本身只是一次列表拷贝"""
+        twin = object.__new__(CardRegistry)
+        twin.catalog = self.catalog
+        twin.location = self.location[:]
+        twin.zones = [z.fork(twin) for z in self.zones]
+        return twin
+
+    def twin_of(self, zone: CardZone) -> CardZone:
+        """zone 在本 (克隆出的) 索引中对应的区域；未登记的区域单独复制"""
+        if 0 <= zone.zid < len(self.zones) and zone.registry is not None:
+            return self.zones[zone.zid]
+        return zone.fork(None)
+
+    def register(self, zone: CardZone) -> CardZone:
+        zone.zid = len(self.zones)
+        zone.registry = self
+        self.zones.append(zone)
+        return zone
+
+    # --- 查询 ---
+    def zone_of(self, card: Card) -> Optional[CardZone]:
+        zid = self.location[card.uid]
+        return self.zones[zid] if zid >= 0 else None
+
+    def find(self, card_id: str) -> Optional[Card]:
+        """按 card_id 查找实体牌"""
+        return self.catalog.get(card_id)
+
+    def locate(self, card_id: str) -> Tuple[Optional[Card], Optional[CardZone]]:
+        """按 card_id 返回 (实体牌, 所在区域)"""
+        card = self.catalog.get(card_id)
+        if card is None: return None, None
+        return card, self.zone_of(card)
+
+    def check_integrity(self) -> List[str]:
+        """校验每张牌恰好位于一个区域且与索引一致，返回问题列表 (空列表表示正常)"""
+        problems = []
+        seen = [0] * len(self.location)
+        for zone in self.zones:
+            mask = 0
+            for c in zone.cards:
+                seen[c.uid] += 1
+                mask |= c.bit
+                if self.location[c.uid] != zone.zid:
+                    problems.append(f"{c.card_id} 位于 {zone!r}，但索引记录为 {self.location[c.uid]}")
+            if mask != zone.mask or sum(zone.names.values()) != len(zone.cards) or zone.red != sum(c.is_red for c in zone.cards):
+                problems.append(f"{zone!r} 的位集合/计数与实际内容不一致")
+        for uid, n in enumerate(seen):
+            if n > 1:
+                problems.append(f"{self.catalog[uid].card_id} 同时存在于 {n} 个位置")
+            elif n == 0:
+                problems.append(f"{self.catalog[uid].card_id} 不在任何区域")
+        return problems
@@ -0,0 +1,61 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.game.room import GameRoom
+
+# ==========================================
+# 客户端动作 -> 房间指令
+# 单条事件 (play_card / respond_action / use_skill / end_turn) 与 batch_actions 共用，
+# 只修改房间状态并把提示写入发件箱，推送由调用方在最后统一 flush
+# ==========================================
+
+# 一个批次最多包含的动作数
+MAX_BATCH_ACTIONS = 16
+
+def _play_card(room: GameRoom, sid: str, data: Dict[str, Any]) -> Tuple[bool, str]:
+    success, msg, _ = room.play_card(sid, data.get("card_index"), data.get("target_sid"), card_id=data.get("card_id"))
+    return success, msg
+
+def _respond_action(room: GameRoom, sid: str, data: Dict[str, Any]) -> Tuple[bool, str]:
+    # extra_payload：前端传来的复杂参数 (如弃牌列表)
+    success, msg = room.handle_response(sid, data.get("card_index"), target_area=data.get("target_area"),
+                                        extra_payload=data.get("extra_payload"), card_id=data.get("card_id"))
+    if success and msg: room.notify(f"📢 {msg}")
+    return success, msg
+
+def _use_skill(room: GameRoom, sid: str, data: Dict[str, Any]) -> Tuple[bool, str]:
+    success, msg = room.trigger_active_skill(sid, data.get("skill_name"), data.get("targets") or [],
+                                             data.get("card_indices") or [], card_ids=data.get("card_ids"))
+    if success: room.notify(f"⚡ {msg}")
+    return success, msg
+
+def _end_turn(room: GameRoom, sid: str, data: Dict[str, Any]) -> Tuple[bool, str]:
+    return room.try_end_turn(sid)
+
+ACTION_HANDLERS: Dict[str, Callable[[GameRoom, str, Dict[str, Any]], Tuple[bool, str]]] = {
+    "play_card": _play_card,
+    "respond_action": _respond_action,
+    "use_skill": _use_skill,
+    "end_turn": _end_turn,
+}
+
+def apply_action(room: GameRoom, sid: str, kind: str, data: Dict[str, Any]) -> Tuple[bool, str]:
+    handler = ACTION_HANDLERS.get(kind)
+    if handler is None: return False, f"未知动作 {kind}"
+    return handler(room, sid, data or {})
+
+def apply_batch(room: GameRoom, sid: str, actions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    按顺序执行一批动作 ({"type": 动作名, ...参数})，中间不让出事件循环，其他指令不会插入
+    遇到失败的动作，或房间开始等待发送者以外的玩家 (出杀后等闪、回合交给下家...) 时停止，
+    其余动作不执行 (结果为 skipped)；返回每个动作的结果
+    """
+    results: List[Dict[str, Any]] = []
+    stopped = False
+    for action in actions:
+        if stopped:
+            results.append({"type": action.get("type"), "ok": False, "skipped": True, "msg": ""})
+            continue
+        ok, msg = apply_action(room, sid, action.get("type"), action)
+        results.append({"type": action.get("type"), "ok": ok, "skipped": False, "msg": msg})
+        stopped = not ok or room.acting_sids() != [sid]
+    return results
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+import socketio
+
+from app.core.config import (
+    BOT_ACTION_DELAY, BOT_DECISION_SECONDS, BOT_POLICY, BOT_TAKEOVER_TIMEOUTS, BOT_WORKERS, MCTS_PLAYOUTS,
+)
+from app.game import bot, mcts
+from app.game.player import Player
+from app.game.room import GameRoom
+from app.socket.actions import apply_action
+
+# ==========================================
+# 托管座位的决策调度
+# - 每次推送后检查需要行动的托管座位，每个座位同时最多一个决策任务
+# - 决策在房间克隆上、由有界的工作池执行 (事件循环只负责克隆与执行结果)，超出时间预算按默认动作处理
+#   启发式策略只读克隆，用线程池；MCTS 需要大量推演，用进程池 (克隆随任务序列化到工作进程)
+# - 决策期间房间状态变化 (他人先行动) 时丢弃结果重新决策
+# ==========================================
+
+class BotDriver:
+    def __init__(self, workers: int = BOT_WORKERS, budget: float = BOT_DECISION_SECONDS,
+                 delay: float = BOT_ACTION_DELAY, policy: str = BOT_POLICY):
+        self.workers = workers
+        self.budget = budget
+        self.delay = delay
+        self.policy = policy
+        self._pool: Optional[Executor] = None
+        self._busy: Set[Tuple[int, str]] = set()             # (id(room), sid) 正在决策
+        self._timeouts: Dict[Tuple[str, str], int] = {}      # (room_id, sid) -> 连续超时次数
+
+    def _executor(self) -> Executor:
+        if self._pool is None:
+            if self.policy == "mcts":
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=mcts.quiet_worker)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sgs-bot")
+        return self._pool
+
+    def _policy(self):
+        if self.policy == "mcts": return partial(mcts.decide, playouts=MCTS_PLAYOUTS)
+        return bot.decide
+
+    # --- 托管 ---
+
+    def take_over(self, room: GameRoom, p: Player):
+        p.is_bot = True
+        self._timeouts.pop((room.room_id, p.sid), None)
+        print(f"🤖 {p.nickname} 由机器人托管")
+        room.notify(f"🤖 {p.nickname} 由机器人托管")
+
+    def release(self, room: GameRoom, p: Player):
+        if not p.is_bot: return
+        p.is_bot = False
+        room.notify(f"🙋 {p.nickname} 取消托管")
+
+    def note_active(self, room: GameRoom, sid: str):
+        """玩家亲自行动：清零连续超时计数，托管中的座位交还给玩家"""
+        self._timeouts.pop((room.room_id, sid), None)
+        p = room.get_player(sid)
+        if p is not None: self.release(room, p)
+
+    def note_timeout(self, room: GameRoom, sids: Iterable[str]):
+        """sids 的等待超时：连续超时达到上限的玩家转为托管"""
+        for sid in sids:
+            p = room.get_player(sid)
+            if not p or p.is_bot or not p.is_alive: continue
+            key = (room.room_id, sid)
+            count = self._timeouts[key] = self._timeouts.get(key, 0) + 1
+            if count >= BOT_TAKEOVER_TIMEOUTS: self.take_over(room, p)
+
+    # --- 决策 ---
+
+    def poke(self, sio: socketio.AsyncServer, room: GameRoom):
+        """为需要行动的托管座位安排决策 (每次推送后调用)"""
+        for sid in room.acting_sids():
+            p = room.get_player(sid)
+            key = (id(room), sid)
+            if p is None or not p.is_bot or key in self._busy: continue
+            self._busy.add(key)
+            asyncio.create_task(self._act(sio, room, sid, key))
+
+    async def _act(self, sio: socketio.AsyncServer, room: GameRoom, sid: str, key: Tuple[int, str]):
+        from .events import flush_room_events
+        try:
+            ok = await self._decide_and_apply(room, sid)
+        except Exception as e:
+            print(f"❌ 机器人决策失败 ({room.room_id}/{sid}): {e}")
+            ok = False
+        finally:
+            self._busy.discard(key)
+        if ok: await flush_room_events(sio, room) # 推送后会再次检查托管座位
+
+    async def _decide_and_apply(self, room: GameRoom, sid: str) -> bool:
+        if self.delay: await asyncio.sleep(self.delay)
+        loop = asyncio.get_running_loop()
+        decide = self._policy()
+        for _ in range(3):
+            p = room.get_player(sid)
+            if p is None or not p.is_bot or sid not in room.acting_sids(): return False
+            version = room.version
+            snapshot = room.clone()
+            # 搜索在预算的八成处收手，留出序列化与调度的余量
+            deadline = time.monotonic() + self.budget * 0.8
+            future = loop.run_in_executor(self._executor(), decide, snapshot, sid, deadline)
+            try:
+                action = await asyncio.wait_for(future, self.budget)
+            except asyncio.TimeoutError:
+                print(f"⌛ 机器人决策超时 ({room.room_id}/{sid})，使用默认动作")
+                action = None
+            if room.version == version: break
+        else:
+            return False
+
+        ok = False
+        if action is not None:
+            ok, _ = apply_action(room, sid, action["type"], action)
+        if not ok:
+            fallback = bot.default_action(room, sid)
+            if fallback is not None: ok, _ = apply_action(room, sid, fallback["type"], fallback)
+        return ok
+
+# 全局单例
+bot_driver = BotDriver()
@@ -0,0 +1,206 @@
+import asyncio
+import time
+import weakref
+from collections import deque
+from functools import partial
+from typing import Awaitable, Callable, Deque, Hashable, List, Optional, Set, Tuple
+
+import socketio
+
+from app.core.config import CATCH_UP_HISTORY, TIMER_TICK_SECONDS
+from app.game.enums import GamePhase
+from app.game.events import CardPlayed, CardsMoved, GameEvent, Notice
+from app.game.pending import WINDOW_PENDINGS
+from app.game.room import GameRoom
+from app.game.timers import TimingWheel
+from app.socket.bots import bot_driver
+
+# 全服所有定时器 (房间截止时间的 key 为 room_id)，由单个后台任务推进；payload 为 async (sio) 回调
+deadlines = TimingWheel(tick=TIMER_TICK_SECONDS)
+_deadline_task: Optional[asyncio.Task] = None
+_deadline_added: Optional[asyncio.Event] = None
+
+# 每个房间的推送锁：同一房间的多次推送按指令顺序逐个发出，不会交错
+_flush_locks: "weakref.WeakKeyDictionary[GameRoom, asyncio.Lock]" = weakref.WeakKeyDictionary()
+# 已安排后台推送、尚未开始的房间 (短时间内的多次请求合并为一次推送)
+_flush_pending: "weakref.WeakSet[GameRoom]" = weakref.WeakSet()
+
+class _History:
+    """房间最近的推送批次 (状态版本, 事件)；floor 之后的版本都能补发"""
+    __slots__ = ("entries", "floor")
+
+    def __init__(self, floor: int):
+        self.entries: Deque[Tuple[int, List[GameEvent]]] = deque()
+        self.floor = floor
+
+    def record(self, version: int, events: List[GameEvent]):
+        self.entries.append((version, events))
+        if len(self.entries) > CATCH_UP_HISTORY:
+            self.floor = self.entries.popleft()[0]
+
+    def since(self, version: int) -> Optional[List[GameEvent]]:
+        """version 之后的全部事件；历史不够早时返回 None"""
+        if version < self.floor: return None
+        return [ev for v, evs in self.entries if v > version for ev in evs]
+
+_history: "weakref.WeakKeyDictionary[GameRoom, _History]" = weakref.WeakKeyDictionary()
+
+def schedule_flush(sio: socketio.AsyncServer, room: GameRoom):
+    """在后台推送房间变化 (指令的 ack 先回给客户端，广播随后进行)；已有待推送任务时合并"""
+    if room in _flush_pending: return
+    _flush_pending.add(room)
+    task = asyncio.create_task(_deferred_flush(sio, room))
+    task.add_done_callback(_report_flush_error)
+
+async def _deferred_flush(sio: socketio.AsyncServer, room: GameRoom):
+    _flush_pending.discard(room)
+    await flush_room_events(sio, room)
+
+def _report_flush_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception():
+        print(f"❌ 推送房间状态失败: {task.exception()}")
+
+async def flush_room_events(sio: socketio.AsyncServer, room: GameRoom):
+    """
+    一条指令执行完后调用：取出房间发件箱中的领域事件，合并成最少的推送
+    - game_events：本条指令产生的全部事件 (一次推送)；涉及暗牌移动的玩家单独收到含牌面的版本
+    - system_message：事件中的系统提示 (前端弹窗)
+    - room_update：公开状态 (每条指令一次)
+    - hand_update：只发给手牌发生变化的玩家
+    - legal_actions：发给当前需要行动的玩家 (按状态版本缓存)
+    room_update 之前按新状态重新安排房间的超时 (截止时间随公开状态下发)
+    """
+    # 先同步取出本条指令的事件 (记入补发历史)，再按顺序排队发送
+    events = room.drain_events()
+    if events:
+        history = _history.get(room)
+        if history is None: history = _history[room] = _History(room.version)
+        history.record(room.version, events)
+    lock = _flush_locks.get(room)
+    if lock is None: lock = _flush_locks[room] = asyncio.Lock()
+    async with lock:
+        await _send_room_events(sio, room, events)
+
+async def _send_room_events(sio: socketio.AsyncServer, room: GameRoom, events: list):
+    hands_changed: Set[str] = set()
+    viewers: Set[str] = set()   # 能看到部分隐藏牌面的玩家
+    for ev in events:
+        if isinstance(ev, CardsMoved):
+            hands_changed.update(ev.touches_hand_of())
+            if ev.hidden:
+                if ev.src_owner: viewers.add(ev.src_owner)
+                if ev.dst_owner: viewers.add(ev.dst_owner)
+
+    if events:
+        public = [ev.to_wire() for ev in events]
+        await sio.emit('game_events', {'events': public}, room=room.room_id, skip_sid=list(viewers) or None)
+        for sid in viewers:
+            own = [ev.to_wire(sid) if isinstance(ev, CardsMoved) and ev.hidden else public[i]
+                   for i, ev in enumerate(events)]
+            await sio.emit('game_events', {'events': own}, room=sid)
+
+        for ev in events:
+            if isinstance(ev, Notice):
+                await sio.emit('system_message', {'msg': ev.msg}, room=room.room_id)
+            elif isinstance(ev, CardPlayed):
+                # 出牌动画与出牌日志
+                await sio.emit('player_played', {"player_id": ev.sid, "target_id": ev.target_sid,
+                                                 "card": ev.card.to_dict()}, room=room.room_id)
+                await sio.emit('system_message', {'msg': _play_log(room, ev)}, room=room.room_id)
+
+    schedule_room_deadline(sio, room)
+    await sio.emit('room_update', room.get_public_state(), room=room.room_id)
+
+    for sid in hands_changed:
+        p = room.get_player(sid)
+        if p and p.is_alive:
+            await sio.emit('hand_update', {'cards': [c.to_dict() for c in p.hand_cards]}, room=sid)
+
+    for sid in room.acting_sids():
+        await sio.emit('legal_actions', room.legal_actions(sid).to_wire(), room=sid)
+
+    bot_driver.poke(sio, room)
+
+def _play_log(room: GameRoom, ev: CardPlayed) -> str:
+    src = room.get_player(ev.sid)
+    src_name = src.nickname if src else "?"
+    name = ev.card.name
+    if name == "杀":
+        target = room.get_player(ev.target_sid) if ev.target_sid else None
+        if target: return f"⚔️ {src_name} 对 {target.nickname} 发起攻击"
+    elif name == "顺手牵羊":
+        return f"🤏 {src_name} 正在实施【顺手牵羊】"
+    elif name == "过河拆桥":
+        return f"🧨 {src_name} 正在实施【过河拆桥】"
+    return f"{src_name} 打出: {name}"
+
+async def send_catch_up(sio: socketio.AsyncServer, room: GameRoom, player_sid: str, sid: str,
+                        last_version: Optional[int] = None):
+    """
+    重连后向 sid 补发：last_version 仍在历史范围内时补发之后的事件 (delta)，否则只发快照
+    两种情况都附带当前公开状态、自己的手牌与合法动作
+    """
+    history = _history.get(room)
+    missed = history.since(last_version) if history is not None and isinstance(last_version, int) else None
+    if missed:
+        await sio.emit('game_events', {'events': [ev.to_wire(player_sid) for ev in missed], 'catch_up': True}, room=sid)
+    await sio.emit('room_update', room.get_public_state(), room=sid)
+    p = room.get_player(player_sid)
+    if p and p.is_alive:
+        await sio.emit('hand_update', {'cards': [c.to_dict() for c in p.hand_cards]}, room=sid)
+    if player_sid in room.acting_sids():
+        await sio.emit('legal_actions', room.legal_actions(player_sid).to_wire(), room=sid)
+    await sio.emit('resumed', {'mode': "delta" if missed is not None else "snapshot",
+                               'version': room.version, 'player_sid': player_sid}, room=sid)
+
+def schedule_timer(sio: socketio.AsyncServer, key: Hashable, when: float,
+                   callback: Callable[[socketio.AsyncServer], Awaitable[None]]):
+    """在 when 调用 callback(sio)；同一 key 只保留最后一次安排"""
+    global _deadline_task, _deadline_added
+    deadlines.schedule(key, when, callback)
+    if _deadline_task is None or _deadline_task.done():
+        _deadline_added = asyncio.Event()
+        _deadline_task = asyncio.create_task(_run_deadlines(sio))
+    _deadline_added.set()
+
+def cancel_timer(key: Hashable) -> bool:
+    return deadlines.cancel(key)
+
+def schedule_room_deadline(sio: socketio.AsyncServer, room: GameRoom):
+    """按房间当前等待的对象 (选将/出牌/询问/响应窗口) 安排或取消超时"""
+    deadline = room.refresh_deadline(time.time())
+    if deadline is None:
+        deadlines.cancel(room.room_id)
+        return
+    schedule_timer(sio, room.room_id, deadline, partial(_expire_room, room=room))
+
+async def _run_deadlines(sio: socketio.AsyncServer):
+    """唯一的定时任务：时间轮为空时挂起，否则每个 tick 推进一次"""
+    while True:
+        if not len(deadlines):
+            _deadline_added.clear()
+            await _deadline_added.wait()
+        await asyncio.sleep(deadlines.tick)
+        for key, callback in deadlines.advance(time.time()):
+            try:
+                await callback(sio)
+            except Exception as e:
+                print(f"❌ 定时任务 {key} 执行失败: {e}")
+
+async def _expire_room(sio: socketio.AsyncServer, room: GameRoom):
+    now = time.time()
+    deadline = room.refresh_deadline(now)
+    if deadline is None: return
+    if deadline > now:
+        # 期间截止时间被顺延 (无懈对无懈)
+        schedule_room_deadline(sio, room)
+        return
+    was_picking = room.phase == GamePhase.PICK_GENERAL
+    print(f"⏰ 房间 {room.room_id} 等待超时")
+    # 响应窗口超时不计入 (只是没人出牌)；单人询问与出牌阶段超时连续多次转为托管
+    if not isinstance(room.pending_action, WINDOW_PENDINGS): bot_driver.note_timeout(room, room.acting_sids())
+    success, msg = room.expire_deadline()
+    if success and msg: room.notify(f"⏰ {msg}")
+    await flush_room_events(sio, room)
+    if was_picking and room.phase != GamePhase.PICK_GENERAL:
+        await sio.emit('game_started', {}, room=room.room_id)
@@ -0,0 +1,110 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+# ==========================================
+# 客户端指令序号与结果缓存
+# 客户端为每条游戏指令附带递增的 seq；服务器按 (客户端, seq) 记住最近的结果，
+# 网络抖动后重发的同一指令直接返回缓存结果，不会重复执行 (不带 seq 的旧客户端不做去重)
+# ==========================================
+
+# 每个客户端缓存的最近结果数
+RESULT_CACHE_SIZE = 32
+
+class _ClientLog:
+    __slots__ = ("results", "highest")
+
+    def __init__(self):
+        self.results: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.highest = -1
+
+class CommandLog:
+    def __init__(self, size: int = RESULT_CACHE_SIZE):
+        self.size = size
+        self._clients: Dict[str, _ClientLog] = {}
+
+    def lookup(self, client: str, seq: Optional[int]) -> Optional[Dict[str, Any]]:
+        """
+        seq 已处理过时返回应答：缓存中有则原样返回，已被挤出缓存则返回过期应答 (不再执行)
+        新的 seq (或未带 seq) 返回 None，由调用方执行指令
+        """
+        if not isinstance(seq, int): return None
+        log = self._clients.get(client)
+        if log is None or seq > log.highest: return None
+        cached = log.results.get(seq)
+        if cached is not None: return cached
+        if seq <= log.highest - self.size:
+            return {"seq": seq, "ok": False, "msg": "指令已过期", "stale": True, "version": None}
+        return None # 窗口内未出现过的较小序号 (乱序到达)，照常执行
+
+    def record(self, client: str, seq: Optional[int], ack: Dict[str, Any]) -> Dict[str, Any]:
+        """记住 seq 的应答并原样返回"""
+        if not isinstance(seq, int): return ack
+        log = self._clients.get(client)
+        if log is None: log = self._clients[client] = _ClientLog()
+        log.results[seq] = ack
+        log.highest = max(log.highest, seq)
+        while len(log.results) > self.size:
+            log.results.popitem(last=False)
+        return ack
+
+    def forget(self, client: str):
+        self._clients.pop(client, None)
+
+# 全局单例
+command_log = CommandLog()
+
+# ==========================================
+# 断线重连：连接 sid 与对局身份的绑定
+# 玩家在对局中的身份 (player_sid) 是其首次进入房间时的连接 sid；重连后新连接加入以该 sid 命名的
+# socket.io 房间，发给 player_sid 的私有消息照常送达，收到的指令在这里换回 player_sid 再交给引擎
+# ==========================================
+
+@dataclass(slots=True)
+class HeldSeat:
+    """断线后保留的座位"""
+    room_id: str
+    player_sid: str
+    since: float
+
+class SessionManager:
+    def __init__(self):
+        self._player_of: Dict[str, str] = {}    # 重连后的连接 sid -> player_sid
+        self._conn_of: Dict[str, str] = {}      # player_sid -> 当前连接 sid (重连过才有)
+        self._held: Dict[str, HeldSeat] = {}    # username -> 保留中的座位
+
+    def player_sid(self, sid: str) -> str:
+        """连接 sid 对应的对局身份 (未重连过的连接就是自己)"""
+        return self._player_of.get(sid, sid)
+
+    def is_current(self, sid: str) -> bool:
+        """sid 是否为其对局身份当前的连接 (重连后旧连接迟到的断开事件应忽略)"""
+        return self._conn_of.get(self.player_sid(sid), sid) == sid
+
+    def hold(self, username: str, room_id: str, player_sid: str, now: float) -> HeldSeat:
+        seat = self._held[username] = HeldSeat(room_id, player_sid, now)
+        return seat
+
+    def held(self, username: str) -> Optional[HeldSeat]:
+        return self._held.get(username)
+
+    def reclaim(self, username: str, sid: str) -> Optional[HeldSeat]:
+        """同一账号重连：取回保留的座位并把新连接绑定到原来的身份 (O(1)，重连风暴时也很便宜)"""
+        seat = self._held.pop(username, None)
+        if seat is not None:
+            if seat.player_sid != sid: self._player_of[sid] = seat.player_sid
+            self._conn_of[seat.player_sid] = sid
+        return seat
+
+    def release(self, username: str, player_sid: str) -> Optional[HeldSeat]:
+        """保留期结束仍未重连：放弃座位 (期间已重连或换了座位时返回 None)"""
+        seat = self._held.get(username)
+        if seat is None or seat.player_sid != player_sid: return None
+        return self._held.pop(username)
+
+    def unbind(self, sid: str):
+        psid = self._player_of.pop(sid, sid)
+        if self._conn_of.get(psid) == sid: del self._conn_of[psid]
+
+# 全局单例
+session_manager = SessionManager()
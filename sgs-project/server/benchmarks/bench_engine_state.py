@@ -0,0 +1,105 @@
+"""
+引擎状态基准：单步操作 CPU 耗时 + 单房间内存占用 + 房间克隆耗时
+
+用法 (在 server 目录下):
+    python benchmarks/bench_engine_state.py [对局数] [房间数]
+
+- 随机对局只调用 GameRoom 的公开接口 (出牌 / 响应 / 结束回合)，每次操作后像传输层一样
+  取出事件发件箱 (不做序列化)，统计的是引擎本身处理一次玩家操作的平均耗时
+- 内存为开局后 tracemalloc 统计的新增分配，按房间平均
+- 克隆耗时取对局进行到中途的 8 人房间，反复调用 GameRoom.clone()
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.game.enums import GamePhase
+from app.game.room import GameRoom
+
+def new_started_room(room_id: str, n_players: int) -> GameRoom:
+    room = GameRoom(room_id)
+    for i in range(n_players):
+        room.add_player(f"{room_id}-s{i}", {"username": f"{room_id}-u{i}", "nickname": f"玩家{i}"})
+    for p in room.players: p.is_ready = True
+    ok, msg = room.start_game()
+    assert ok, msg
+    for p in room.players:
+        room.select_general(p.sid, random.choice(p.general_candidates))
+    return room
+
+def _discard_count(room: GameRoom) -> int:
+    return room.get_public_state()["pending"]["extra_data"]["discard_count"]
+
+def play_random(room: GameRoom, max_steps: int = 3000) -> int:
+    """随机推进一局，返回执行的操作数"""
+    steps = 0
+    while room.phase != GamePhase.GAME_OVER and steps < max_steps:
+        steps += 1
+        room.drain_events()
+        pa = room.pending_action
+        if pa:
+            p = room.get_player(pa.target_sid)
+            idx = random.randrange(len(p.hand_cards)) if p.hand_cards and random.random() < 0.5 else None
+            extra = None
+            if pa.action_type.value == "ask_for_discard":
+                extra = {"indices": random.sample(range(len(p.hand_cards)), _discard_count(room))}
+            if pa.action_type.value == "ask_for_choose_card": idx = 0
+            area = random.choice(["hand", "weapon", "armor", "confirm", None])
+            room.handle_response(p.sid, idx, target_area=area, extra_payload=extra)
+            continue
+        cur = room.players[room.current_player_idx]
+        if room.phase == GamePhase.PLAY and random.random() < 0.7 and cur.hand_cards:
+            tgt = random.choice([p.sid for p in room.players if p.is_alive])
+            room.play_card(cur.sid, random.randrange(len(cur.hand_cards)), tgt)
+        else:
+            room.try_end_turn(cur.sid)
+    return steps
+
+def bench_cpu(games: int) -> float:
+    total_steps, total_time = 0, 0.0
+    for seed in range(games):
+        random.seed(seed)
+        room = new_started_room(f"r{seed}", 2 + seed % 7)
+        t = time.perf_counter()
+        total_steps += play_random(room)
+        total_time += time.perf_counter() - t
+    return total_time / max(1, total_steps) * 1e6
+
+def bench_memory(rooms: int) -> float:
+    random.seed(0)
+    new_started_room("warmup", 8) # 预先构建全局卡牌/武将目录，不计入房间内存
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    keep = [new_started_room(f"m{i}", 8) for i in range(rooms)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(s.size_diff for s in after.compare_to(before, "filename"))
+    del keep
+    return size / rooms / 1024
+
+def bench_clone(rounds: int = 2000) -> float:
+    random.seed(0)
+    room = new_started_room("c", 8)
+    play_random(room, max_steps=100)
+    t = time.perf_counter()
+    for i in range(rounds):
+        room.clone(seed=i)
+    return (time.perf_counter() - t) / rounds * 1e6
+
+if __name__ == "__main__":
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rooms = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with contextlib.redirect_stdout(io.StringIO()): # 引擎的调试打印不计入结果
+        us_per_action = bench_cpu(games)
+        kb_per_room = bench_memory(rooms)
+        us_per_clone = bench_clone() if hasattr(GameRoom, "clone") else None
+    print(f"📊 平均每次操作 {us_per_action:.1f} µs ({games} 局随机对局)")
+    print(f"📊 平均每个房间 {kb_per_room:.1f} KiB (8 人开局后，{rooms} 个房间)")
+    if us_per_clone is not None:
+        print(f"📊 平均每次克隆 {us_per_clone:.1f} µs ({1e6 / us_per_clone:.0f} 次/秒)")
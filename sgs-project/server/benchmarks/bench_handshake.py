@@ -0,0 +1,91 @@
+"""
+连接鉴权基准：模拟重连风暴，比较三种鉴权方式的握手吞吐与事件循环卡顿
+
+用法 (在 server 目录下):
+    python benchmarks/bench_handshake.py [连接数]
+
+- 临时 SQLite 数据库中建好 N 个账号，N 个连接同时携带各自的令牌发起鉴权 (资料缓存为冷缓存)
+- 逐个内联：原来的 connect 写法，在事件循环上直接解码令牌并同步查询 (SELECT ... WHERE username = ?)
+- 逐个卸载：每个连接单独把令牌校验、资料查询交给工作线程 (批大小为 1)
+- 微批：令牌按批交给校验线程池，用户名按批合并为一次 WHERE username IN (...) 查询
+- 卡顿为鉴权期间一个每毫秒醒来一次的任务观察到的最大延迟 (其他房间的推送会被同样推迟)
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.core.profiles import Authenticator, ProfileCache, load_profiles
+from app.core.security import create_access_token, decode_access_token
+from app.models.user import User
+
+def make_database(path: str, users: int):
+    db_engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(db_engine)
+    with Session(db_engine) as db:
+        for i in range(users):
+            db.add(User(username=f"user{i}", nickname=f"玩家{i}", hashed_password="-"))
+        db.commit()
+    return db_engine
+
+def inline_auth(db_engine, token: str):
+    """原来的 connect 写法 (整个过程都在事件循环上)"""
+    username = decode_access_token(token)
+    if not username: return None
+    with Session(db_engine) as db:
+        user = db.exec(select(User).where(User.username == username)).first()
+        return {"username": user.username, "nickname": user.nickname, "avatar": user.avatar} if user else None
+
+async def storm(authenticate, tokens):
+    """所有连接同时鉴权，返回 (握手/秒, 最大卡顿毫秒, 成功数)"""
+    stall = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal stall
+        while running:
+            t = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, time.perf_counter() - t - 0.001)
+
+    probe = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    results = await asyncio.gather(*[authenticate(token) for token in tokens])
+    elapsed = time.perf_counter() - started
+    running = False
+    await probe
+    return len(tokens) / elapsed, stall * 1000, sum(1 for r in results if r)
+
+async def run(users: int, db_engine):
+    tokens = [create_access_token(subject=f"user{i}") for i in range(users)]
+    loader = partial(load_profiles, bind=db_engine)
+
+    async def inline(token):
+        return inline_auth(db_engine, token)
+
+    single = Authenticator(cache=ProfileCache(loader=loader, max_batch=1), max_batch=1)
+    batched = Authenticator(cache=ProfileCache(loader=loader))
+    return {
+        "逐个内联": await storm(inline, tokens),
+        "逐个卸载": await storm(single.authenticate, tokens),
+        "微批": await storm(batched.authenticate, tokens),
+    }
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_engine = make_database(os.path.join(tmp, "bench.db"), users)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = asyncio.run(run(users, db_engine))
+        db_engine.dispose()
+    for name, (rate, stall_ms, ok) in results.items():
+        print(f"📊 {name}: {rate:.0f} 握手/秒，事件循环最大卡顿 {stall_ms:.1f} ms ({ok}/{users} 成功)")
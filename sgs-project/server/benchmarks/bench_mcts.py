@@ -0,0 +1,92 @@
+"""
+MCTS 机器人基准：搜索吞吐 (模拟次数/秒) + 对随机策略的胜率
+
+用法 (在 server 目录下):
+    python benchmarks/bench_mcts.py [对局数] [每步模拟次数] [进程数]
+
+- 吞吐取若干个对局中途的 5 人局面，分别统计单进程与多进程 (根并行) 的模拟次数/秒
+- 胜率：4 人局，一个座位 (轮换) 由 MCTS 控制，其余座位从候选动作中均匀随机选择；
+  对照组为全部随机，该座位的期望胜率约为 1/4。超过步数上限未分胜负的对局不计为胜
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.game import mcts
+from app.game.bot import default_action, perform
+from app.game.enums import GamePhase
+from bench_engine_state import new_started_room, play_random
+
+MAX_STEPS = 3000
+
+def random_policy(room, sid, rng):
+    choices = mcts.candidate_actions(room, sid)
+    return rng.choice(choices)[1] if choices else None
+
+def play_match(seed: int, mcts_seat, playouts: int, processes: int) -> bool:
+    """打一局，返回被考察的座位 (seat = seed % 4) 是否获胜；mcts_seat 为 False 时该座位也随机行动"""
+    rng = random.Random(seed)
+    random.seed(seed)
+    room = new_started_room(f"b{seed}", 4)
+    hero = room.players[seed % 4].sid
+    for _ in range(MAX_STEPS):
+        if room.phase == GamePhase.GAME_OVER: break
+        actors = room.acting_sids()
+        if not actors: break
+        sid = actors[0]
+        if sid == hero and mcts_seat:
+            if processes > 1:
+                action = mcts.parallel_search(room, sid, playouts, processes=processes, seed=rng.getrandbits(32)).action
+            else:
+                action = mcts.search(room, sid, playouts, rng=rng).action
+        else:
+            action = random_policy(room, sid, rng)
+        if action is None or not perform(room, sid, action)[0]:
+            fallback = default_action(room, sid)
+            if fallback is None or not perform(room, sid, fallback)[0]: room.expire_deadline()
+        room.drain_events()
+    return room.phase == GamePhase.GAME_OVER and room.winner_sid == hero
+
+def bench_throughput(playouts: int, processes: int, positions: int = 5):
+    rooms = []
+    for seed in range(positions):
+        random.seed(seed)
+        room = new_started_room(f"t{seed}", 5)
+        play_random(room, max_steps=30 + 10 * seed)
+        if room.phase != GamePhase.GAME_OVER and room.acting_sids(): rooms.append(room)
+
+    def run(search):
+        total, elapsed = 0, 0.0
+        for room in rooms:
+            t = time.perf_counter()
+            total += search(room, room.acting_sids()[0]).playouts
+            elapsed += time.perf_counter() - t
+        return total / elapsed if elapsed else 0.0
+
+    single = run(lambda room, sid: mcts.search(room, sid, playouts, rng=random.Random(0)))
+    parallel = None
+    if processes > 1:
+        mcts.parallel_search(rooms[0], rooms[0].acting_sids()[0], processes, processes=processes) # 预热工作进程
+        parallel = run(lambda room, sid: mcts.parallel_search(room, sid, playouts * processes, processes=processes, seed=0))
+    return single, parallel
+
+if __name__ == "__main__":
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    playouts = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else min(4, os.cpu_count() or 1)
+    with contextlib.redirect_stdout(io.StringIO()): # 引擎的调试打印不计入结果
+        single, parallel = bench_throughput(playouts, processes)
+        t = time.perf_counter()
+        mcts_wins = sum(play_match(seed, True, playouts, processes) for seed in range(games))
+        match_seconds = time.perf_counter() - t
+        random_wins = sum(play_match(seed, False, playouts, processes) for seed in range(games))
+    print(f"📊 单进程 {single:.0f} 次模拟/秒")
+    if parallel is not None:
+        print(f"📊 {processes} 进程 {parallel:.0f} 次模拟/秒 (每次搜索 {playouts * processes} 次模拟)")
+    print(f"📊 MCTS ({playouts} 次模拟/步) 对随机策略：{mcts_wins}/{games} 胜 ({match_seconds:.1f} 秒)")
+    print(f"📊 对照 (随机 对 随机)：{random_wins}/{games} 胜")
@@ -1,17 +1,26 @@
+import time
+from functools import partial
+
 import socketio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from sqlmodel import Session, select 
 
 # === 引用 ===
-from app.core.database import create_db_and_tables, engine 
+from app.core.config import RECONNECT_GRACE_SECONDS
+from app.core.database import create_db_and_tables
+from app.core.profiles import authenticator
 from app.api.auth import router as auth_router
-from app.core.security import decode_access_token
-from app.models.user import User        
 
 from app.game.manager import room_manager
-from app.game.room import GamePhase
+from app.game.generals import get_general_catalog
+from app.game.room import AUTO_PASS_CHOICES, GamePhase
+from app.socket.actions import MAX_BATCH_ACTIONS, apply_action, apply_batch
+from app.socket.bots import bot_driver
+from app.socket.events import (
+    cancel_timer, flush_room_events, schedule_flush, schedule_room_deadline, schedule_timer, send_catch_up,
+)
+from app.socket.manager import command_log, session_manager
 
 # === 1. 初始化服务架构 ===
 
@@ -19,6 +28,8 @@ from app.game.room import GamePhase
 async def lifespan(app: FastAPI):
     create_db_and_tables()
     print("✅ 数据库表结构已初始化")
+    catalog = get_general_catalog()
+    print(f"✅ 武将目录已加载，共 {len(catalog)} 名武将")
     yield
 
 sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
@@ -43,23 +54,15 @@ async def root():
 # === 2. 状态同步与系统通知工具 ===
 
 async def broadcast_room_state(room):
-    """向房间内所有玩家广播最新的游戏状态"""
+    """向房间内所有玩家广播完整的游戏状态 (大厅阶段/进出房间时的全量同步)"""
     state = room.get_public_state()
-    
-    # 检查是否刚触发游戏结束
-    if state["phase"] == GamePhase.GAME_OVER and room.winner_sid:
-        winner = room.get_player(room.winner_sid)
-        if winner:
-            winner_name = winner.nickname if winner.nickname != "无名氏" else f"{winner.seat_id}号位"
-            await notify_room(room.room_id, f"🏆 游戏结束！胜利者是：{winner_name}")
-
     await sio.emit('room_update', state, room=room.room_id)
     
     # 私有手牌数据单独发送 (安全机制)
     for p in room.players:
         if p.is_alive:
             # 序列化 Card 对象
-            cards_data = [c.model_dump() for c in p.hand_cards]
+            cards_data = [c.to_dict() for c in p.hand_cards]
             await sio.emit('hand_update', {'cards': cards_data}, room=p.sid)
 
 async def notify_error(sid, msg):
@@ -73,56 +76,142 @@ async def broadcast_lobby():
     lobby_data = room_manager.get_lobby_info()
     await sio.emit('lobby_update', lobby_data)
 
+# === 逃跑与断线重连 ===
+
+async def player_fled(room, player_sid):
+    """对局中逃跑 (主动离开或断线超时)：判定阵亡并推送，房间无人存活时销毁"""
+    msg = room.handle_disconnect_during_game(player_sid)
+    room.notify(msg)
+    if not any(p.is_alive for p in room.players):
+        print(f"💀 房间 {room.room_id} 无人生还，强制销毁")
+        room_manager.remove_room(room.room_id)
+    else:
+        # 无论是否结束，都需要推送本次变化
+        await flush_room_events(sio, room)
+
+async def abandon_seat(room, player_sid):
+    """对局中离开 (主动离开或断线超时)：还有在线玩家时由机器人托管座位，否则按逃跑处理"""
+    p = room.get_player(player_sid)
+    humans = [q for q in room.players if q.is_alive and q.is_online and not q.is_bot and q.sid != player_sid]
+    if not p or not p.is_alive or not humans or room.phase == GamePhase.GAME_OVER:
+        await player_fled(room, player_sid)
+        return False
+    bot_driver.take_over(room, p)
+    await flush_room_events(sio, room)
+    return True
+
+def hold_seat(room, p):
+    """对局中断线：保留座位等待同一账号重连，期间的询问与回合照常按超时处理"""
+    seat = session_manager.hold(p.username, room.room_id, p.sid, time.time())
+    p.is_online = False
+    print(f"📴 {p.nickname} 断线，保留座位")
+    room.notify(f"📴 {p.nickname} 断线，座位保留 {int(RECONNECT_GRACE_SECONDS)} 秒")
+    schedule_timer(sio, ("grace", p.sid), seat.since + RECONNECT_GRACE_SECONDS,
+                   partial(grace_expired, p.username, p.sid))
+
+async def abandon_and_hold(room, player_sid, username):
+    """交给机器人托管并保留座位 (托管期间仍可用同一账号重连接回)；返回是否由机器人托管"""
+    if not await abandon_seat(room, player_sid): return False
+    if username: session_manager.hold(username, room.room_id, player_sid, time.time())
+    return True
+
+async def grace_expired(username, player_sid, _sio):
+    seat = session_manager.release(username, player_sid)
+    if seat is None: return
+    room = room_manager.get_room(seat.room_id)
+    if room and room.get_player(player_sid) and await abandon_and_hold(room, player_sid, username):
+        return
+    command_log.forget(player_sid)
+    await broadcast_lobby()
+
+async def rebind_seat(sid, seat):
+    """把重连的新连接接回保留的座位：加入房间与以原身份命名的私有频道"""
+    cancel_timer(("grace", seat.player_sid))
+    room = room_manager.get_room(seat.room_id)
+    p = room.get_player(seat.player_sid) if room else None
+    if not p or not p.is_alive:
+        session_manager.unbind(sid)
+        return None
+    p.is_online = True
+    bot_driver.release(room, p)
+    await sio.enter_room(sid, room.room_id)
+    if sid != seat.player_sid: await sio.enter_room(sid, seat.player_sid)
+    print(f"🔌 {p.nickname} 重新连接")
+    room.notify(f"🔌 {p.nickname} 重新连接")
+    schedule_flush(sio, room)
+    return room
+
 # === 3. Socket 事件处理 ===
 
 @sio.event
 async def connect(sid, environ, auth=None):
     user_info = {"nickname": "无名氏", "avatar": "default.png", "username": ""}
     
-    if auth and "token" in auth:
-        token = auth["token"]
-        username = decode_access_token(token)
-        if username:
-            with Session(engine) as db:
-                statement = select(User).where(User.username == username)
-                user = db.exec(statement).first()
-                if user:
-                    user_info = {
-                        "username": user.username,
-                        "nickname": user.nickname,
-                        "avatar": user.avatar
-                    }
-                    print(f"🔐 用户已认证: {user.nickname} (@{user.username})")
+    if isinstance(auth, dict) and isinstance(auth.get("token"), str):
+        # 令牌校验与资料查询在工作线程中按微批执行 (资料按用户名缓存)，重连风暴不会卡住事件循环
+        try:
+            profile = await authenticator.authenticate(auth["token"])
+        except Exception as e:
+            print(f"❌ 连接鉴权失败: {e}")
+            profile = None
+        if profile:
+            user_info = profile
+            print(f"🔐 用户已认证: {profile['nickname']} (@{profile['username']})")
     
     if not user_info["username"]:
         print(f"⛔ 拒绝匿名/无效连接: {sid}")
         return False 
 
     await sio.save_session(sid, user_info)
+
+    # 对局中断线的玩家用同一账号重连：直接接回座位
+    seat = session_manager.reclaim(user_info["username"], sid)
+    room = await rebind_seat(sid, seat) if seat else None
+    if room:
+        # 连接建立后 (下一个 tick) 补发快照；客户端随后发送 resume 时改为按版本补发
+        schedule_timer(sio, ("resume", sid), time.time(),
+                       lambda _sio: send_catch_up(sio, room, seat.player_sid, sid))
     await broadcast_lobby()
 
+@sio.event
+async def resume(sid, data):
+    """
+    重连后请求补发：data = {"last_version": 客户端最后看到的状态版本 (room_update.version)}
+    历史足够时补发之后的事件，否则发送快照
+    """
+    cancel_timer(("resume", sid))
+    session = await sio.get_session(sid)
+    seat = session_manager.reclaim((session or {}).get("username", ""), sid)
+    if seat: await rebind_seat(sid, seat)
+    psid = session_manager.player_sid(sid)
+    room = room_manager.get_player_room(psid)
+    if not room or not room.is_started: return {"ok": False, "msg": "没有可恢复的对局"}
+    await send_catch_up(sio, room, psid, sid, (data or {}).get("last_version"))
+    return {"ok": True, "version": room.version}
+
 @sio.event
 async def disconnect(sid):
     """处理意外断开连接"""
-    room = room_manager.get_player_room(sid)
+    cancel_timer(("resume", sid))
+    if not session_manager.is_current(sid):
+        # 已被重连的新连接取代，旧连接迟到的断开不影响座位
+        session_manager.unbind(sid)
+        return
+    psid = session_manager.player_sid(sid)
+    session_manager.unbind(sid)
+    room = room_manager.get_player_room(psid)
+    p = room.get_player(psid) if room else None
     if room:
+        if room.is_started and p.is_alive and p.username and room.phase != GamePhase.GAME_OVER:
+            # 游戏进行中：保留座位等待重连，超时后按逃跑处理
+            hold_seat(room, p)
+            await flush_room_events(sio, room)
+            return
         if room.is_started:
-            # 游戏进行中：触发逃跑逻辑，可能导致游戏结束
-            msg = room.handle_disconnect_during_game(sid)
-            await notify_room(room.room_id, msg)
-            await sio.leave_room(sid, room.room_id)
-            
-            alive_players = [p for p in room.players if p.is_alive]
-            
-            if len(alive_players) == 0:
-                print(f"💀 房间 {room.room_id} 无人生还，强制销毁")
-                room_manager.remove_room(room.room_id)
-            else:
-                # 无论是否结束，都需要广播状态
-                await broadcast_room_state(room)
+            await player_fled(room, psid)
         else:
             # 游戏未开始：正常离开
-            room.remove_player(sid)
+            room.remove_player(psid)
             await sio.leave_room(sid, room.room_id)
             
             if not room.players:
@@ -132,6 +221,7 @@ async def disconnect(sid):
                 await notify_room(room.room_id, "一名玩家离开了战场")
                 await broadcast_room_state(room)
     
+    command_log.forget(psid)
     await broadcast_lobby()
 
 @sio.event
@@ -156,7 +246,8 @@ async def join_room(sid, data):
 @sio.event
 async def leave_room(sid, data):
     """前端主动点击“离开”按钮"""
-    room = room_manager.get_player_room(sid)
+    psid = session_manager.player_sid(sid)
+    room = room_manager.get_player_room(psid)
     if room:
         if not room.is_started:
             room.remove_player(sid)
@@ -169,16 +260,10 @@ async def leave_room(sid, data):
         else:
             # 游戏进行中逃跑逻辑
             print(f"👋 玩家 {sid} 主动点击离开按钮")
-            msg = room.handle_disconnect_during_game(sid)
-            await notify_room(room.room_id, msg)
             await sio.leave_room(sid, room.room_id)
-            
-            alive_players = [p for p in room.players if p.is_alive]
-            if len(alive_players) == 0:
-                room_manager.remove_room(room.room_id)
-            else:
-                await broadcast_room_state(room)
-            
+            p = room.get_player(psid)
+            if p: p.is_online = False
+            await abandon_and_hold(room, psid, p.username if p else "")
             await broadcast_lobby()
 
 @sio.event
@@ -213,6 +298,7 @@ async def start_game(sid, data):
     if not room: return
     success, msg = room.start_game()
     if success:
+        schedule_room_deadline(sio, room) # 选将限时
         await notify_room(room.room_id, msg)
         await broadcast_room_state(room)
         await broadcast_lobby()
@@ -221,14 +307,15 @@ async def start_game(sid, data):
 
 @sio.event
 async def select_general(sid, data):
-    room = room_manager.get_player_room(sid)
+    psid = session_manager.player_sid(sid)
+    room = room_manager.get_player_room(psid)
     if not room: return
     general_id = data.get("general_id")
     if not general_id: return
     
-    success, msg = room.select_general(sid, general_id)
+    success, msg = room.select_general(psid, general_id)
     if success:
-        await broadcast_room_state(room)
+        await flush_room_events(sio, room)
         if "游戏开始" in msg:
             await sio.emit('game_started', {}, room=room.room_id)
             await notify_room(room.room_id, "⚔️ 众将归位，乱世开启！")
@@ -237,87 +324,102 @@ async def select_general(sid, data):
     else:
         await notify_error(sid, msg)
 
-@sio.event
-async def play_card(sid, data):
-    room = room_manager.get_player_room(sid)
-    if not room: return
-    
-    idx = data.get("card_index")
-    target = data.get("target_sid")
-    
-    success, msg, card = room.play_card(sid, idx, target)
-    if not success: return await notify_error(sid, msg)
-
-    # 广播打出的牌动画
-    if card:
-        await sio.emit('player_played', {
-            "player_id": sid,
-            "target_id": target,
-            "card": card.model_dump()
-        }, room=room.room_id)
-
-    # 系统日志通知
-    p_src = room.get_player(sid)
-    src_name = p_src.nickname 
-    if card.name == "杀":
-        p_target = room.get_player(target)
-        if p_target:
-            await notify_room(room.room_id, f"⚔️ {src_name} 对 {p_target.nickname} 发起攻击")
-    elif card.name == "顺手牵羊":
-        await notify_room(room.room_id, f"🤏 {src_name} 正在实施【顺手牵羊】")
-    elif card.name == "过河拆桥":
-        await notify_room(room.room_id, f"🧨 {src_name} 正在实施【过河拆桥】")
+async def run_action(sid, kind, data):
+    """
+    执行一条游戏内动作 (见 app/socket/actions.py)
+    返回值作为 socket.io ack 立即回给客户端 ({seq, ok, msg, version})，本条指令的变化随后在后台推送；
+    带 seq 的重发指令直接返回上次的应答
+    """
+    data = data or {}
+    seq = data.get("seq")
+    psid = session_manager.player_sid(sid) # 重连后的连接换回对局身份
+    cached = command_log.lookup(psid, seq)
+    if cached is not None: return cached
+
+    room = room_manager.get_player_room(psid)
+    if not room: return {"seq": seq, "ok": False, "msg": "不在房间中", "version": None}
+    success, msg = apply_action(room, psid, kind, data)
+    if success: bot_driver.note_active(room, psid)
+    ack = command_log.record(psid, seq, {"seq": seq, "ok": success, "msg": msg, "version": room.version})
+    if success:
+        schedule_flush(sio, room)
     else:
-        await notify_room(room.room_id, f"{src_name} 打出: {card.name}")
+        await notify_error(sid, msg)
+    return ack
 
-    await broadcast_room_state(room)
+@sio.event
+async def play_card(sid, data):
+    return await run_action(sid, "play_card", data)
 
 @sio.event
 async def respond_action(sid, data):
     """
     处理玩家的响应操作（出闪、弃牌、遗计分牌等）
     """
-    room = room_manager.get_player_room(sid)
-    if not room: return
-    
-    index = data.get("card_index")
-    area = data.get("target_area")
-    extra = data.get("extra_payload") # 🌟 核心：接收前端传来的复杂参数（如弃牌列表）
-    
-    success, msg = room.handle_response(sid, index, target_area=area, extra_payload=extra)
-    if success:
-        if msg:
-            await notify_room(room.room_id, f"📢 {msg}")
-        await broadcast_room_state(room)
-    else:
-        await notify_error(sid, msg)
+    return await run_action(sid, "respond_action", data)
 
 @sio.event
 async def use_skill(sid, data):
     """
     🌟 核心新增：处理主动技能释放 (如离间、青囊)
     """
-    room = room_manager.get_player_room(sid)
-    if not room: return
-    
-    skill_name = data.get("skill_name")
-    targets = data.get("targets") or []
-    card_indices = data.get("card_indices") or []
-    
-    success, msg = room.trigger_active_skill(sid, skill_name, targets, card_indices)
-    
-    if success:
-        await notify_room(room.room_id, f"⚡ {msg}")
-        await broadcast_room_state(room)
+    return await run_action(sid, "use_skill", data)
+
+@sio.event
+async def batch_actions(sid, data):
+    """
+    一次提交多条动作 (如 装备 -> 出杀 -> 无中生有 -> 结束回合 -> 弃牌)，按顺序执行，
+    遇到失败或需要等待他人时停止，全部执行完只推送一次状态
+    data: {"seq": 7, "actions": [{"type": "play_card", "card_id": ...}, {"type": "end_turn"}, ...]}
+    整个批次共用一个 seq，ack 中带每条动作的结果
+    """
+    data = data or {}
+    seq = data.get("seq")
+    psid = session_manager.player_sid(sid)
+    cached = command_log.lookup(psid, seq)
+    if cached is not None: return cached
+
+    room = room_manager.get_player_room(psid)
+    if not room: return {"seq": seq, "ok": False, "msg": "不在房间中", "version": None}
+    actions = data.get("actions")
+    if not isinstance(actions, list) or not all(isinstance(a, dict) for a in actions):
+        msg = "动作列表格式错误"
+    elif len(actions) > MAX_BATCH_ACTIONS:
+        msg = f"一次最多提交 {MAX_BATCH_ACTIONS} 条动作"
     else:
-        await notify_error(sid, msg)
+        results = apply_batch(room, psid, actions)
+        failed = next((r for r in results if not r["ok"] and not r["skipped"]), None)
+        ack = command_log.record(psid, seq, {"seq": seq, "ok": failed is None, "msg": failed["msg"] if failed else "",
+                                            "version": room.version, "results": results})
+        if any(r["ok"] for r in results):
+            bot_driver.note_active(room, psid)
+            schedule_flush(sio, room)
+        if failed: await notify_error(sid, failed["msg"])
+        return ack
+    await notify_error(sid, msg)
+    return command_log.record(psid, seq, {"seq": seq, "ok": False, "msg": msg, "version": room.version})
+
+@sio.event
+async def set_auto_response(sid, data):
+    """保存自动放弃响应的设置 (会话内有效，之后加入的房间沿用)"""
+    names = (data or {}).get("auto_pass")
+    if names is None: names = []
+    if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+        return await notify_error(sid, "自动响应设置格式错误")
+    invalid = [n for n in names if n not in AUTO_PASS_CHOICES]
+    if invalid: return await notify_error(sid, f"不支持自动放弃：{','.join(invalid)}")
+
+    session = await sio.get_session(sid)
+    psid = session_manager.player_sid(sid)
+    room = room_manager.get_player_room(psid)
+    if room:
+        success, msg = room.set_auto_pass(psid, names)
+        if not success: return await notify_error(sid, msg)
+        if room.is_started: await flush_room_events(sio, room)
+    session["auto_pass"] = names
+    await sio.save_session(sid, session)
+    await sio.emit('system_message', {'msg': "✅ 自动响应设置已保存"}, room=sid)
 
 @sio.event
 async def end_turn(sid, data):
-    room = room_manager.get_player_room(sid)
-    if not room: return
-    success, msg = room.try_end_turn(sid)
-    if success:
-        await broadcast_room_state(room)
-    else:
-        await notify_error(sid, msg)
\ No newline at end of file
+    return await run_action(sid, "end_turn", data)
\ No newline at end of file
@@ -0,0 +1,23 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.profiles import Authenticator, ProfileCache
+from app.core.security import create_access_token
+
+def fake_loader(usernames):
+    return {name: {"username": name, "nickname": name, "avatar": "default.png"} for name in usernames}
+
+def test_bad_tokens_do_not_fail_the_batch():
+    async def run():
+        cache = ProfileCache(loader=fake_loader, window=0.05)
+        auth = Authenticator(cache, workers=1, window=0.05)
+        good = [create_access_token(f"user{i}") for i in range(3)]
+        bad = [None, 123, "not-a-jwt", {"sub": "user0"}]
+        return await asyncio.gather(*(auth.authenticate(t) for t in good + bad))
+
+    results = asyncio.run(run())
+    assert [r["username"] for r in results[:3]] == ["user0", "user1", "user2"]
+    assert results[3:] == [None, None, None, None]
@@ -0,0 +1,37 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import main
+from app.game.manager import room_manager
+from app.socket.manager import session_manager
+
+def start_room(room_id: str):
+    room = room_manager.create_room(room_id)
+    for i in range(3):
+        room.add_player(f"{room_id}-s{i}", {"username": f"{room_id}-u{i}", "nickname": f"p{i}"})
+    for p in room.players: p.is_ready = True
+    room.start_game()
+    for p in room.players: room.select_general(p.sid, p.general_candidates[0])
+    return room
+
+async def noop(*args, **kwargs): pass
+
+def test_leave_mid_game_keeps_seat_reclaimable(monkeypatch):
+    monkeypatch.setattr(main.sio, "leave_room", noop)
+    monkeypatch.setattr(main.sio, "emit", noop)
+    room = start_room("leave-test")
+    leaver = room.players[1]
+    try:
+        asyncio.run(main.leave_room(leaver.sid, {}))
+        assert leaver.is_bot and leaver.is_alive and not leaver.is_online
+        seat = session_manager.held(leaver.username)
+        assert seat is not None and seat.player_sid == leaver.sid and seat.room_id == room.room_id
+
+        assert session_manager.reclaim(leaver.username, "new-conn").player_sid == leaver.sid
+        assert session_manager.player_sid("new-conn") == leaver.sid
+    finally:
+        session_manager.unbind("new-conn")
+        room_manager.remove_room(room.room_id)